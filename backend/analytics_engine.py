@@ -0,0 +1,452 @@
+"""
+Columnar, in-process analytics over a user's incomes and expenses.
+
+The last ``HISTORY_MONTHS`` months of a user's records are loaded once into a
+``UserFrame``: parallel NumPy arrays holding, per record, its filing period
+(yyyymm), category index, amount in cents and status/type codes. Group-by
+and rolling-window questions are then answered with vectorized operations
+instead of walking lists of dicts.
+
+Frames are kept in a memory-bounded ``FrameCache`` stamped with the user's
+data version. Nothing here talks to Mongo or FastAPI, so the same functions
+serve the API and the batch precompute job.
+"""
+from collections import OrderedDict
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+INCOME, EXPENSE = 0, 1
+STATUS_CODES = {"pending": 0, "paid": 1, "received": 2}
+
+# Fields a frame is built from; everything else stays in Mongo
+FRAME_PROJECTION = {
+    "_id": 0, "year": 1, "month": 1, "period": 1, "category_id": 1,
+    "value": 1, "value_cents": 1, "status": 1, "payment_method": 1
+}
+# Months before the requested one a frame covers: comparison looks a year back
+HISTORY_MONTHS = 12
+
+def record_cents(doc: dict) -> int:
+    """``value_cents``, or the reais value rounded half away from zero for
+    records the cents backfill has not reached yet"""
+    cents = doc.get("value_cents")
+    if cents is not None:
+        return cents
+    return int((Decimal(str(doc.get("value") or 0)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def shift_period(period: int, delta: int) -> int:
+    index = (period // 100) * 12 + (period % 100 - 1) + delta
+    return (index // 12) * 100 + index % 12 + 1
+
+def history_periods(month: int, year: int) -> Tuple[int, int]:
+    """First and last period of the frame the analytics of a month read"""
+    period = year * 100 + month
+    return shift_period(period, -HISTORY_MONTHS), period
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over the last axis; the first positions average the
+    values available so far"""
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.cumsum(values, axis=-1)
+    lagged = np.zeros_like(sums)
+    lagged[..., window:] = sums[..., :-window]
+    counts = np.minimum(np.arange(1, values.shape[-1] + 1), window)
+    return (sums - lagged) / counts
+
+class UserFrame:
+    """One user's incomes and expenses as parallel arrays"""
+
+    __slots__ = ("kind", "period", "category", "cents", "status", "credit", "category_ids")
+
+    def __init__(self, kind, period, category, cents, status, credit, category_ids: List[str]):
+        self.kind = kind
+        self.period = period
+        self.category = category
+        self.cents = cents
+        self.status = status
+        self.credit = credit
+        self.category_ids = category_ids
+
+    @classmethod
+    def from_documents(cls, incomes: Iterable[dict], expenses: Iterable[dict]) -> "UserFrame":
+        kind, period, category, cents, status, credit = [], [], [], [], [], []
+        category_index: Dict[str, int] = {}
+        for code, docs in ((INCOME, incomes), (EXPENSE, expenses)):
+            for doc in docs:
+                kind.append(code)
+                period.append(doc.get("period") or doc["year"] * 100 + doc["month"])
+                category.append(category_index.setdefault(doc.get("category_id") or "", len(category_index)))
+                cents.append(record_cents(doc))
+                status.append(STATUS_CODES.get(doc.get("status"), -1))
+                credit.append(doc.get("payment_method") == "credit")
+        return cls(
+            kind=np.array(kind, dtype=np.int8),
+            period=np.array(period, dtype=np.int32),
+            category=np.array(category, dtype=np.int32),
+            cents=np.array(cents, dtype=np.int64),
+            status=np.array(status, dtype=np.int8),
+            credit=np.array(credit, dtype=np.bool_),
+            category_ids=list(category_index)
+        )
+
+    def __len__(self) -> int:
+        return len(self.cents)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = self.kind.nbytes + self.period.nbytes + self.category.nbytes
+        arrays += self.cents.nbytes + self.status.nbytes + self.credit.nbytes
+        return arrays + sum(len(c) + 64 for c in self.category_ids)
+
+    def mask(self, kind: int, statuses: Optional[Sequence[str]] = None,
+             periods: Optional[Sequence[int]] = None, credit: Optional[bool] = None) -> np.ndarray:
+        selected = self.kind == kind
+        if statuses is not None:
+            selected &= np.isin(self.status, [STATUS_CODES[s] for s in statuses])
+        if periods is not None:
+            selected &= np.isin(self.period, periods)
+        if credit is not None:
+            selected &= self.credit == credit
+        return selected
+
+    def total(self, kind: int, statuses: Optional[Sequence[str]] = None,
+              periods: Optional[Sequence[int]] = None, credit: Optional[bool] = None) -> int:
+        return int(self.cents[self.mask(kind, statuses, periods, credit)].sum())
+
+    def monthly_totals(self, periods: Sequence[int], kind: int,
+                       statuses: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Cents per period, in the order the periods are given"""
+        unique, inverse = np.unique(np.asarray(periods, dtype=np.int32), return_inverse=True)
+        selected = self.mask(kind, statuses, unique)
+        slots = np.searchsorted(unique, self.period[selected])
+        totals = np.bincount(slots, weights=self.cents[selected], minlength=len(unique))
+        return np.rint(totals).astype(np.int64)[inverse]
+
+    def category_monthly_totals(self, periods: Sequence[int], kind: int,
+                                statuses: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Cents per (category index, period) as a categories x periods matrix"""
+        periods = np.asarray(periods, dtype=np.int32)
+        unique, inverse = np.unique(periods, return_inverse=True)
+        selected = self.mask(kind, statuses, unique)
+        cells = self.category[selected] * len(unique) + np.searchsorted(unique, self.period[selected])
+        totals = np.bincount(cells, weights=self.cents[selected], minlength=len(self.category_ids) * len(unique))
+        return np.rint(totals).astype(np.int64).reshape(len(self.category_ids), len(unique))[:, inverse]
+
+    def category_totals(self, period: int, kind: int, statuses: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """Cents per category id for one period, only categories with records"""
+        selected = self.mask(kind, statuses, [period])
+        totals = np.bincount(self.category[selected], weights=self.cents[selected], minlength=len(self.category_ids))
+        present = np.bincount(self.category[selected], minlength=len(self.category_ids)) > 0
+        return {self.category_ids[i]: int(round(totals[i])) for i in np.flatnonzero(present)}
+
+class FrameCache:
+    """LRU of user frames stamped with the data version they were loaded at.
+
+    Like the response cache, a frame is only served while its version is
+    current, and the summed size of the arrays is kept under ``max_bytes``."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Hashable, UserFrame]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str, version: Hashable) -> Optional[UserFrame]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if entry[0] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self._discard(user_id)
+        self.misses += 1
+        return None
+
+    def put(self, user_id: str, version: Hashable, frame: UserFrame):
+        if frame.nbytes > self.max_bytes:
+            return
+        self._discard(user_id)
+        self._entries[user_id] = (version, frame)
+        self.size_bytes += frame.nbytes
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _discard(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self.size_bytes -= entry[1].nbytes
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "rows": sum(len(frame) for _, frame in self._entries.values()),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0
+        }
+
+# ==================== ANALYTICS ====================
+
+def _variation(current: float, reference: float) -> float:
+    return ((current - reference) / reference * 100) if reference > 0 else 0
+
+def _trend(variation: float, threshold: float) -> str:
+    return "up" if variation > threshold else "down" if variation < -threshold else "stable"
+
+def trends(frame: UserFrame, month: int, year: int, categories: List[dict]) -> dict:
+    """Current month vs the average of the five before it, overall and per
+    expense category (``categories`` gives their ids and names, in order)"""
+    period = year * 100 + month
+    periods = [shift_period(period, -i) for i in range(5, -1, -1)]
+    income = frame.monthly_totals(periods, INCOME, ("received",))
+    expense = frame.monthly_totals(periods, EXPENSE, ("paid",))
+    by_category = frame.category_monthly_totals(periods, EXPENSE)
+    category_rows = {cid: i for i, cid in enumerate(frame.category_ids)}
+
+    months_data = [{
+        "month": p % 100,
+        "year": p // 100,
+        "income": income[i] / 100,
+        "expense": expense[i] / 100,
+        "balance": (income[i] - expense[i]) / 100
+    } for i, p in enumerate(periods)]
+
+    # Mean of the five months ending right before the current one
+    avg_income = rolling_mean(income, 5)[-2] / 100
+    avg_expense = rolling_mean(expense, 5)[-2] / 100
+    avg_by_category = rolling_mean(by_category, 5)[:, -2] / 100
+    current = months_data[-1]
+    income_variation = _variation(current["income"], avg_income)
+    expense_variation = _variation(current["expense"], avg_expense)
+
+    category_trends = []
+    for cat in categories:
+        row = category_rows.get(cat["id"])
+        current_total = by_category[row, -1] / 100 if row is not None else 0.0
+        avg_cat = float(avg_by_category[row]) if row is not None else 0.0
+        variation = _variation(current_total, avg_cat)
+        if current_total > 0 or avg_cat > 0:
+            category_trends.append({
+                "category_id": cat["id"],
+                "category_name": cat["name"],
+                "current": current_total,
+                "average": avg_cat,
+                "variation": variation,
+                "trend": _trend(variation, 10)
+            })
+
+    return {
+        "monthly_data": months_data,
+        "current_month": {"month": month, "year": year, **{k: current[k] for k in ("income", "expense", "balance")}},
+        "averages": {"income": float(avg_income), "expense": float(avg_expense)},
+        "variations": {
+            "income_percentage": income_variation,
+            "expense_percentage": expense_variation,
+            "income_trend": _trend(income_variation, 5),
+            "expense_trend": _trend(expense_variation, 5)
+        },
+        "category_trends": category_trends
+    }
+
+def comparison(frame: UserFrame, month: int, year: int) -> dict:
+    """Current month vs the previous one and the same month last year"""
+    period = year * 100 + month
+    periods = [period, shift_period(period, -1), shift_period(period, -12)]
+    income = frame.monthly_totals(periods, INCOME, ("received",)) / 100
+    expense = frame.monthly_totals(periods, EXPENSE, ("paid",)) / 100
+    balance = income - expense
+    current, previous, last_year = (
+        {"income": float(income[i]), "expense": float(expense[i]), "balance": float(balance[i])} for i in range(3)
+    )
+
+    return {
+        "current": current,
+        "previous_month": previous,
+        "last_year": last_year,
+        "variations": {
+            "income_vs_previous": _variation(current["income"], previous["income"]),
+            "expense_vs_previous": _variation(current["expense"], previous["expense"]),
+            "balance_vs_previous": (
+                (current["balance"] - previous["balance"]) / abs(previous["balance"]) * 100
+            ) if previous["balance"] != 0 else 0,
+            "income_vs_last_year": _variation(current["income"], last_year["income"]),
+            "expense_vs_last_year": _variation(current["expense"], last_year["expense"])
+        }
+    }
+
+def forecast(frame: UserFrame, month: int, year: int) -> dict:
+    """End of month balance from what is still pending, then the average
+    balance of the last three months carried over the next three"""
+    period = year * 100 + month
+    periods = [shift_period(period, -i) for i in range(2, -1, -1)]
+    income = frame.monthly_totals(periods, INCOME, ("received",))
+    expense = frame.monthly_totals(periods, EXPENSE, ("paid",))
+    avg_income = float(rolling_mean(income, 3)[-1] / 100)
+    avg_expense = float(rolling_mean(expense, 3)[-1] / 100)
+    avg_balance = avg_income - avg_expense
+
+    pending_income = frame.total(INCOME, ("pending",), [period]) / 100
+    pending_expense = frame.total(EXPENSE, ("pending",), [period]) / 100
+    current_balance = (income[-1] - expense[-1]) / 100
+    forecast_current = current_balance + pending_income - pending_expense
+
+    forecast_months = []
+    for i in range(1, 4):
+        future = shift_period(period, i)
+        forecast_months.append({
+            "month": future % 100,
+            "year": future // 100,
+            "forecasted_balance": forecast_current + avg_balance * i,
+            "avg_income": avg_income,
+            "avg_expense": avg_expense
+        })
+
+    return {
+        "current_balance": float(current_balance),
+        "pending_income": pending_income,
+        "pending_expense": pending_expense,
+        "forecast_current_month": float(forecast_current),
+        "average_monthly_balance": avg_balance,
+        "forecast_next_months": forecast_months,
+        "historical_data": [{
+            "month": p % 100,
+            "year": p // 100,
+            "income": income[i] / 100,
+            "expense": expense[i] / 100,
+            "balance": (income[i] - expense[i]) / 100
+        } for i, p in enumerate(periods)]
+    }
+
+def category_names(categories: Iterable[dict]) -> Dict[str, str]:
+    """Name by category id, as ``highlight`` and ``tips`` take them. Unnamed
+    categories are left out, so they get the same fallback as deleted ones
+    wherever the map was built"""
+    return {c["id"]: c["name"] for c in categories if c.get("name")}
+
+def highlight(record: Optional[dict], category_names: Dict[str, str]) -> Optional[dict]:
+    """The month's largest income or expense as shown on the dashboard"""
+    if not record:
+        return None
+    return {
+        "value": record["value"],
+        "description": record["description"],
+        "category": category_names.get(record["category_id"], "N/A"),
+        "date": record.get("date", ""),
+        "status": record["status"]
+    }
+
+def tips(frame: UserFrame, month: int, year: int, category_names: Dict[str, str], goals: List[dict]) -> List[dict]:
+    """Up to six tips on the month's spending, savings, pending bills, open
+    goals close to completion and credit card use, most urgent first"""
+    period = year * 100 + month
+    tips = []
+
+    total_income = frame.total(INCOME, ("received",), [period]) / 100
+    total_expenses = frame.total(EXPENSE, ("paid",), [period]) / 100
+    total_last_month = frame.total(EXPENSE, ("paid",), [shift_period(period, -1)]) / 100
+
+    # Tip 1: Spending comparison
+    if total_last_month > 0:
+        change_percent = ((total_expenses - total_last_month) / total_last_month) * 100
+        if change_percent > 20:
+            tips.append({
+                "type": "warning",
+                "icon": "trending-up",
+                "title": "Gastos aumentaram",
+                "message": f"Seus gastos aumentaram {change_percent:.1f}% em relação ao mês passado. Considere revisar suas despesas.",
+                "priority": "high"
+            })
+        elif change_percent < -10:
+            tips.append({
+                "type": "success",
+                "icon": "trending-down",
+                "title": "Parabéns! Gastos reduziram",
+                "message": f"Você reduziu seus gastos em {abs(change_percent):.1f}% em relação ao mês passado. Continue assim!",
+                "priority": "low"
+            })
+
+    # Tip 2: Savings rate
+    if total_income > 0:
+        savings_rate = ((total_income - total_expenses) / total_income) * 100
+        if savings_rate < 10:
+            tips.append({
+                "type": "warning",
+                "icon": "piggy-bank",
+                "title": "Taxa de poupança baixa",
+                "message": f"Você está economizando apenas {savings_rate:.1f}% da sua renda. Especialistas recomendam poupar pelo menos 20%.",
+                "priority": "high"
+            })
+        elif savings_rate >= 20:
+            tips.append({
+                "type": "success",
+                "icon": "piggy-bank",
+                "title": "Excelente taxa de poupança!",
+                "message": f"Você está economizando {savings_rate:.1f}% da sua renda. Parabéns pela disciplina financeira!",
+                "priority": "low"
+            })
+
+    # Tip 3: Category analysis
+    category_totals = frame.category_totals(period, EXPENSE)
+    if category_totals:
+        top_category_id = max(category_totals, key=category_totals.get)
+        top_category_name = category_names.get(top_category_id, "Outros")
+        top_category_percent = (category_totals[top_category_id] / 100 / total_expenses * 100) if total_expenses > 0 else 0
+
+        if top_category_percent > 40:
+            tips.append({
+                "type": "info",
+                "icon": "pie-chart",
+                "title": f"Concentração em {top_category_name}",
+                "message": f"{top_category_percent:.1f}% dos seus gastos estão em '{top_category_name}'. Considere diversificar ou reduzir gastos nessa categoria.",
+                "priority": "medium"
+            })
+
+    # Tip 4: Pending bills
+    total_pending = frame.total(EXPENSE, ("pending",), [period]) / 100
+    if total_pending > 0:
+        tips.append({
+            "type": "info",
+            "icon": "clock",
+            "title": "Contas pendentes",
+            "message": f"Você tem R$ {total_pending:.2f} em contas pendentes este mês. Não esqueça de pagá-las!",
+            "priority": "medium"
+        })
+
+    # Tip 5: Goals progress
+    for goal in goals:
+        progress = (goal.get("current_value", 0) / goal.get("target_value", 1)) * 100
+        if progress >= 90 and progress < 100:
+            tips.append({
+                "type": "success",
+                "icon": "target",
+                "title": f"Meta '{goal['name']}' quase lá!",
+                "message": f"Faltam apenas R$ {goal['target_value'] - goal['current_value']:.2f} para completar sua meta. Continue!",
+                "priority": "medium"
+            })
+
+    # Tip 6: Credit card usage
+    credit_total = frame.total(EXPENSE, periods=[period], credit=True) / 100
+    if total_expenses > 0 and credit_total / total_expenses > 0.5:
+        tips.append({
+            "type": "warning",
+            "icon": "credit-card",
+            "title": "Alto uso de cartão de crédito",
+            "message": f"Mais de 50% dos seus gastos são no cartão de crédito. Cuidado com os juros!",
+            "priority": "high"
+        })
+
+    # Sort by priority
+    priority_order = {"high": 0, "medium": 1, "low": 2}
+    tips.sort(key=lambda x: priority_order.get(x["priority"], 1))
+
+    return tips[:6]
@@ -0,0 +1,91 @@
+"""
+Detection of event loop stalls, with the stack of the code that caused them.
+
+A timer inside the loop cannot see a stall while it happens, only how late
+it woke up afterwards. ``LoopWatchdog`` therefore runs in its own thread: it
+schedules a no-op on the loop every ``interval`` seconds and, if the loop has
+not run it within ``threshold`` seconds, the loop is stuck right now, so it
+grabs the loop thread's current stack (``sys._current_frames``) and the task
+that was running. Once the loop catches up, ``on_stall`` is called from the
+watchdog thread with a ``Stall`` describing it.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Callable, List, NamedTuple, Optional
+
+class Stall(NamedTuple):
+    duration: float  # seconds from the unanswered ping to the loop running it
+    task: Optional[str]  # name and coroutine of the task that was running
+    stack: List[str]  # innermost frame last, as "file:line in function"
+    location: str  # innermost frame in application code, "file:function"
+
+def _current_task_name(loop: asyncio.AbstractEventLoop) -> Optional[str]:
+    try:
+        # Read from another thread on purpose; a plain dict lookup is safe under the GIL
+        task = asyncio.tasks._current_tasks.get(loop)
+    except AttributeError:
+        return None
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+class LoopWatchdog(threading.Thread):
+    def __init__(self, loop: asyncio.AbstractEventLoop, threshold: float, interval: float,
+                 on_stall: Callable[[Stall], None], app_root: str, max_frames: int = 30):
+        super().__init__(name="loop-watchdog", daemon=True)
+        self.loop = loop
+        self.threshold = threshold
+        self.interval = interval
+        self.on_stall = on_stall
+        self.app_root = app_root
+        self.max_frames = max_frames
+        self.loop_thread_id = threading.get_ident()  # created from the loop's thread
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            answered = threading.Event()
+            sent = time.monotonic()
+            try:
+                self.loop.call_soon_threadsafe(answered.set)
+            except RuntimeError:  # loop closed
+                return
+            if not answered.wait(self.threshold):
+                stall = self._capture(sent, answered)
+                if stall is not None:
+                    try:
+                        self.on_stall(stall)
+                    except Exception as e:
+                        logging.error(f"Loop stall handler failed: {e}")
+            self._stopped.wait(self.interval)
+
+    def _capture(self, sent: float, answered: threading.Event) -> Optional[Stall]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return None
+        summary = traceback.extract_stack(frame)[-self.max_frames:]
+        task = _current_task_name(self.loop)
+        del frame
+
+        # Wait for the loop to come back, so the stall is reported with its length
+        while not answered.wait(self.threshold):
+            if self._stopped.is_set():
+                return None
+        location = next(
+            (f"{f.filename.rsplit('/', 1)[-1]}:{f.name}" for f in reversed(summary) if f.filename.startswith(self.app_root)),
+            "unknown"
+        )
+        return Stall(
+            duration=time.monotonic() - sent,
+            task=task,
+            stack=[f"{f.filename}:{f.lineno} in {f.name}" for f in summary],
+            location=location
+        )
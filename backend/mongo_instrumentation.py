@@ -0,0 +1,147 @@
+"""
+Per-request accounting of Mongo commands.
+
+``MongoCommandMonitor`` is a pymongo ``CommandListener``; it attributes every
+command to the request being served through a context variable, which Motor
+carries into the executor threads it runs pymongo on. ``MongoStatsMiddleware``
+opens the accounting for each HTTP request, reports it in a ``Server-Timing``
+header and logs a warning, with the most repeated command shapes (the usual
+N+1 suspects), when a request goes over its round-trip budget.
+
+Commands issued outside a request (startup, migrations, background tasks)
+are not attributed to anything.
+"""
+import contextvars
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import bson
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+class RequestMongoStats:
+    """Mongo commands issued while serving one request. Updated from Motor's
+    executor threads, hence the lock."""
+
+    def __init__(self):
+        self.commands = 0
+        self.failures = 0
+        self.duration_ms = 0.0
+        self.documents = 0
+        self.reply_bytes = 0
+        # (command name, collection) -> [count, total ms]
+        self.by_shape: Dict[Tuple[str, str], list] = {}
+        self._inflight: Dict[int, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, request_id: int, shape: Tuple[str, str]):
+        with self._lock:
+            self._inflight[request_id] = shape
+
+    def finished(self, request_id: int, command_name: str, duration_ms: float,
+                 documents: int = 0, reply_bytes: int = 0, failed: bool = False):
+        with self._lock:
+            shape = self._inflight.pop(request_id, (command_name, ""))
+            self.commands += 1
+            self.failures += failed
+            self.duration_ms += duration_ms
+            self.documents += documents
+            self.reply_bytes += reply_bytes
+            entry = self.by_shape.setdefault(shape, [0, 0.0])
+            entry[0] += 1
+            entry[1] += duration_ms
+
+    def top_shapes(self, limit: int = 3) -> list:
+        with self._lock:
+            shapes = sorted(self.by_shape.items(), key=lambda item: item[1][0], reverse=True)
+        return [f"{name} {collection}".strip() + f" x{count}" for (name, collection), (count, _) in shapes[:limit]]
+
+current_mongo_stats: "contextvars.ContextVar[Optional[RequestMongoStats]]" = contextvars.ContextVar(
+    "current_mongo_stats", default=None
+)
+
+def reply_documents(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or ())
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+class MongoCommandMonitor(monitoring.CommandListener):
+    """Feeds the stats of the request the command was issued for, and any
+    ``observers`` (called with the command name, duration in seconds and
+    whether it failed, from whichever thread ran the command)"""
+
+    def __init__(self, measure_reply_bytes: bool = True):
+        # Re-encoding replies to measure them costs about as much as decoding
+        # them did; it can be switched off on hot deployments
+        self.measure_reply_bytes = measure_reply_bytes
+        self.observers = []
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        stats = current_mongo_stats.get()
+        if stats is not None:
+            collection = event.command.get(event.command_name)
+            if event.command_name == "getMore":
+                collection = event.command.get("collection")
+            stats.started(event.request_id, (event.command_name, collection if isinstance(collection, str) else ""))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finished(event, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finished(event, failed=True)
+
+    def _finished(self, event, failed: bool):
+        stats = current_mongo_stats.get()
+        if stats is not None:
+            reply = getattr(event, "reply", None) or {}
+            stats.finished(
+                event.request_id, event.command_name, event.duration_micros / 1000,
+                documents=reply_documents(reply),
+                reply_bytes=len(bson.encode(reply)) if reply and self.measure_reply_bytes else 0,
+                failed=failed
+            )
+        for observer in self.observers:
+            observer(event.command_name, event.duration_micros / 1_000_000, failed)
+
+class MongoStatsMiddleware:
+    """Pure ASGI middleware (it does not wrap the response body, so streaming
+    responses pass through untouched) that opens a ``RequestMongoStats`` per
+    HTTP request"""
+
+    def __init__(self, app, round_trip_budget: int):
+        self.app = app
+        self.round_trip_budget = round_trip_budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestMongoStats()
+        token = current_mongo_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                MutableHeaders(scope=message).append("Server-Timing", ", ".join((
+                    f'mongo;dur={stats.duration_ms:.1f};desc="{stats.commands} round trips"',
+                    f"app;dur={elapsed_ms:.1f}"
+                )))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_mongo_stats.reset(token)
+            if stats.commands > self.round_trip_budget:
+                route = scope.get("route")
+                logging.warning(
+                    f"{scope['method']} {getattr(route, 'path', scope['path'])} made {stats.commands} Mongo round trips "
+                    f"(budget {self.round_trip_budget}, {stats.duration_ms:.1f} ms, {stats.documents} docs, "
+                    f"{stats.reply_bytes} bytes); most repeated: {', '.join(stats.top_shapes())}"
+                )
@@ -0,0 +1,165 @@
+"""
+Batch precompute of the dashboard analytics for every approved user.
+
+    python precompute_analytics.py [--workers 8] [--shard-size 200] [--month 10 --year 2026]
+
+Meant to run nightly (e.g. ``0 3 * * * cd /app/backend && python precompute_analytics.py``).
+The parent streams user ids from Mongo and hands them out in shards to a
+process pool; each worker keeps its own MongoClient, loads the months the
+analytics read into an ``analytics_engine.UserFrame`` and computes trends, forecast, tips and
+highlights for the month. Results are written to ``precomputed_analytics``,
+one document per user, stamped with the ``users.data_changed_at`` value read
+before loading: the API serves them only while that stamp is unchanged and
+falls back to computing live otherwise.
+
+Throughput scales with ``--workers`` (one process per core by default), as
+the frame building and the NumPy work are CPU-bound and Mongo reads of
+different users run side by side.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReplaceOne
+
+import analytics_engine
+
+load_dotenv(Path(__file__).parent / '.env')
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'test_database')
+
+_db = None
+
+def _init_worker():
+    # One client per process, created after the fork/spawn: pymongo clients
+    # must not be shared across processes
+    global _db
+    _db = MongoClient(MONGO_URL)[DB_NAME]
+
+def compute_user(db, user_id: str, month: int, year: int) -> dict:
+    """The precomputed_analytics document for one user"""
+    # Read the stamp before the data, so a write racing with this job can only
+    # make the result look stale, never make stale results look current
+    user = db.users.find_one({"id": user_id}, {"_id": 0, "data_changed_at": 1}) or {}
+    first, last = analytics_engine.history_periods(month, year)
+    query = {"user_id": user_id, "period": {"$gte": first, "$lte": last}}
+    incomes = db.incomes.find(query, analytics_engine.FRAME_PROJECTION)
+    expenses = db.expenses.find(query, analytics_engine.FRAME_PROJECTION)
+    frame = analytics_engine.UserFrame.from_documents(incomes, expenses)
+
+    # The same category queries as the live handlers, so both give the same answer
+    categories = list(db.categories.find({"user_id": user_id}, {"_id": 0, "id": 1, "name": 1}).limit(100))
+    expense_categories = list(
+        db.categories.find({"user_id": user_id, "type": "expense"}, {"_id": 0, "id": 1, "name": 1}).limit(100)
+    )
+    category_names = analytics_engine.category_names(categories)
+    goals = list(db.goals.find({"user_id": user_id, "is_completed": False}, {"_id": 0}).limit(10))
+    month_query = {"user_id": user_id, "month": month, "year": year}
+    largest = {
+        kind: next(iter(db[kind].find(month_query, {"_id": 0}).sort("value", -1).limit(1)), None)
+        for kind in ("incomes", "expenses")
+    }
+
+    return {
+        "user_id": user_id,
+        "month": month,
+        "year": year,
+        "source_changed_at": user.get("data_changed_at"),
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+        "results": {
+            "analysis/trends": analytics_engine.trends(frame, month, year, expense_categories),
+            "analytics/forecast": analytics_engine.forecast(frame, month, year),
+            "tips/personalized": analytics_engine.tips(frame, month, year, category_names, goals),
+            "analytics/highlights": {
+                "largest_expense": analytics_engine.highlight(largest["expenses"], category_names),
+                "largest_income": analytics_engine.highlight(largest["incomes"], category_names)
+            }
+        }
+    }
+
+def precompute_shard(user_ids: List[str], month: int, year: int) -> dict:
+    """Compute and store the analytics of a shard of users; runs in a worker"""
+    written, failed = 0, 0
+    operations = []
+    for user_id in user_ids:
+        try:
+            doc = compute_user(_db, user_id, month, year)
+        except Exception as e:
+            logging.error(f"Precompute failed for user {user_id}: {e}")
+            failed += 1
+            continue
+        operations.append(ReplaceOne({"user_id": user_id}, doc, upsert=True))
+    if operations:
+        _db.precomputed_analytics.bulk_write(operations, ordered=False)
+        written = len(operations)
+    return {"written": written, "failed": failed}
+
+def run(workers: int, shard_size: int, month: int, year: int) -> dict:
+    db = MongoClient(MONGO_URL)[DB_NAME]
+    totals = {"users": 0, "written": 0, "failed": 0}
+    started = time.monotonic()
+
+    # spawn: workers must not inherit the parent's MongoClient
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        pending = {}  # future -> users in its shard
+
+        def collect(done):
+            for future in done:
+                users = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.error(f"Precompute shard of {users} users failed: {e}")
+                    result = {"written": 0, "failed": users}
+                totals["written"] += result["written"]
+                totals["failed"] += result["failed"]
+
+        def submit(shard):
+            pending[pool.submit(precompute_shard, shard, month, year)] = len(shard)
+            totals["users"] += len(shard)
+
+        shard = []
+        cursor = db.users.find({"status": "approved"}, {"_id": 0, "id": 1}).batch_size(1000)
+        for user in cursor:
+            shard.append(user["id"])
+            if len(shard) < shard_size:
+                continue
+            # Keep a couple of shards per worker in flight, so the user stream
+            # is not read into memory ahead of the pool
+            if len(pending) >= workers * 2:
+                collect(wait(pending, return_when=FIRST_COMPLETED).done)
+            submit(shard)
+            shard = []
+        if shard:
+            submit(shard)
+        collect(wait(pending).done)
+
+    totals["seconds"] = round(time.monotonic() - started, 2)
+    totals["users_per_second"] = round(totals["users"] / totals["seconds"], 1) if totals["seconds"] else None
+    return totals
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    now = datetime.now(timezone.utc)
+    parser = argparse.ArgumentParser(description="Precompute dashboard analytics for all users")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=200, help="users per task handed to a worker")
+    parser.add_argument("--month", type=int, default=now.month)
+    parser.add_argument("--year", type=int, default=now.year)
+    args = parser.parse_args()
+
+    logging.info(f"Precomputing analytics for {args.month:02d}/{args.year} with {args.workers} workers")
+    totals = run(args.workers, args.shard_size, args.month, args.year)
+    logging.info(f"Precompute finished: {totals}")
+
+if __name__ == "__main__":
+    main()
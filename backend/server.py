@@ -1,25 +1,85 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, Response, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from motor.frameworks.asyncio import _EXECUTOR as motor_executor
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import OperationFailure
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, computed_field
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
 import uuid
-from datetime import datetime, timezone, timedelta
+import json
+import hashlib
+import hmac
+import base64
+import time
+import functools
+import random
+import calendar
+import re
+import unicodedata
+from datetime import date, datetime, timezone, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 import bcrypt
 import jwt
 import httpx
+import analytics_engine
+from mongo_instrumentation import MongoCommandMonitor, MongoStatsMiddleware, current_mongo_stats
+import metrics
+from loop_watchdog import LoopWatchdog, Stall
+import tracing
+import contextvars
+import cProfile
+import io
+import marshal
+import pstats
+from bson import Binary
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Mongo command instrumentation
+MONGO_ROUND_TRIP_BUDGET = int(os.environ.get('MONGO_ROUND_TRIP_BUDGET', 20))  # per request, before a warning
+# Re-encodes every reply to size it, which costs CPU per command: off unless profiling
+MONGO_MEASURE_REPLY_BYTES = os.environ.get('MONGO_MEASURE_REPLY_BYTES', 'false').lower() == 'true'
+
+# Metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /metrics; without one /metrics is off
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.environ.get('EVENT_LOOP_LAG_INTERVAL_SECONDS', 0.5))
+LOOP_STALL_THRESHOLD_MS = float(os.environ.get('LOOP_STALL_THRESHOLD_MS', 250))  # 0 disables the watchdog
+LOOP_WATCHDOG_INTERVAL_SECONDS = float(os.environ.get('LOOP_WATCHDOG_INTERVAL_SECONDS', 0.25))
+
+# On-demand profiling (admins sending X-Profile: 1)
+PROFILE_RETENTION_HOURS = int(os.environ.get('PROFILE_RETENTION_HOURS', 24))
+
+# Tracing
+TRACE_EXPORTER = os.environ.get('TRACE_EXPORTER', 'none')  # none, file or otlp
+TRACE_FILE = os.environ.get('TRACE_FILE', str(ROOT_DIR / 'traces.jsonl'))
+OTLP_ENDPOINT = os.environ.get('OTLP_ENDPOINT', 'http://localhost:4318')
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.1))  # share of new traces recorded
+# Internal peers (addresses or CIDR ranges) whose traceparent sampled flag is honoured
+TRACE_TRUSTED_PEERS = tracing.parse_networks(os.environ.get('TRACE_TRUSTED_PEERS', ''))
+# Hosts we run that outbound calls send traceparent to; third parties never get it
+TRACE_PROPAGATE_HOSTS = {h.strip().lower() for h in os.environ.get('TRACE_PROPAGATE_HOSTS', '').split(',') if h.strip()}
+
+tracer = tracing.build_tracer(TRACE_EXPORTER, TRACE_SAMPLE_RATE, "carfinancas-api",
+                              trace_file=TRACE_FILE, otlp_endpoint=OTLP_ENDPOINT)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_monitor = MongoCommandMonitor(measure_reply_bytes=MONGO_MEASURE_REPLY_BYTES)
+mongo_monitor.observers.append(metrics.observe_mongo_command)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[mongo_monitor, tracing.TracingCommandListener(tracer)])
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -29,6 +89,59 @@ if not JWT_SECRET:
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24 * 30  # 30 days for mobile app persistence
 
+# Response cache configuration
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', 300))
+
+# In-process analytics frames (see analytics_engine)
+ANALYTICS_FRAME_CACHE_MAX_BYTES = int(os.environ.get('ANALYTICS_FRAME_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# Delta sync configuration
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', 2))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 90))
+
+# Server-sent events configuration
+EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'memory')  # memory, mongo
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 25))
+SSE_COALESCE_SECONDS = float(os.environ.get('SSE_COALESCE_SECONDS', 0.25))
+# Lifetime of the tickets /api/events is opened with; only needs to cover connecting
+STREAM_TICKET_SECONDS = int(os.environ.get('STREAM_TICKET_SECONDS', 60))
+
+# Outbound HTTP configuration
+EMERGENT_AUTH_URL = os.environ.get(
+    'EMERGENT_AUTH_URL', 'https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data'
+)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+HTTP_MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', 100))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.environ.get('HTTP_MAX_CONNECTIONS_PER_HOST', 20))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', 0.2))
+
+# LLM configuration
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'emergent')  # emergent, fake
+FAKE_LLM_FIRST_TOKEN_MS = float(os.environ.get('FAKE_LLM_FIRST_TOKEN_MS', 300))
+FAKE_LLM_TOKEN_MS = float(os.environ.get('FAKE_LLM_TOKEN_MS', 30))
+CHAT_CONTEXT_CACHE_MAX_BYTES = int(os.environ.get('CHAT_CONTEXT_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+CHAT_HISTORY_WINDOW = int(os.environ.get('CHAT_HISTORY_WINDOW', 10))  # recent messages sent verbatim
+CHAT_SUMMARY_MAX_CHARS = int(os.environ.get('CHAT_SUMMARY_MAX_CHARS', 2000))
+CHAT_RETENTION_DAYS = int(os.environ.get('CHAT_RETENTION_DAYS', 365))  # since a session's last message
+CHAT_PURGE_INTERVAL_SECONDS = float(os.environ.get('CHAT_PURGE_INTERVAL_SECONDS', 3600))
+CHAT_TTL_GRACE_DAYS = 1  # the TTL index only drops sessions the purge has not reached by then
+LLM_CACHE_MAX_BYTES = int(os.environ.get('LLM_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get('LLM_CACHE_TTL_SECONDS', 600))
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 16))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.environ.get('LLM_MAX_CONCURRENCY_PER_USER', 2))
+LLM_MAX_QUEUE = int(os.environ.get('LLM_MAX_QUEUE', 64))
+LLM_MAX_WAIT_SECONDS = float(os.environ.get('LLM_MAX_WAIT_SECONDS', 10))
+LLM_CALL_TIMEOUT_SECONDS = float(os.environ.get('LLM_CALL_TIMEOUT_SECONDS', 60))
+
+# User deletion configuration
+DELETION_BATCH_SIZE = int(os.environ.get('DELETION_BATCH_SIZE', 500))
+DELETION_CONCURRENCY = int(os.environ.get('DELETION_CONCURRENCY', 3))  # collections purged at once
+DELETION_BATCH_PAUSE_SECONDS = float(os.environ.get('DELETION_BATCH_PAUSE_SECONDS', 0.05))
+DELETION_LEASE_SECONDS = int(os.environ.get('DELETION_LEASE_SECONDS', 60))
+
 # Create the main app
 app = FastAPI(
     title="CarFinanças API",
@@ -39,6 +152,74 @@ security = HTTPBearer()
 
 # ==================== MODELS ====================
 
+def utc_now_iso() -> str:
+    # Fixed precision keeps the strings sortable, which delta sync relies on
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+def to_cents(value) -> int:
+    """Reais to integer cents, rounding half away from zero"""
+    return int((Decimal(str(value or 0)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+def cents_of(field: str):
+    """Computed ``<field>_cents`` mirror of a reais amount. It is stored next
+    to the amount so Mongo pipelines can sum money exactly, while the API
+    keeps accepting and returning reais."""
+    return computed_field(property(lambda self: to_cents(getattr(self, field))), return_type=int)
+
+def money_cents(field: str) -> dict:
+    """Aggregation expression for a money field in cents; documents the cents
+    backfill has not reached yet fall back to rounding the reais value the way
+    ``to_cents`` does: in decimal, half away from zero ($round would round
+    half to even)"""
+    rounded = {"$let": {
+        "vars": {"cents": {"$multiply": [{"$toDecimal": f"${field}"}, 100]}},
+        "in": {"$multiply": [
+            {"$cond": [{"$lt": ["$$cents", 0]}, -1, 1]},
+            {"$floor": {"$add": [{"$abs": "$$cents"}, 0.5]}}
+        ]}
+    }}
+    return {"$ifNull": [f"${field}_cents", {"$toLong": rounded}]}
+
+def money_sum(field: str) -> dict:
+    return {"$sum": money_cents(field)}
+
+def doc_cents(doc: dict, field: str) -> int:
+    cents = doc.get(f"{field}_cents")
+    return cents if cents is not None else to_cents(doc.get(field, 0))
+
+def parse_day(*values) -> Optional[datetime]:
+    """The first non-empty ``YYYY-MM-DD`` string as a UTC datetime, or None"""
+    value = next((v for v in values if v), None)
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return None
+
+def period_field():
+    """Computed ``period`` (yyyymm) for records filed under a month/year,
+    so month ranges are a single index range instead of $or lists"""
+    return computed_field(property(lambda self: self.year * 100 + self.month), return_type=int)
+
+def day_field(*fields: str):
+    """Computed BSON date mirroring the first non-empty ISO date string field"""
+    return computed_field(
+        property(lambda self: parse_day(*(getattr(self, f) for f in fields))),
+        return_type=Optional[datetime]
+    )
+
+def fold_text(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text).strip()
+
+def user_search_fields(email: str, name: str) -> dict:
+    # Folded copies let the admin prefix search use an anchored, index-backed regex
+    return {"email_search": fold_text(email), "name_search": fold_text(name)}
+
 class UserBase(BaseModel):
     email: EmailStr
     name: str
@@ -66,6 +247,13 @@ class UserResponse(BaseModel):
     is_active: bool = True
     created_at: Optional[str] = None
 
+class AdminUserPage(BaseModel):
+    items: List[UserResponse]
+    total: int
+    page_size: int
+    next_cursor: Optional[str] = None
+    counts: Dict[str, int]
+
 class AdminCreateUser(BaseModel):
     name: str
     email: EmailStr
@@ -89,27 +277,34 @@ class Category(CategoryBase):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     is_default: bool = False
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 class IncomeBase(BaseModel):
     category_id: str
     description: Optional[str] = ""
     value: float
+    value_cents = cents_of("value")
     date: str
     payment_date: Optional[str] = None
     status: str = "pending"  # pending, received
     month: int
     year: int
+    period = period_field()
+    date_at = day_field("date")
+    paid_at = day_field("payment_date")
 
 class Income(IncomeBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 class ExpenseBase(BaseModel):
     category_id: str
     description: Optional[str] = ""
     value: float
+    value_cents = cents_of("value")
     date: str
     payment_method: str = "cash"  # cash, debit, credit
     credit_card_id: Optional[str] = None
@@ -120,16 +315,22 @@ class ExpenseBase(BaseModel):
     status: str = "pending"  # pending, paid
     month: int
     year: int
+    period = period_field()
+    date_at = day_field("date")
+    due_at = day_field("due_date", "date")
+    paid_at = day_field("payment_date")
 
 class Expense(ExpenseBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 class CreditCardBase(BaseModel):
     name: str
     limit: float
+    limit_cents = cents_of("limit")
     closing_day: int
     due_day: int
 
@@ -137,6 +338,7 @@ class CreditCard(CreditCardBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 class InvestmentBase(BaseModel):
     category_id: str
@@ -145,58 +347,75 @@ class InvestmentBase(BaseModel):
     contribution: float = 0
     dividends: float = 0
     withdrawal: float = 0
+    initial_balance_cents = cents_of("initial_balance")
+    contribution_cents = cents_of("contribution")
+    dividends_cents = cents_of("dividends")
+    withdrawal_cents = cents_of("withdrawal")
     month: int
     year: int
+    period = period_field()
 
 class Investment(InvestmentBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 class BudgetBase(BaseModel):
     category_id: str
     planned_value: float
+    planned_value_cents = cents_of("planned_value")
     month: int
     year: int
+    period = period_field()
     type: str  # income, expense
 
 class Budget(BudgetBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 # ==================== BENEFIT (VR/VA) MODELS ====================
 
 class BenefitCreditBase(BaseModel):
     benefit_type: str  # vr, va
     value: float
+    value_cents = cents_of("value")
     date: str
     description: Optional[str] = ""
     month: int
     year: int
+    period = period_field()
+    date_at = day_field("date")
 
 class BenefitCredit(BenefitCreditBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 class BenefitExpenseBase(BaseModel):
     benefit_type: str  # vr, va
     category: str  # restaurante, mercado, padaria, acougue, lanchonete, outros
     description: str
     value: float
+    value_cents = cents_of("value")
     date: str
     establishment: Optional[str] = ""  # nome do estabelecimento
     month: int
     year: int
+    period = period_field()
+    date_at = day_field("date")
 
 class BenefitExpense(BenefitExpenseBase):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=utc_now_iso)
 
 # ==================== RECURRING TRANSACTIONS MODELS ====================
 
@@ -205,6 +424,7 @@ class RecurringTransactionBase(BaseModel):
     category_id: str
     description: str
     value: float
+    value_cents = cents_of("value")
     frequency: str  # monthly, weekly, yearly
     start_date: str
     end_date: Optional[str] = None
@@ -227,6 +447,8 @@ class GoalBase(BaseModel):
     description: Optional[str] = None
     target_value: float
     current_value: float = 0
+    target_value_cents = cents_of("target_value")
+    current_value_cents = cents_of("current_value")
     deadline: Optional[str] = None
     category: str = "general"  # general, travel, emergency, car, house, education, other
     color: str = "#3B82F6"
@@ -238,6 +460,7 @@ class Goal(GoalBase):
     user_id: str
     is_completed: bool = False
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    updated_at: str = Field(default_factory=utc_now_iso)
     completed_at: Optional[str] = None
 
 class GoalContribution(BaseModel):
@@ -245,6 +468,7 @@ class GoalContribution(BaseModel):
     goal_id: str
     user_id: str
     value: float
+    value_cents = cents_of("value")
     date: str
     note: Optional[str] = None
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
@@ -279,13 +503,73 @@ class GoogleSessionData(BaseModel):
     picture: Optional[str] = None
     session_token: str
 
+# ==================== OUTBOUND HTTP ====================
+
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+class OutboundHTTP:
+    """Application-wide pooled HTTP client for calls to external services.
+    
+    Connections are kept alive between requests, each host gets a bounded
+    number of concurrent requests, and transient failures are retried with
+    jittered exponential backoff. Created on startup and closed on shutdown."""
+
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=30
+            )
+        )
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def request(self, method: str, url: str, retries: int = HTTP_RETRIES, **kwargs) -> httpx.Response:
+        host = httpx.URL(url).host
+        slots = self._host_slots.setdefault(host, asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST))
+        with tracer.span(f"HTTP {method}", kind="client", attributes={
+            "http.method": method, "http.url": url.split("?", 1)[0], "net.peer.name": host
+        }) as span:
+            if host.lower() in TRACE_PROPAGATE_HOSTS:
+                kwargs["headers"] = {**(kwargs.get("headers") or {}), "traceparent": span.traceparent}
+            for attempt in range(retries + 1):
+                try:
+                    async with slots:
+                        response = await self.client.request(method, url, **kwargs)
+                    if response.status_code not in RETRYABLE_STATUS_CODES or attempt == retries:
+                        span.set_attribute("http.status_code", response.status_code)
+                        span.set_attribute("http.retries", attempt)
+                        return response
+                    span.add_event("retry", {"http.status_code": response.status_code})
+                except httpx.TransportError as e:
+                    if attempt == retries:
+                        raise
+                    span.add_event("retry", {"error": type(e).__name__})
+                # Full jitter keeps retries from many requests from arriving in lockstep
+                await asyncio.sleep(random.uniform(0, HTTP_RETRY_BACKOFF * 2 ** attempt))
+
+outbound_http = OutboundHTTP()
+
 # ==================== AUTH HELPERS ====================
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# bcrypt is slow by design (a few hundred ms per call), so it runs in a
+# worker thread instead of stalling every other request on the loop
+
+async def hash_password(password: str) -> str:
+    hashed = await asyncio.to_thread(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+    return hashed.decode('utf-8')
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    return await asyncio.to_thread(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
 
 def create_token(user_id: str, role: str) -> str:
     payload = {
@@ -295,16 +579,42 @@ def create_token(user_id: str, role: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def decode_token(token: str) -> dict:
+def create_stream_ticket(user_id: str) -> str:
+    """Short-lived token good only for opening the event stream. It travels
+    in the URL (EventSource cannot send headers), where it may be logged, so
+    it must not be the session token."""
+    payload = {
+        "user_id": user_id,
+        "purpose": "events",
+        "exp": datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_SECONDS)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def decode_token(token: str, purpose: Optional[str] = None) -> dict:
+    """Claims of a valid token issued for ``purpose`` (None: a session token)"""
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("purpose") != purpose:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    payload = decode_token(credentials.credentials)
+    return await load_user_from_token(credentials.credentials)
+
+async def get_stream_user(ticket: Optional[str] = None) -> dict:
+    """The user of an event stream, from the ``?ticket=`` POST /events/ticket
+    issued: browser EventSource connections cannot send an Authorization
+    header, and session tokens are never accepted in URLs"""
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await load_user_from_token(ticket, purpose="events")
+
+async def load_user_from_token(token: str, purpose: Optional[str] = None) -> dict:
+    payload = decode_token(token, purpose)
     user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0, "password": 0})
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -318,10 +628,149 @@ async def get_admin_user(credentials: HTTPAuthorizationCredentials = Depends(sec
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
+# ==================== DATA VERSIONS & RESPONSE CACHE ====================
+
+class DataVersionStore:
+    """Per-user write counters. Every handler that changes user data bumps the
+    user's version (and the version of each collection it touched), which
+    invalidates anything derived from the previous state."""
+
+    def __init__(self):
+        # Versions restart from zero with the process; the epoch keeps tokens
+        # derived from them (e.g. ETags) from colliding across restarts
+        self.epoch = uuid.uuid4().hex
+        self._versions: Dict[str, Dict[str, int]] = {}
+        self.listeners = []
+
+    def get(self, user_id: str, collection: Optional[str] = None) -> int:
+        versions = self._versions.get(user_id)
+        if not versions:
+            return 0
+        return versions.get(collection or "*", 0)
+
+    def bump(self, user_id: str, *collections: str) -> int:
+        versions = self._versions.setdefault(user_id, {"*": 0})
+        versions["*"] += 1
+        for collection in collections:
+            versions[collection] = versions.get(collection, 0) + 1
+        for listener in self.listeners:
+            listener(user_id, versions["*"], collections)
+        return versions["*"]
+
+class ResponseCache:
+    """LRU of rendered JSON bodies keyed by (user, endpoint, params).
+
+    Entries are stamped with the user's data version when stored and are only
+    served while that version is still current, so a write never has to find
+    and delete the entries it made stale. The total size of cached bodies is
+    kept under ``max_bytes`` by evicting the least recently used entries."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[int, float, bytes]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple, version: int) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry_version, expires_at, body = entry
+            if entry_version == version and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+            self._discard(key)
+        self.misses += 1
+        return None
+
+    def put(self, key: Tuple, version: int, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (version, time.monotonic() + self.ttl_seconds, body)
+        self.size_bytes += len(body)
+        while self.size_bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _discard(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry[2])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else 0
+        }
+
+data_versions = DataVersionStore()
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS)
+
+def cached_response(endpoint: str):
+    """Serve a read-only, per-user endpoint from ``response_cache``.
+
+    The handler must take the authenticated user as ``user``; every other
+    argument is a query parameter and becomes part of the cache key."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            user_id = kwargs["user"]["id"]
+            params = tuple(sorted((k, v) for k, v in kwargs.items() if k != "user"))
+            key = (user_id, endpoint, params)
+            # Read the version before computing so a concurrent write can only
+            # make the stored entry stale, never make stale data look current
+            version = data_versions.get(user_id)
+            body = response_cache.get(key, version)
+            if body is None:
+                result = await func(*args, **kwargs)
+                body = json.dumps(
+                    jsonable_encoder(result), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+                ).encode("utf-8")
+                response_cache.put(key, version, body)
+            return Response(content=body, media_type="application/json")
+        return wrapper
+    return decorator
+
+def collection_etag(*collections: str):
+    """Dependency that answers conditional GETs for endpoints whose output
+    depends only on the given collections and the query string.
+
+    The strong ETag is derived from the user's per-collection versions, so a
+    matching ``If-None-Match`` is answered with 304 before the handler runs
+    and without touching the database."""
+    async def dependency(request: Request, response: Response, user: dict = Depends(get_current_user)):
+        versions = ",".join(f"{c}:{data_versions.get(user['id'], c)}" for c in collections)
+        query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        raw = f"{data_versions.epoch}|{user['id']}|{request.url.path}|{query}|{versions}"
+        etag = f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+        
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            candidates = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+            if etag in candidates or "*" in candidates:
+                raise HTTPException(status_code=304, headers={"ETag": etag})
+        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+    return dependency
+
 # ==================== STARTUP ====================
 
 @app.on_event("startup")
 async def startup():
+    await outbound_http.start()
+    
     # Create default admin if not exists
     admin_email = os.environ.get('ADMIN_EMAIL', 'admin@lpfinancas.com')
     admin_password = os.environ.get('ADMIN_PASSWORD', 'AdminLP@2024')
@@ -334,12 +783,140 @@ async def startup():
             status="approved"
         )
         admin_dict = admin_user.model_dump()
-        admin_dict["password"] = hash_password(admin_password)
+        admin_dict["password"] = await hash_password(admin_password)
+        admin_dict.update(user_search_fields(admin_user.email, admin_user.name))
         await db.users.insert_one(admin_dict)
         logging.info(f"Admin user created: {admin_email}")
         
         # Create default categories for admin
         await create_default_categories(admin_user.id)
+    
+    await ensure_sync_indexes()
+    await ensure_chat_indexes()
+    await ensure_user_indexes()
+    await ensure_deletion_indexes()
+    await ensure_transaction_indexes()
+    await ensure_analytics_indexes()
+    await ensure_profile_indexes()
+    await run_migration("sync_updated_at_backfill", backfill_sync_updated_at)
+    await run_migration("sync_updated_at_normalize", normalize_sync_updated_at)
+    await run_migration("chat_sessions_backfill", backfill_chat_sessions)
+    await run_migration("users_search_backfill", backfill_user_search_fields)
+    
+    await resume_deletion_jobs()
+    # Large collections: backfill cents off the startup path; rollups fall back meanwhile
+    run_in_background(run_migration("money_cents_backfill", backfill_money_cents))
+    run_in_background(run_migration("transaction_dates_backfill", backfill_transaction_dates))
+    
+    if EVENTS_BACKEND == "mongo":
+        app.state.change_stream_task = asyncio.create_task(watch_mongo_changes())
+    app.state.loop_lag_task = asyncio.create_task(measure_event_loop_lag())
+    app.state.chat_purge_task = asyncio.create_task(purge_expired_chats_periodically())
+    if LOOP_STALL_THRESHOLD_MS > 0:
+        app.state.loop_watchdog = LoopWatchdog(
+            asyncio.get_running_loop(),
+            threshold=LOOP_STALL_THRESHOLD_MS / 1000,
+            interval=LOOP_WATCHDOG_INTERVAL_SECONDS,
+            on_stall=report_loop_stall,
+            app_root=str(ROOT_DIR)
+        )
+        app.state.loop_watchdog.start()
+
+# Migrations this process has seen finish; queries that depend on backfilled
+# fields check here and use a slower fallback until then
+completed_migrations = set()
+
+async def run_migration(name: str, migrate):
+    """Run a data migration once per database; completion is recorded in the
+    ``migrations`` collection. Migrations must be idempotent, since a crash
+    before the marker is written makes the next startup run them again."""
+    if not await db.migrations.find_one({"name": name}):
+        await migrate()
+        await db.migrations.insert_one({"name": name, "completed_at": datetime.now(timezone.utc).isoformat()})
+        logging.info(f"Migration completed: {name}")
+    completed_migrations.add(name)
+
+async def ensure_user_indexes():
+    await db.users.create_index("id")
+    await db.users.create_index("email")
+    await db.users.create_index([("created_at", -1), ("id", -1)])
+    await db.users.create_index([("status", 1), ("created_at", -1), ("id", -1)])
+    await db.users.create_index([("role", 1), ("created_at", -1), ("id", -1)])
+    await db.users.create_index([("email", 1), ("id", 1)])
+    await db.users.create_index([("name", 1), ("id", 1)])
+    await db.users.create_index("email_search")
+    await db.users.create_index("name_search")
+
+async def backfill_user_search_fields(batch_size: int = 1000):
+    cursor = db.users.find({"name_search": {"$exists": False}}, {"_id": 0, "id": 1, "email": 1, "name": 1})
+    ops = []
+    async for user in cursor:
+        ops.append(UpdateOne({"id": user["id"]}, {"$set": user_search_fields(user.get("email", ""), user.get("name", ""))}))
+        if len(ops) >= batch_size:
+            await db.users.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await db.users.bulk_write(ops, ordered=False)
+
+MONEY_FIELDS = {
+    "incomes": ("value",),
+    "expenses": ("value",),
+    "credit_cards": ("limit",),
+    "investments": ("initial_balance", "contribution", "dividends", "withdrawal"),
+    "budgets": ("planned_value",),
+    "benefit_credits": ("value",),
+    "benefit_expenses": ("value",),
+    "recurring_transactions": ("value",),
+    "goals": ("target_value", "current_value"),
+    "goal_contributions": ("value",)
+}
+
+async def backfill_money_cents(batch_size: int = 1000):
+    """Add ``<field>_cents`` to documents written before amounts were mirrored in cents"""
+    for collection, fields in MONEY_FIELDS.items():
+        missing = {"$or": [{f"{field}_cents": {"$exists": False}} for field in fields]}
+        while True:
+            docs = await db[collection].find(missing, {"_id": 1, **{field: 1 for field in fields}}).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            await db[collection].bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": {f"{field}_cents": to_cents(doc.get(field)) for field in fields}})
+                for doc in docs
+            ], ordered=False)
+            await asyncio.sleep(0)
+
+PERIOD_COLLECTIONS = ("incomes", "expenses", "investments", "budgets", "benefit_credits", "benefit_expenses")
+
+def transaction_dates(collection: str, doc: dict) -> dict:
+    """The fields period_field/day_field compute, derived from a stored document"""
+    fields = {"period": doc["year"] * 100 + doc["month"] if doc.get("year") and doc.get("month") else None}
+    if collection in ("incomes", "expenses", "benefit_credits", "benefit_expenses"):
+        fields["date_at"] = parse_day(doc.get("date"))
+    if collection in ("incomes", "expenses"):
+        fields["paid_at"] = parse_day(doc.get("payment_date"))
+    if collection == "expenses":
+        fields["due_at"] = parse_day(doc.get("due_date"), doc.get("date"))
+    return fields
+
+async def backfill_transaction_dates(batch_size: int = 1000):
+    projection = {"_id": 1, "year": 1, "month": 1, "date": 1, "payment_date": 1, "due_date": 1}
+    for collection in PERIOD_COLLECTIONS:
+        while True:
+            docs = await db[collection].find({"period": {"$exists": False}}, projection).limit(batch_size).to_list(batch_size)
+            if not docs:
+                break
+            await db[collection].bulk_write([
+                UpdateOne({"_id": doc["_id"]}, {"$set": transaction_dates(collection, doc)}) for doc in docs
+            ], ordered=False)
+            await asyncio.sleep(0)
+
+async def ensure_transaction_indexes():
+    for collection in PERIOD_COLLECTIONS:
+        await db[collection].create_index([("user_id", 1), ("period", 1)])
+    await db.expenses.create_index([("user_id", 1), ("status", 1), ("due_at", 1)])
+    await db.expenses.create_index([("user_id", 1), ("credit_card_id", 1), ("period", 1)])
+    for collection in ("incomes", "expenses", "benefit_credits", "benefit_expenses"):
+        await db[collection].create_index([("user_id", 1), ("date_at", 1)])
 
 async def create_default_categories(user_id: str):
     default_categories = [
@@ -385,7 +962,8 @@ async def register(user_data: UserCreate):
         status="pending"
     )
     user_dict = user.model_dump()
-    user_dict["password"] = hash_password(user_data.password)
+    user_dict["password"] = await hash_password(user_data.password)
+    user_dict.update(user_search_fields(user.email, user.name))
     await db.users.insert_one(user_dict)
     
     # Create default categories for new user
@@ -396,7 +974,7 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=dict)
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or user["status"] == "deleted" or not await verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     if user["status"] == "pending":
@@ -427,27 +1005,26 @@ async def google_auth_session(data: GoogleAuthSession, response: Response):
     """Process Google OAuth session_id from Emergent Auth"""
     try:
         # Call Emergent Auth to get session data
-        async with httpx.AsyncClient() as client:
-            result = await client.get(
-                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-                headers={"X-Session-ID": data.session_id},
-                timeout=30.0
-            )
-            
-            if result.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid session")
-            
-            session_data = result.json()
+        result = await outbound_http.request(
+            "GET", EMERGENT_AUTH_URL, headers={"X-Session-ID": data.session_id}
+        )
+        
+        if result.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid session")
+        
+        session_data = result.json()
         
         # Check if user already exists
         existing_user = await db.users.find_one({"email": session_data["email"]})
         
         if existing_user:
             # Update existing user with Google data
+            name = session_data.get("name", existing_user["name"])
             await db.users.update_one(
                 {"email": session_data["email"]},
                 {"$set": {
-                    "name": session_data.get("name", existing_user["name"]),
+                    "name": name,
+                    "name_search": fold_text(name),
                     "picture": session_data.get("picture"),
                     "google_id": session_data.get("id")
                 }}
@@ -469,6 +1046,7 @@ async def google_auth_session(data: GoogleAuthSession, response: Response):
                 "is_active": True,
                 "created_at": datetime.now(timezone.utc).isoformat()
             }
+            new_user.update(user_search_fields(new_user["email"], new_user["name"]))
             await db.users.insert_one(new_user)
             
             # Create default categories for new user
@@ -478,7 +1056,7 @@ async def google_auth_session(data: GoogleAuthSession, response: Response):
             status = "approved"
         
         # Check if blocked
-        if status == "blocked":
+        if status in ("blocked", "deleted"):
             raise HTTPException(status_code=403, detail="Account blocked")
         
         # Create JWT token
@@ -536,14 +1114,72 @@ async def logout(response: Response, user: dict = Depends(get_current_user)):
 
 # ==================== ADMIN ROUTES ====================
 
-@api_router.get("/admin/users", response_model=List[UserResponse])
-async def list_all_users(admin: dict = Depends(get_admin_user)):
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    # Garantir que is_active existe
-    for user in users:
-        if 'is_active' not in user:
-            user['is_active'] = True
-    return users
+USER_STATUSES = ("pending", "approved", "blocked")
+USER_SORT_FIELDS = ("created_at", "email", "name")
+
+def encode_page_cursor(value, doc_id: str) -> str:
+    """Position after the last item of a page: its sort value and id"""
+    raw = json.dumps({"v": value, "id": doc_id}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_page_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return data["v"], data["id"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@api_router.get("/admin/users", response_model=AdminUserPage)
+async def list_all_users(
+    cursor: Optional[str] = None,
+    page_size: int = Query(50, ge=1, le=200),
+    sort: str = "-created_at",
+    status: Optional[str] = None,
+    role: Optional[str] = None,
+    q: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """One page of users, newest first by default. ``sort`` is a field name,
+    prefixed with ``-`` for descending; ``q`` matches the start of the
+    e-mail or name, ignoring case and accents. Pass the ``next_cursor`` of a
+    page to get the one after it: pages start from the last item seen, so
+    deep pages cost the same as the first."""
+    sort_field = sort.lstrip("-")
+    if sort_field not in USER_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(USER_SORT_FIELDS)}")
+    direction = -1 if sort.startswith("-") else 1
+    
+    query = {}
+    # Users being deleted stay in the collection until their purge job finishes
+    query["status"] = status or {"$ne": "deleted"}
+    if role:
+        query["role"] = role
+    if q and fold_text(q):
+        prefix = {"$regex": f"^{re.escape(fold_text(q))}"}
+        query["$or"] = [{"email_search": prefix}, {"name_search": prefix}]
+    page_query = query
+    if cursor:
+        last_value, last_id = decode_page_cursor(cursor)
+        after = "$lt" if direction == -1 else "$gt"
+        page_query = {"$and": [query, {"$or": [
+            {sort_field: {after: last_value}},
+            {sort_field: last_value, "id": {after: last_id}}
+        ]}]}
+    
+    users = db.users.find(page_query, {"_id": 0, "password": 0, "email_search": 0, "name_search": 0})
+    users = users.sort([(sort_field, direction), ("id", direction)]).limit(page_size + 1)
+    items, total, *status_counts = await asyncio.gather(
+        users.to_list(page_size + 1),
+        db.users.count_documents(query),
+        *[db.users.count_documents({"status": s}) for s in USER_STATUSES]
+    )
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_page_cursor(items[-1].get(sort_field), items[-1]["id"])
+    counts = dict(zip(USER_STATUSES, status_counts))
+    counts["total"] = sum(status_counts)
+    return {"items": items, "total": total, "page_size": page_size, "next_cursor": next_cursor, "counts": counts}
 
 @api_router.post("/admin/users", response_model=UserResponse)
 async def admin_create_user(data: AdminCreateUser, admin: dict = Depends(get_admin_user)):
@@ -553,34 +1189,35 @@ async def admin_create_user(data: AdminCreateUser, admin: dict = Depends(get_adm
         raise HTTPException(status_code=400, detail="Email já cadastrado")
     
     # Hash da senha
-    hashed_password = bcrypt.hashpw(data.password.encode('utf-8'), bcrypt.gensalt())
+    hashed_password = await hash_password(data.password)
     
     user_id = str(uuid.uuid4())
     user = {
         "id": user_id,
         "email": data.email,
         "name": data.name,
-        "password": hashed_password.decode('utf-8'),
+        "password": hashed_password,
         "role": data.role,
         "status": "approved",
         "is_active": True,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **user_search_fields(data.email, data.name)
     }
     
     await db.users.insert_one(user)
     
     # Criar categorias padrão para o novo usuário
     default_categories = [
-        {"name": "Salário", "type": "income", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Freelance", "type": "income", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Alimentação", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Transporte", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Moradia", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Lazer", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Saúde", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Educação", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Renda Fixa", "type": "investment", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
-        {"name": "Ações", "type": "investment", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True},
+        {"name": "Salário", "type": "income", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Freelance", "type": "income", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Alimentação", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Transporte", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Moradia", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Lazer", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Saúde", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Educação", "type": "expense", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Renda Fixa", "type": "investment", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
+        {"name": "Ações", "type": "investment", "user_id": user_id, "id": str(uuid.uuid4()), "is_default": True, "updated_at": utc_now_iso()},
     ]
     if default_categories:
         await db.categories.insert_many(default_categories)
@@ -600,63 +1237,366 @@ async def admin_update_user(user_id: str, data: AdminUpdateUser, admin: dict = D
     update_data = {}
     if data.name is not None:
         update_data["name"] = data.name
+        update_data["name_search"] = fold_text(data.name)
     if data.email is not None:
         # Verificar se email já existe em outro usuário
         existing = await db.users.find_one({"email": data.email, "id": {"$ne": user_id}})
         if existing:
             raise HTTPException(status_code=400, detail="Email já está em uso")
         update_data["email"] = data.email
+        update_data["email_search"] = fold_text(data.email)
     if data.password is not None:
-        update_data["password"] = hash_password(data.password)
+        update_data["password"] = await hash_password(data.password)
     if data.is_active is not None:
         update_data["is_active"] = data.is_active
     if data.role is not None:
         update_data["role"] = data.role
     if data.status is not None:
+        if data.status == "deleted":
+            # Deletion purges the user's data; it goes through DELETE /admin/users/{id}
+            raise HTTPException(status_code=400, detail="Use a exclusão de usuário para excluir")
         update_data["status"] = data.status
     
     if not update_data:
         raise HTTPException(status_code=400, detail="Nenhum dado para atualizar")
     
-    result = await db.users.update_one({"id": user_id}, {"$set": update_data})
+    result = await db.users.update_one({"id": user_id, "status": {"$ne": "deleted"}}, {"$set": update_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     return {"message": "Usuário atualizado com sucesso"}
 
 @api_router.patch("/admin/users/{user_id}/approve")
 async def approve_user(user_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.users.update_one({"id": user_id}, {"$set": {"status": "approved"}})
+    result = await db.users.update_one({"id": user_id, "status": {"$ne": "deleted"}}, {"$set": {"status": "approved"}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User approved"}
 
 @api_router.patch("/admin/users/{user_id}/block")
 async def block_user(user_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.users.update_one({"id": user_id}, {"$set": {"status": "blocked"}})
+    result = await db.users.update_one({"id": user_id, "status": {"$ne": "deleted"}}, {"$set": {"status": "blocked"}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User blocked"}
 
-@api_router.delete("/admin/users/{user_id}")
+@api_router.delete("/admin/users/{user_id}", status_code=202)
 async def delete_user(user_id: str, admin: dict = Depends(get_admin_user)):
-    result = await db.users.delete_one({"id": user_id})
-    if result.deleted_count == 0:
+    """Mark the user deleted (which revokes access at once) and purge their
+    data in a background job; progress is at /admin/deletion-jobs/{job_id}"""
+    now = datetime.now(timezone.utc)
+    result = await db.users.update_one(
+        {"id": user_id, "status": {"$ne": "deleted"}},
+        {"$set": {"status": "deleted", "deleted_at": now.isoformat()}}
+    )
+    if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
-    # Delete user data
-    await db.categories.delete_many({"user_id": user_id})
-    await db.incomes.delete_many({"user_id": user_id})
-    await db.expenses.delete_many({"user_id": user_id})
-    await db.investments.delete_many({"user_id": user_id})
-    await db.budgets.delete_many({"user_id": user_id})
-    await db.credit_cards.delete_many({"user_id": user_id})
-    await db.benefit_credits.delete_many({"user_id": user_id})
-    await db.benefit_expenses.delete_many({"user_id": user_id})
-    await db.recurring_transactions.delete_many({"user_id": user_id})
-    return {"message": "User and all data deleted"}
+    
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "requested_by": admin["id"],
+        "status": "pending",
+        "deleted": {collection: 0 for collection in USER_OWNED_COLLECTIONS},
+        "remaining": list(USER_OWNED_COLLECTIONS),
+        "lease_until": None,
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat()
+    }
+    await db.deletion_jobs.insert_one(job)
+    run_in_background(run_deletion_job(job["id"]))
+    return {"message": "User deleted; data purge started", "job_id": job["id"]}
+
+@api_router.get("/admin/deletion-jobs")
+async def list_deletion_jobs(admin: dict = Depends(get_admin_user)):
+    """The 20 most recent deletion jobs"""
+    return await db.deletion_jobs.find({}, {"_id": 0, "lease_until": 0}).sort("created_at", -1).limit(20).to_list(20)
+
+@api_router.get("/admin/deletion-jobs/{job_id}")
+async def get_deletion_job(job_id: str, admin: dict = Depends(get_admin_user)):
+    job = await db.deletion_jobs.find_one({"id": job_id}, {"_id": 0, "lease_until": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return job
+
+# ==================== USER DELETION JOBS ====================
+
+USER_OWNED_COLLECTIONS = (
+    "categories", "incomes", "expenses", "investments", "budgets", "credit_cards",
+    "benefit_credits", "benefit_expenses", "recurring_transactions", "goals", "goal_contributions",
+    "chat_messages", "chat_sessions", "chat_summaries", "notification_tokens", "user_sessions",
+    "sync_tombstones", "precomputed_analytics", "request_profiles"
+)
+
+async def claim_deletion_job(job_id: str) -> Optional[dict]:
+    """Take (or renew) the job's lease so only one worker purges it at a time"""
+    now = datetime.now(timezone.utc)
+    return await db.deletion_jobs.find_one_and_update(
+        {
+            "id": job_id,
+            "status": {"$in": ["pending", "running"]},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+        },
+        {"$set": {
+            "status": "running",
+            "lease_until": now + timedelta(seconds=DELETION_LEASE_SECONDS),
+            "updated_at": now.isoformat()
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def purge_collection(job_id: str, user_id: str, collection: str):
+    # Small batches with a pause in between keep the purge from monopolising the primary
+    while True:
+        batch = await db[collection].find({"user_id": user_id}, {"_id": 1}).limit(DELETION_BATCH_SIZE).to_list(DELETION_BATCH_SIZE)
+        if not batch:
+            break
+        result = await db[collection].delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+        await db.deletion_jobs.update_one(
+            {"id": job_id},
+            {
+                "$inc": {f"deleted.{collection}": result.deleted_count},
+                "$set": {
+                    "lease_until": datetime.now(timezone.utc) + timedelta(seconds=DELETION_LEASE_SECONDS),
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }
+            }
+        )
+        await asyncio.sleep(DELETION_BATCH_PAUSE_SECONDS)
+    await db.deletion_jobs.update_one({"id": job_id}, {"$pull": {"remaining": collection}})
+
+async def run_deletion_job(job_id: str):
+    """Purge every collection still listed in the job's ``remaining``, a few
+    at a time, then drop the user document. Safe to re-run after a crash:
+    finished collections are skipped and unfinished ones simply continue."""
+    job = await claim_deletion_job(job_id)
+    if not job:
+        return
+    
+    slots = asyncio.Semaphore(DELETION_CONCURRENCY)
+    
+    async def purge(collection: str):
+        async with slots:
+            await purge_collection(job_id, job["user_id"], collection)
+    
+    try:
+        await asyncio.gather(*[purge(c) for c in job["remaining"]])
+        await db.users.delete_one({"id": job["user_id"], "status": "deleted"})
+        await db.deletion_jobs.update_one(
+            {"id": job_id},
+            {"$set": {
+                "status": "completed",
+                "lease_until": None,
+                "completed_at": datetime.now(timezone.utc).isoformat(),
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        logging.info(f"User {job['user_id']} purged (deletion job {job_id})")
+    except Exception as e:
+        # Released so the next startup (or another worker) picks the job up again
+        logging.error(f"Deletion job {job_id} failed: {e}")
+        await db.deletion_jobs.update_one(
+            {"id": job_id},
+            {"$set": {"lease_until": None, "error": str(e), "updated_at": datetime.now(timezone.utc).isoformat()}}
+        )
+
+async def resume_deletion_jobs():
+    jobs = await db.deletion_jobs.find({"status": {"$in": ["pending", "running"]}}, {"_id": 0, "id": 1}).to_list(None)
+    for job in jobs:
+        run_in_background(run_deletion_job(job["id"]))
+
+async def ensure_deletion_indexes():
+    await db.deletion_jobs.create_index("id", unique=True)
+    await db.deletion_jobs.create_index([("status", 1), ("created_at", -1)])
+    # Collections not already indexed by a user_id-prefixed index elsewhere
+    for collection in ("recurring_transactions", "goal_contributions", "notification_tokens", "user_sessions"):
+        await db[collection].create_index("user_id")
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Hit-rate and memory usage of the in-process caches"""
+    return {
+        "responses": response_cache.stats(),
+        "chat_context": chat_context_cache.stats(),
+        "llm_responses": llm_response_cache.stats(),
+        "analytics_frames": frame_cache.stats()
+    }
+
+@api_router.get("/admin/llm/stats")
+async def get_llm_stats(admin: dict = Depends(get_admin_user)):
+    """Queue depth, admission counters, wait time and call latency of the LLM gateway"""
+    return llm.stats()
+
+# ==================== DATE RANGES ====================
+
+def shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+def period_filter(start: Tuple[int, int], end: Tuple[int, int]) -> dict:
+    """Filter for records filed between two (year, month) pairs, inclusive.
+    A single range on ``period`` once the backfill has run; until then an
+    $or of the individual months."""
+    if "transaction_dates_backfill" in completed_migrations:
+        return {"period": {"$gte": start[0] * 100 + start[1], "$lte": end[0] * 100 + end[1]}}
+    months = []
+    current = start
+    while current <= end:
+        months.append({"year": current[0], "month": current[1]})
+        current = shift_month(*current, 1)
+    return {"$or": months}
+
+def expense_due_day(expense: dict):
+    """Due date of an expense (falling back to its date), or None"""
+    due_at = expense.get("due_at") or parse_day(expense.get("due_date"), expense.get("date"))
+    return due_at.date() if due_at else None
+
+GRANULARITIES = ("day", "week", "month")
+SERIES_MAX_BUCKETS = int(os.environ.get('SERIES_MAX_BUCKETS', 400))  # per series, whatever the granularity
+
+class DateRange(NamedTuple):
+    """Inclusive range of days taken from the ``from``/``to`` query
+    parameters; ``daily`` is False when both bounds were whole months"""
+    start: date
+    end: date
+    daily: bool
+
+    def filter(self, dated: bool = True) -> dict:
+        """Query clause for records in the range. Day bounds match dated
+        records on their date; month bounds, and records without a date,
+        match on the month they are filed under."""
+        if self.daily and dated:
+            return self.day_filter()
+        return period_filter((self.start.year, self.start.month), (self.end.year, self.end.month))
+
+    def day_filter(self) -> dict:
+        """Records dated within the range, on ``date_at`` (the ISO ``date``
+        string until the backfill has run)"""
+        if "transaction_dates_backfill" in completed_migrations:
+            # date_at is midnight UTC of the record's day
+            start = datetime.combine(self.start, datetime.min.time(), tzinfo=timezone.utc)
+            end = datetime.combine(self.end, datetime.min.time(), tzinfo=timezone.utc)
+            return {"date_at": {"$gte": start, "$lte": end}}
+        return {"date": {"$gte": self.start.isoformat(), "$lte": self.end.isoformat()}}
+
+def parse_range_bound(value: str, name: str, last_day: bool) -> Tuple[date, bool]:
+    """A ``YYYY-MM-DD`` day, or the first/last day of a ``YYYY-MM``/``YYYYMM`` period"""
+    try:
+        if len(value) == 10:
+            return datetime.strptime(value, "%Y-%m-%d").date(), True
+        digits = value.replace("-", "")
+        if len(digits) == 6 and digits.isdigit():
+            year, month = int(digits[:4]), int(digits[4:])
+            if not last_day:
+                return date(year, month, 1), False
+            return date(year, month, calendar.monthrange(year, month)[1]), False
+    except ValueError:
+        pass
+    raise HTTPException(status_code=400, detail=f"{name} must be a date (YYYY-MM-DD) or a period (YYYY-MM)")
+
+def date_range(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None
+) -> Optional[DateRange]:
+    """Dependency for the optional ``from``/``to`` filter"""
+    if from_ is None and to is None:
+        return None
+    if not from_ or not to:
+        raise HTTPException(status_code=400, detail="from and to must be given together")
+    start, start_daily = parse_range_bound(from_, "from", last_day=False)
+    end, end_daily = parse_range_bound(to, "to", last_day=True)
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    return DateRange(start, end, start_daily or end_daily)
+
+def required_date_range(period: Optional[DateRange] = Depends(date_range)) -> DateRange:
+    if period is None:
+        raise HTTPException(status_code=400, detail="from and to are required")
+    return period
+
+def month_or_range(month: Optional[int], year: Optional[int], period: Optional[DateRange], dated: bool = True) -> dict:
+    """Filter for summary endpoints that take either month/year or from/to"""
+    if period:
+        return period.filter(dated)
+    if month is None or year is None:
+        raise HTTPException(status_code=400, detail="month and year, or from and to, are required")
+    return {"month": month, "year": year}
+
+def range_fields(period: Optional[DateRange]) -> dict:
+    return {"from": period.start.isoformat(), "to": period.end.isoformat()} if period else {}
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    return day.replace(day=1)
+
+def range_buckets(period: DateRange, granularity: str) -> List[date]:
+    """Start day of every bucket overlapping the range, so empty ones are
+    reported too; 400 when there would be more than SERIES_MAX_BUCKETS"""
+    first, last = bucket_start(period.start, granularity), bucket_start(period.end, granularity)
+    if granularity == "month":
+        count = (last.year - first.year) * 12 + last.month - first.month + 1
+    else:
+        count = (last - first).days // (1 if granularity == "day" else 7) + 1
+    if count > SERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range too long for granularity {granularity}: at most {SERIES_MAX_BUCKETS} buckets"
+        )
+    
+    # Stepping stops at the last bucket, never past it, so ranges ending in
+    # year 9999 do not overflow
+    buckets = [first]
+    while buckets[-1] < last:
+        current = buckets[-1]
+        if granularity == "month":
+            buckets.append(date(*shift_month(current.year, current.month, 1), 1))
+        else:
+            buckets.append(current + timedelta(days=1 if granularity == "day" else 7))
+    return buckets
+
+def series_scope(period: DateRange, granularity: str) -> Tuple[dict, bool]:
+    """Filter of a series and whether it buckets by date. Day and week
+    buckets, and month buckets over day bounds, go by each record's date;
+    month buckets over month bounds go by the month records are filed
+    under. Filtering and bucketing on the same field puts every matched
+    record in a bucket of the range."""
+    by_date = granularity != "month" or period.daily
+    return (period.day_filter() if by_date else period.filter()), by_date
+
+async def bucket_totals(collection: str, match: dict, granularity: str, split: Optional[str] = None,
+                        by_date: bool = True) -> Dict[Tuple[date, Any], int]:
+    """Cents per (bucket, value of ``split``) for the matching records. Mongo
+    groups by filing month or by day; days are then folded into weeks or months."""
+    key = {"date": "$date"} if by_date else {"year": "$year", "month": "$month"}
+    if split:
+        key["split"] = f"${split}"
+    rows = await db[collection].aggregate([
+        {"$match": match},
+        {"$group": {"_id": key, "cents": money_sum("value")}}
+    ]).to_list(None)
+    
+    totals = {}
+    for row in rows:
+        if not by_date:
+            day = date(row["_id"]["year"], row["_id"]["month"], 1)
+        else:
+            parsed = parse_day(row["_id"].get("date"))
+            if not parsed:
+                continue
+            day = parsed.date()
+        bucket = (bucket_start(day, granularity), row["_id"].get("split"))
+        totals[bucket] = totals.get(bucket, 0) + row["cents"]
+    return totals
+
+def check_granularity(granularity: str):
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
 
 # ==================== CATEGORIES ROUTES ====================
 
-@api_router.get("/categories", response_model=List[Category])
+@api_router.get("/categories", response_model=List[Category], dependencies=[Depends(collection_etag("categories"))])
 async def get_categories(user: dict = Depends(get_current_user)):
     categories = await db.categories.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
     return categories
@@ -665,16 +1605,18 @@ async def get_categories(user: dict = Depends(get_current_user)):
 async def create_category(data: CategoryBase, user: dict = Depends(get_current_user)):
     category = Category(**data.model_dump(), user_id=user["id"])
     await db.categories.insert_one(category.model_dump())
+    data_versions.bump(user["id"], "categories")
     return category
 
 @api_router.put("/categories/{category_id}", response_model=Category)
 async def update_category(category_id: str, data: CategoryBase, user: dict = Depends(get_current_user)):
     result = await db.categories.update_one(
         {"id": category_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    data_versions.bump(user["id"], "categories")
     return await db.categories.find_one({"id": category_id}, {"_id": 0})
 
 @api_router.delete("/categories/{category_id}")
@@ -682,17 +1624,26 @@ async def delete_category(category_id: str, user: dict = Depends(get_current_use
     result = await db.categories.delete_one({"id": category_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    await record_deletion(user["id"], "categories", category_id)
+    data_versions.bump(user["id"], "categories")
     return {"message": "Category deleted"}
 
 # ==================== INCOME ROUTES ====================
 
-@api_router.get("/incomes", response_model=List[Income])
-async def get_incomes(month: Optional[int] = None, year: Optional[int] = None, user: dict = Depends(get_current_user)):
+@api_router.get("/incomes", response_model=List[Income], dependencies=[Depends(collection_etag("incomes"))])
+async def get_incomes(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
     query = {"user_id": user["id"]}
     if month:
         query["month"] = month
     if year:
         query["year"] = year
+    if period:
+        query.update(period.filter())
     incomes = await db.incomes.find(query, {"_id": 0}).to_list(1000)
     return incomes
 
@@ -700,16 +1651,18 @@ async def get_incomes(month: Optional[int] = None, year: Optional[int] = None, u
 async def create_income(data: IncomeBase, user: dict = Depends(get_current_user)):
     income = Income(**data.model_dump(), user_id=user["id"])
     await db.incomes.insert_one(income.model_dump())
+    data_versions.bump(user["id"], "incomes")
     return income
 
 @api_router.put("/incomes/{income_id}", response_model=Income)
 async def update_income(income_id: str, data: IncomeBase, user: dict = Depends(get_current_user)):
     result = await db.incomes.update_one(
         {"id": income_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Income not found")
+    data_versions.bump(user["id"], "incomes")
     return await db.incomes.find_one({"id": income_id}, {"_id": 0})
 
 @api_router.delete("/incomes/{income_id}")
@@ -717,17 +1670,26 @@ async def delete_income(income_id: str, user: dict = Depends(get_current_user)):
     result = await db.incomes.delete_one({"id": income_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Income not found")
+    await record_deletion(user["id"], "incomes", income_id)
+    data_versions.bump(user["id"], "incomes")
     return {"message": "Income deleted"}
 
 # ==================== EXPENSE ROUTES ====================
 
-@api_router.get("/expenses", response_model=List[Expense])
-async def get_expenses(month: Optional[int] = None, year: Optional[int] = None, user: dict = Depends(get_current_user)):
+@api_router.get("/expenses", response_model=List[Expense], dependencies=[Depends(collection_etag("expenses"))])
+async def get_expenses(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
     query = {"user_id": user["id"]}
     if month:
         query["month"] = month
     if year:
         query["year"] = year
+    if period:
+        query.update(period.filter())
     expenses = await db.expenses.find(query, {"_id": 0}).to_list(1000)
     return expenses
 
@@ -735,16 +1697,18 @@ async def get_expenses(month: Optional[int] = None, year: Optional[int] = None,
 async def create_expense(data: ExpenseBase, user: dict = Depends(get_current_user)):
     expense = Expense(**data.model_dump(), user_id=user["id"])
     await db.expenses.insert_one(expense.model_dump())
+    data_versions.bump(user["id"], "expenses")
     return expense
 
 @api_router.put("/expenses/{expense_id}", response_model=Expense)
 async def update_expense(expense_id: str, data: ExpenseBase, user: dict = Depends(get_current_user)):
     result = await db.expenses.update_one(
         {"id": expense_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Expense not found")
+    data_versions.bump(user["id"], "expenses")
     return await db.expenses.find_one({"id": expense_id}, {"_id": 0})
 
 @api_router.delete("/expenses/{expense_id}")
@@ -752,11 +1716,13 @@ async def delete_expense(expense_id: str, user: dict = Depends(get_current_user)
     result = await db.expenses.delete_one({"id": expense_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Expense not found")
+    await record_deletion(user["id"], "expenses", expense_id)
+    data_versions.bump(user["id"], "expenses")
     return {"message": "Expense deleted"}
 
 # ==================== CREDIT CARD ROUTES ====================
 
-@api_router.get("/credit-cards", response_model=List[CreditCard])
+@api_router.get("/credit-cards", response_model=List[CreditCard], dependencies=[Depends(collection_etag("credit_cards"))])
 async def get_credit_cards(user: dict = Depends(get_current_user)):
     cards = await db.credit_cards.find({"user_id": user["id"]}, {"_id": 0}).to_list(50)
     return cards
@@ -765,16 +1731,18 @@ async def get_credit_cards(user: dict = Depends(get_current_user)):
 async def create_credit_card(data: CreditCardBase, user: dict = Depends(get_current_user)):
     card = CreditCard(**data.model_dump(), user_id=user["id"])
     await db.credit_cards.insert_one(card.model_dump())
+    data_versions.bump(user["id"], "credit_cards")
     return card
 
 @api_router.put("/credit-cards/{card_id}", response_model=CreditCard)
 async def update_credit_card(card_id: str, data: CreditCardBase, user: dict = Depends(get_current_user)):
     result = await db.credit_cards.update_one(
         {"id": card_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Credit card not found")
+    data_versions.bump(user["id"], "credit_cards")
     return await db.credit_cards.find_one({"id": card_id}, {"_id": 0})
 
 @api_router.delete("/credit-cards/{card_id}")
@@ -782,17 +1750,26 @@ async def delete_credit_card(card_id: str, user: dict = Depends(get_current_user
     result = await db.credit_cards.delete_one({"id": card_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Credit card not found")
+    await record_deletion(user["id"], "credit_cards", card_id)
+    data_versions.bump(user["id"], "credit_cards")
     return {"message": "Credit card deleted"}
 
 # ==================== INVESTMENT ROUTES ====================
 
-@api_router.get("/investments", response_model=List[Investment])
-async def get_investments(month: Optional[int] = None, year: Optional[int] = None, user: dict = Depends(get_current_user)):
+@api_router.get("/investments", response_model=List[Investment], dependencies=[Depends(collection_etag("investments"))])
+async def get_investments(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
     query = {"user_id": user["id"]}
     if month:
         query["month"] = month
     if year:
         query["year"] = year
+    if period:
+        query.update(period.filter(dated=False))
     investments = await db.investments.find(query, {"_id": 0}).to_list(1000)
     return investments
 
@@ -800,16 +1777,18 @@ async def get_investments(month: Optional[int] = None, year: Optional[int] = Non
 async def create_investment(data: InvestmentBase, user: dict = Depends(get_current_user)):
     investment = Investment(**data.model_dump(), user_id=user["id"])
     await db.investments.insert_one(investment.model_dump())
+    data_versions.bump(user["id"], "investments")
     return investment
 
 @api_router.put("/investments/{investment_id}", response_model=Investment)
 async def update_investment(investment_id: str, data: InvestmentBase, user: dict = Depends(get_current_user)):
     result = await db.investments.update_one(
         {"id": investment_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Investment not found")
+    data_versions.bump(user["id"], "investments")
     return await db.investments.find_one({"id": investment_id}, {"_id": 0})
 
 @api_router.delete("/investments/{investment_id}")
@@ -817,17 +1796,26 @@ async def delete_investment(investment_id: str, user: dict = Depends(get_current
     result = await db.investments.delete_one({"id": investment_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Investment not found")
+    await record_deletion(user["id"], "investments", investment_id)
+    data_versions.bump(user["id"], "investments")
     return {"message": "Investment deleted"}
 
 # ==================== BUDGET ROUTES ====================
 
-@api_router.get("/budgets", response_model=List[Budget])
-async def get_budgets(month: Optional[int] = None, year: Optional[int] = None, user: dict = Depends(get_current_user)):
+@api_router.get("/budgets", response_model=List[Budget], dependencies=[Depends(collection_etag("budgets"))])
+async def get_budgets(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
     query = {"user_id": user["id"]}
     if month:
         query["month"] = month
     if year:
         query["year"] = year
+    if period:
+        query.update(period.filter(dated=False))
     budgets = await db.budgets.find(query, {"_id": 0}).to_list(1000)
     return budgets
 
@@ -844,12 +1832,18 @@ async def create_budget(data: BudgetBase, user: dict = Depends(get_current_user)
         # Update existing
         await db.budgets.update_one(
             {"id": existing["id"]},
-            {"$set": {"planned_value": data.planned_value}}
+            {"$set": {
+                "planned_value": data.planned_value,
+                "planned_value_cents": data.planned_value_cents,
+                "updated_at": utc_now_iso()
+            }}
         )
+        data_versions.bump(user["id"], "budgets")
         return await db.budgets.find_one({"id": existing["id"]}, {"_id": 0})
     
     budget = Budget(**data.model_dump(), user_id=user["id"])
     await db.budgets.insert_one(budget.model_dump())
+    data_versions.bump(user["id"], "budgets")
     return budget
 
 @api_router.delete("/budgets/{budget_id}")
@@ -857,16 +1851,19 @@ async def delete_budget(budget_id: str, user: dict = Depends(get_current_user)):
     result = await db.budgets.delete_one({"id": budget_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Budget not found")
+    await record_deletion(user["id"], "budgets", budget_id)
+    data_versions.bump(user["id"], "budgets")
     return {"message": "Budget deleted"}
 
 # ==================== BENEFIT (VR/VA) ROUTES ====================
 
 # Benefit Credits (Recebimentos)
-@api_router.get("/benefits/credits", response_model=List[BenefitCredit])
+@api_router.get("/benefits/credits", response_model=List[BenefitCredit], dependencies=[Depends(collection_etag("benefit_credits"))])
 async def get_benefit_credits(
     month: Optional[int] = None, 
     year: Optional[int] = None, 
     benefit_type: Optional[str] = None,
+    period: Optional[DateRange] = Depends(date_range),
     user: dict = Depends(get_current_user)
 ):
     query = {"user_id": user["id"]}
@@ -874,6 +1871,8 @@ async def get_benefit_credits(
         query["month"] = month
     if year:
         query["year"] = year
+    if period:
+        query.update(period.filter())
     if benefit_type:
         query["benefit_type"] = benefit_type
     credits = await db.benefit_credits.find(query, {"_id": 0}).to_list(1000)
@@ -883,16 +1882,18 @@ async def get_benefit_credits(
 async def create_benefit_credit(data: BenefitCreditBase, user: dict = Depends(get_current_user)):
     credit = BenefitCredit(**data.model_dump(), user_id=user["id"])
     await db.benefit_credits.insert_one(credit.model_dump())
+    data_versions.bump(user["id"], "benefit_credits")
     return credit
 
 @api_router.put("/benefits/credits/{credit_id}", response_model=BenefitCredit)
 async def update_benefit_credit(credit_id: str, data: BenefitCreditBase, user: dict = Depends(get_current_user)):
     result = await db.benefit_credits.update_one(
         {"id": credit_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Benefit credit not found")
+    data_versions.bump(user["id"], "benefit_credits")
     return await db.benefit_credits.find_one({"id": credit_id}, {"_id": 0})
 
 @api_router.delete("/benefits/credits/{credit_id}")
@@ -900,14 +1901,17 @@ async def delete_benefit_credit(credit_id: str, user: dict = Depends(get_current
     result = await db.benefit_credits.delete_one({"id": credit_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Benefit credit not found")
+    await record_deletion(user["id"], "benefit_credits", credit_id)
+    data_versions.bump(user["id"], "benefit_credits")
     return {"message": "Benefit credit deleted"}
 
 # Benefit Expenses (Gastos)
-@api_router.get("/benefits/expenses", response_model=List[BenefitExpense])
+@api_router.get("/benefits/expenses", response_model=List[BenefitExpense], dependencies=[Depends(collection_etag("benefit_expenses"))])
 async def get_benefit_expenses(
     month: Optional[int] = None, 
     year: Optional[int] = None, 
     benefit_type: Optional[str] = None,
+    period: Optional[DateRange] = Depends(date_range),
     category: Optional[str] = None,
     user: dict = Depends(get_current_user)
 ):
@@ -916,6 +1920,8 @@ async def get_benefit_expenses(
         query["month"] = month
     if year:
         query["year"] = year
+    if period:
+        query.update(period.filter())
     if benefit_type:
         query["benefit_type"] = benefit_type
     if category:
@@ -927,16 +1933,18 @@ async def get_benefit_expenses(
 async def create_benefit_expense(data: BenefitExpenseBase, user: dict = Depends(get_current_user)):
     expense = BenefitExpense(**data.model_dump(), user_id=user["id"])
     await db.benefit_expenses.insert_one(expense.model_dump())
+    data_versions.bump(user["id"], "benefit_expenses")
     return expense
 
 @api_router.put("/benefits/expenses/{expense_id}", response_model=BenefitExpense)
 async def update_benefit_expense(expense_id: str, data: BenefitExpenseBase, user: dict = Depends(get_current_user)):
     result = await db.benefit_expenses.update_one(
         {"id": expense_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Benefit expense not found")
+    data_versions.bump(user["id"], "benefit_expenses")
     return await db.benefit_expenses.find_one({"id": expense_id}, {"_id": 0})
 
 @api_router.delete("/benefits/expenses/{expense_id}")
@@ -944,91 +1952,124 @@ async def delete_benefit_expense(expense_id: str, user: dict = Depends(get_curre
     result = await db.benefit_expenses.delete_one({"id": expense_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Benefit expense not found")
+    await record_deletion(user["id"], "benefit_expenses", expense_id)
+    data_versions.bump(user["id"], "benefit_expenses")
     return {"message": "Benefit expense deleted"}
 
 # Benefit Summary (Resumo)
-@api_router.get("/benefits/summary")
-async def get_benefits_summary(month: int, year: int, user: dict = Depends(get_current_user)):
-    # Get all credits and expenses for the month
-    credits = await db.benefit_credits.find(
-        {"user_id": user["id"], "month": month, "year": year}, {"_id": 0}
-    ).to_list(1000)
-    expenses = await db.benefit_expenses.find(
-        {"user_id": user["id"], "month": month, "year": year}, {"_id": 0}
-    ).to_list(1000)
-    
-    # Calculate VR totals
-    vr_credits = sum(c["value"] for c in credits if c["benefit_type"] == "vr")
-    vr_expenses = sum(e["value"] for e in expenses if e["benefit_type"] == "vr")
-    vr_balance = vr_credits - vr_expenses
-    
-    # Calculate VA totals
-    va_credits = sum(c["value"] for c in credits if c["benefit_type"] == "va")
-    va_expenses = sum(e["value"] for e in expenses if e["benefit_type"] == "va")
-    va_balance = va_credits - va_expenses
+@api_router.get("/benefits/summary", dependencies=[Depends(collection_etag("benefit_credits", "benefit_expenses"))])
+async def get_benefits_summary(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
+    # Credits per benefit and expenses per benefit/category, summed in cents by Mongo
+    match = {"$match": {"user_id": user["id"], **month_or_range(month, year, period)}}
+    credits, expenses = await asyncio.gather(
+        db.benefit_credits.aggregate([
+            match,
+            {"$group": {"_id": "$benefit_type", "cents": money_sum("value")}}
+        ]).to_list(None),
+        db.benefit_expenses.aggregate([
+            match,
+            {"$group": {"_id": {"benefit_type": "$benefit_type", "category": "$category"}, "cents": money_sum("value")}},
+            {"$sort": {"cents": -1}}
+        ]).to_list(None)
+    )
+    credit_cents = {c["_id"]: c["cents"] for c in credits}
     
-    # Group expenses by category
-    vr_by_category = {}
-    va_by_category = {}
-    for e in expenses:
-        cat = e["category"]
-        if e["benefit_type"] == "vr":
-            vr_by_category[cat] = vr_by_category.get(cat, 0) + e["value"]
-        else:
-            va_by_category[cat] = va_by_category.get(cat, 0) + e["value"]
+    totals = {}
+    for benefit_type in ("vr", "va"):
+        by_category = {e["_id"]["category"]: e["cents"] for e in expenses if e["_id"]["benefit_type"] == benefit_type}
+        credited = credit_cents.get(benefit_type, 0)
+        spent = sum(by_category.values())
+        totals[benefit_type] = (credited, spent, by_category)
     
+    (vr_credits, vr_expenses, vr_by_category), (va_credits, va_expenses, va_by_category) = totals["vr"], totals["va"]
     return {
         "month": month,
         "year": year,
         "vr": {
-            "credits": vr_credits,
-            "expenses": vr_expenses,
-            "balance": vr_balance,
-            "by_category": vr_by_category
+            "credits": from_cents(vr_credits),
+            "expenses": from_cents(vr_expenses),
+            "balance": from_cents(vr_credits - vr_expenses),
+            "by_category": {cat: from_cents(cents) for cat, cents in vr_by_category.items()}
         },
         "va": {
-            "credits": va_credits,
-            "expenses": va_expenses,
-            "balance": va_balance,
-            "by_category": va_by_category
+            "credits": from_cents(va_credits),
+            "expenses": from_cents(va_expenses),
+            "balance": from_cents(va_credits - va_expenses),
+            "by_category": {cat: from_cents(cents) for cat, cents in va_by_category.items()}
         },
-        "total_credits": vr_credits + va_credits,
-        "total_expenses": vr_expenses + va_expenses,
-        "total_balance": vr_balance + va_balance
+        "total_credits": from_cents(vr_credits + va_credits),
+        "total_expenses": from_cents(vr_expenses + va_expenses),
+        "total_balance": from_cents(vr_credits + va_credits - vr_expenses - va_expenses),
+        **range_fields(period)
     }
 
+@api_router.get("/benefits/series", dependencies=[Depends(collection_etag("benefit_credits", "benefit_expenses"))])
+async def get_benefits_series(
+    granularity: str = "month",
+    period: DateRange = Depends(required_date_range),
+    user: dict = Depends(get_current_user)
+):
+    """VR/VA credits and expenses over ``from``/``to``, bucketed by day, week or month"""
+    check_granularity(granularity)
+    starts = range_buckets(period, granularity)
+    scope, by_date = series_scope(period, granularity)
+    match = {"user_id": user["id"], **scope}
+    credits, expenses = await asyncio.gather(
+        bucket_totals("benefit_credits", match, granularity, split="benefit_type", by_date=by_date),
+        bucket_totals("benefit_expenses", match, granularity, split="benefit_type", by_date=by_date)
+    )
+    
+    buckets = []
+    for start in starts:
+        bucket = {"start": start.isoformat()}
+        for benefit_type in ("vr", "va"):
+            credited = credits.get((start, benefit_type), 0)
+            spent = expenses.get((start, benefit_type), 0)
+            bucket[f"{benefit_type}_credits"] = from_cents(credited)
+            bucket[f"{benefit_type}_expenses"] = from_cents(spent)
+            bucket[f"{benefit_type}_balance"] = from_cents(credited - spent)
+        buckets.append(bucket)
+    return {"granularity": granularity, **range_fields(period), "buckets": buckets}
+
 # Benefit Yearly Summary (para gráficos)
-@api_router.get("/benefits/yearly")
+@api_router.get("/benefits/yearly", dependencies=[Depends(collection_etag("benefit_credits", "benefit_expenses"))])
 async def get_benefits_yearly(year: int, user: dict = Depends(get_current_user)):
+    match = {"$match": {"user_id": user["id"], "year": year}}
+    group = {"$group": {"_id": {"month": "$month", "benefit_type": "$benefit_type"}, "cents": money_sum("value")}}
+    credit_rows, expense_rows = await asyncio.gather(
+        db.benefit_credits.aggregate([match, group]).to_list(None),
+        db.benefit_expenses.aggregate([match, group]).to_list(None)
+    )
+    credits = {(r["_id"]["month"], r["_id"]["benefit_type"]): r["cents"] for r in credit_rows}
+    expenses = {(r["_id"]["month"], r["_id"]["benefit_type"]): r["cents"] for r in expense_rows}
+    
     monthly_data = []
     for month in range(1, 13):
-        credits = await db.benefit_credits.find(
-            {"user_id": user["id"], "month": month, "year": year}, {"_id": 0}
-        ).to_list(1000)
-        expenses = await db.benefit_expenses.find(
-            {"user_id": user["id"], "month": month, "year": year}, {"_id": 0}
-        ).to_list(1000)
-        
-        vr_credits = sum(c["value"] for c in credits if c["benefit_type"] == "vr")
-        vr_expenses = sum(e["value"] for e in expenses if e["benefit_type"] == "vr")
-        va_credits = sum(c["value"] for c in credits if c["benefit_type"] == "va")
-        va_expenses = sum(e["value"] for e in expenses if e["benefit_type"] == "va")
+        vr_credits = credits.get((month, "vr"), 0)
+        vr_expenses = expenses.get((month, "vr"), 0)
+        va_credits = credits.get((month, "va"), 0)
+        va_expenses = expenses.get((month, "va"), 0)
         
         monthly_data.append({
             "month": month,
-            "vr_credits": vr_credits,
-            "vr_expenses": vr_expenses,
-            "vr_balance": vr_credits - vr_expenses,
-            "va_credits": va_credits,
-            "va_expenses": va_expenses,
-            "va_balance": va_credits - va_expenses
+            "vr_credits": from_cents(vr_credits),
+            "vr_expenses": from_cents(vr_expenses),
+            "vr_balance": from_cents(vr_credits - vr_expenses),
+            "va_credits": from_cents(va_credits),
+            "va_expenses": from_cents(va_expenses),
+            "va_balance": from_cents(va_credits - va_expenses)
         })
     
     return monthly_data
 
 # ==================== RECURRING TRANSACTIONS ROUTES ====================
 
-@api_router.get("/recurring", response_model=List[RecurringTransaction])
+@api_router.get("/recurring", response_model=List[RecurringTransaction], dependencies=[Depends(collection_etag("recurring_transactions"))])
 async def get_recurring_transactions(user: dict = Depends(get_current_user)):
     transactions = await db.recurring_transactions.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
     return transactions
@@ -1037,6 +2078,7 @@ async def get_recurring_transactions(user: dict = Depends(get_current_user)):
 async def create_recurring_transaction(data: RecurringTransactionBase, user: dict = Depends(get_current_user)):
     transaction = RecurringTransaction(**data.model_dump(), user_id=user["id"])
     await db.recurring_transactions.insert_one(transaction.model_dump())
+    data_versions.bump(user["id"], "recurring_transactions")
     return transaction
 
 @api_router.put("/recurring/{transaction_id}", response_model=RecurringTransaction)
@@ -1047,6 +2089,7 @@ async def update_recurring_transaction(transaction_id: str, data: RecurringTrans
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Recurring transaction not found")
+    data_versions.bump(user["id"], "recurring_transactions")
     return await db.recurring_transactions.find_one({"id": transaction_id}, {"_id": 0})
 
 @api_router.delete("/recurring/{transaction_id}")
@@ -1054,6 +2097,7 @@ async def delete_recurring_transaction(transaction_id: str, user: dict = Depends
     result = await db.recurring_transactions.delete_one({"id": transaction_id, "user_id": user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Recurring transaction not found")
+    data_versions.bump(user["id"], "recurring_transactions")
     return {"message": "Recurring transaction deleted"}
 
 @api_router.post("/recurring/generate")
@@ -1121,6 +2165,9 @@ async def generate_recurring_transactions(month: int, year: int, user: dict = De
             await db.incomes.insert_one(income.model_dump())
             generated.append({"type": "income", "description": rec["description"], "value": rec["value"]})
     
+    if generated:
+        data_versions.bump(user["id"], "incomes", "expenses")
+    
     return {"generated": generated, "count": len(generated)}
 
 # ==================== ALERTS & BUDGET ANALYSIS ====================
@@ -1191,24 +2238,23 @@ async def get_due_date_alerts(user: dict = Depends(get_current_user)):
     today = datetime.now(timezone.utc).date()
     week_from_now = today + timedelta(days=7)
     
-    # Buscar despesas pendentes
-    expenses = await db.expenses.find(
-        {"user_id": user["id"], "status": "pending"}, {"_id": 0}
-    ).to_list(1000)
+    # Buscar despesas pendentes que vencem até a próxima semana
+    query = {"user_id": user["id"], "status": "pending"}
+    if "transaction_dates_backfill" in completed_migrations:
+        query["due_at"] = {"$lte": datetime.combine(week_from_now, datetime.min.time(), tzinfo=timezone.utc)}
+    expenses, categories = await asyncio.gather(
+        db.expenses.find(query, {"_id": 0}).to_list(1000),
+        db.categories.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
+    )
     
     alerts = []
-    categories = await db.categories.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
     cat_map = {c["id"]: c for c in categories}
     
     for expense in expenses:
-        due_date_str = expense.get("due_date") or expense.get("date")
-        if not due_date_str:
-            continue
-        
-        try:
-            due_date = datetime.strptime(due_date_str, "%Y-%m-%d").date()
-        except:
+        due_date = expense_due_day(expense)
+        if not due_date:
             continue
+        due_date_str = due_date.isoformat()
         
         if due_date < today:
             # Vencido
@@ -1248,117 +2294,103 @@ async def get_due_date_alerts(user: dict = Depends(get_current_user)):
 
 # ==================== TRENDS & ANALYSIS ====================
 
+frame_cache = analytics_engine.FrameCache(ANALYTICS_FRAME_CACHE_MAX_BYTES)
+
+async def load_user_frame(user_id: str, month: int, year: int) -> analytics_engine.UserFrame:
+    """The user's incomes and expenses over the months the analytics of
+    ``month`` read, as a columnar frame. Read from Mongo only when they
+    changed since the cached frame was loaded, or it covers other months"""
+    # Read the versions first, as in cached_response, so a concurrent write
+    # can only leave a frame stale, never stamp stale data as current
+    first, last = analytics_engine.history_periods(month, year)
+    version = (data_versions.epoch, data_versions.get(user_id, "incomes"), data_versions.get(user_id, "expenses"), last)
+    frame = frame_cache.get(user_id, version)
+    if frame is None:
+        query = {"user_id": user_id, **period_filter(divmod(first, 100), divmod(last, 100))}
+        incomes, expenses = await asyncio.gather(
+            db.incomes.find(query, analytics_engine.FRAME_PROJECTION).to_list(None),
+            db.expenses.find(query, analytics_engine.FRAME_PROJECTION).to_list(None)
+        )
+        # Building the arrays is CPU-bound; keep it off the event loop
+        frame = await asyncio.to_thread(analytics_engine.UserFrame.from_documents, incomes, expenses)
+        frame_cache.put(user_id, version, frame)
+    return frame
+
+# Collections the precomputed analytics are derived from
+ANALYTICS_SOURCE_COLLECTIONS = {"incomes", "expenses", "categories", "goals"}
+# Users whose data_changed_at stamp is still being written by this process
+analytics_stamps_pending: Dict[str, int] = {}
+# Users whose latest stamp could not be written, with its time: until a stamp
+# at least as recent lands, their precomputed results may look current
+analytics_stamps_failed: Dict[str, str] = {}
+ANALYTICS_STAMP_ATTEMPTS = 3
+
+async def ensure_analytics_indexes():
+    await db.precomputed_analytics.create_index("user_id", unique=True)
+
+def stamp_data_changed(user_id: str, version: int, collections: Tuple[str, ...]):
+    """Data version listener: record on the user when their analytics inputs
+    last changed, which is what expires precomputed results"""
+    if collections and not ANALYTICS_SOURCE_COLLECTIONS.intersection(collections):
+        return
+    analytics_stamps_pending[user_id] = analytics_stamps_pending.get(user_id, 0) + 1
+    run_in_background(write_data_changed_stamp(user_id))
+
+async def write_data_changed_stamp(user_id: str):
+    stamp = utc_now_iso()
+    try:
+        for attempt in range(ANALYTICS_STAMP_ATTEMPTS):
+            try:
+                await db.users.update_one({"id": user_id}, {"$max": {"data_changed_at": stamp}})
+                break
+            except Exception as e:
+                if attempt + 1 == ANALYTICS_STAMP_ATTEMPTS:
+                    logging.error(f"Failed to stamp data change for user {user_id}: {e}")
+                    analytics_stamps_failed[user_id] = max(stamp, analytics_stamps_failed.get(user_id, ""))
+                    return
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        if analytics_stamps_failed.get(user_id, stamp) <= stamp:
+            analytics_stamps_failed.pop(user_id, None)
+    finally:
+        analytics_stamps_pending[user_id] -= 1
+        if not analytics_stamps_pending[user_id]:
+            del analytics_stamps_pending[user_id]
+
+data_versions.listeners.append(stamp_data_changed)
+
+def precomputed_response(endpoint: str):
+    """Serve the result written by precompute_analytics.py while it is fresh:
+    computed for the requested month (the current one when the endpoint takes
+    no month) from data that has not changed since. Otherwise run the handler.
+
+    Goes under ``cached_response``, so it is only consulted on cache misses."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            user = kwargs["user"]
+            if user["id"] not in analytics_stamps_pending and user["id"] not in analytics_stamps_failed:
+                doc = await db.precomputed_analytics.find_one(
+                    {"user_id": user["id"]}, {"_id": 0, "month": 1, "year": 1, "source_changed_at": 1, f"results.{endpoint}": 1}
+                )
+                if doc and endpoint in doc.get("results", {}):
+                    now = datetime.now(timezone.utc)
+                    month, year = kwargs.get("month", now.month), kwargs.get("year", now.year)
+                    if (doc["month"], doc["year"]) == (month, year) and doc.get("source_changed_at") == user.get("data_changed_at"):
+                        return doc["results"][endpoint]
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 @api_router.get("/analysis/trends")
+@cached_response("analysis/trends")
+@precomputed_response("analysis/trends")
 async def get_trends_analysis(month: int, year: int, user: dict = Depends(get_current_user)):
     """Comparativo do mês atual vs meses anteriores"""
-    
-    # Dados dos últimos 6 meses
-    months_data = []
-    for i in range(5, -1, -1):
-        m = month - i
-        y = year
-        while m <= 0:
-            m += 12
-            y -= 1
-        
-        incomes = await db.incomes.find(
-            {"user_id": user["id"], "month": m, "year": y}, {"_id": 0}
-        ).to_list(1000)
-        expenses = await db.expenses.find(
-            {"user_id": user["id"], "month": m, "year": y}, {"_id": 0}
-        ).to_list(1000)
-        
-        total_income = sum(i["value"] for i in incomes if i["status"] == "received")
-        total_expense = sum(e["value"] for e in expenses if e["status"] == "paid")
-        
-        months_data.append({
-            "month": m,
-            "year": y,
-            "income": total_income,
-            "expense": total_expense,
-            "balance": total_income - total_expense
-        })
-    
-    # Calcular médias
-    avg_income = sum(d["income"] for d in months_data[:-1]) / max(len(months_data) - 1, 1)
-    avg_expense = sum(d["expense"] for d in months_data[:-1]) / max(len(months_data) - 1, 1)
-    
-    current = months_data[-1]
-    
-    # Variação percentual
-    income_variation = ((current["income"] - avg_income) / avg_income * 100) if avg_income > 0 else 0
-    expense_variation = ((current["expense"] - avg_expense) / avg_expense * 100) if avg_expense > 0 else 0
-    
-    # Gastos por categoria no mês atual vs média
-    categories = await db.categories.find({"user_id": user["id"], "type": "expense"}, {"_id": 0}).to_list(100)
-    current_expenses = await db.expenses.find(
-        {"user_id": user["id"], "month": month, "year": year}, {"_id": 0}
-    ).to_list(1000)
-    
-    # Otimização: Buscar todas as despesas dos últimos 5 meses de uma vez
-    months_to_fetch = []
-    for i in range(5, 0, -1):
-        m = month - i
-        y = year
-        while m <= 0:
-            m += 12
-            y -= 1
-        months_to_fetch.append({"month": m, "year": y})
-    
-    # Busca única para todos os meses anteriores
-    prev_expenses_query = {
-        "user_id": user["id"],
-        "$or": months_to_fetch
-    }
-    all_prev_expenses = await db.expenses.find(prev_expenses_query, {"_id": 0}).to_list(10000)
-    
-    category_trends = []
-    for cat in categories:
-        current_total = sum(e["value"] for e in current_expenses if e["category_id"] == cat["id"])
-        
-        # Calcular média dos últimos 5 meses usando dados já carregados
-        cat_totals = []
-        for month_info in months_to_fetch:
-            m_total = sum(
-                e["value"] for e in all_prev_expenses 
-                if e["category_id"] == cat["id"] and e["month"] == month_info["month"] and e["year"] == month_info["year"]
-            )
-            cat_totals.append(m_total)
-        
-        avg_cat = sum(cat_totals) / max(len(cat_totals), 1)
-        variation = ((current_total - avg_cat) / avg_cat * 100) if avg_cat > 0 else 0
-        
-        if current_total > 0 or avg_cat > 0:
-            category_trends.append({
-                "category_id": cat["id"],
-                "category_name": cat["name"],
-                "current": current_total,
-                "average": avg_cat,
-                "variation": variation,
-                "trend": "up" if variation > 10 else "down" if variation < -10 else "stable"
-            })
-    
-    return {
-        "monthly_data": months_data,
-        "current_month": {
-            "month": month,
-            "year": year,
-            "income": current["income"],
-            "expense": current["expense"],
-            "balance": current["balance"]
-        },
-        "averages": {
-            "income": avg_income,
-            "expense": avg_expense
-        },
-        "variations": {
-            "income_percentage": income_variation,
-            "expense_percentage": expense_variation,
-            "income_trend": "up" if income_variation > 5 else "down" if income_variation < -5 else "stable",
-            "expense_trend": "up" if expense_variation > 5 else "down" if expense_variation < -5 else "stable"
-        },
-        "category_trends": category_trends
-    }
+    frame, categories = await asyncio.gather(
+        load_user_frame(user["id"], month, year),
+        db.categories.find({"user_id": user["id"], "type": "expense"}, {"_id": 0, "id": 1, "name": 1}).to_list(100)
+    )
+    return analytics_engine.trends(frame, month, year, categories)
 
 # ==================== CREDIT CARD ADVANCED ====================
 
@@ -1435,9 +2467,8 @@ async def get_card_installments(card_id: str, user: dict = Depends(get_current_u
         value_per_installment = exp["value"]
         
         # Data inicial
-        try:
-            start_date = datetime.strptime(exp["date"], "%Y-%m-%d")
-        except:
+        start_date = exp.get("date_at") or parse_day(exp.get("date"))
+        if not start_date:
             continue
         
         # Calcular parcelas restantes
@@ -1483,23 +2514,19 @@ async def get_card_available_limit(card_id: str, month: int, year: int, user: di
         raise HTTPException(status_code=404, detail="Credit card not found")
     
     # Calcular gastos do mês atual
-    expenses = await db.expenses.find({
-        "user_id": user["id"],
-        "credit_card_id": card_id,
-        "month": month,
-        "year": year
-    }, {"_id": 0}).to_list(1000)
-    
-    total_spent = sum(e["value"] for e in expenses)
-    limit = card.get("limit", 0)
-    available = limit - total_spent
-    usage_percentage = (total_spent / limit * 100) if limit > 0 else 0
+    spent = await db.expenses.aggregate([
+        {"$match": {"user_id": user["id"], "credit_card_id": card_id, "month": month, "year": year}},
+        {"$group": {"_id": None, "cents": money_sum("value")}}
+    ]).to_list(1)
+    spent_cents = spent[0]["cents"] if spent else 0
+    limit_cents = doc_cents(card, "limit")
+    usage_percentage = (spent_cents / limit_cents * 100) if limit_cents > 0 else 0
     
     return {
         "card": card,
-        "limit": limit,
-        "spent": total_spent,
-        "available": available,
+        "limit": from_cents(limit_cents),
+        "spent": from_cents(spent_cents),
+        "available": from_cents(limit_cents - spent_cents),
         "usage_percentage": usage_percentage,
         "month": month,
         "year": year
@@ -1513,102 +2540,203 @@ async def get_all_cards_summary(month: int, year: int, user: dict = Depends(get_
     if not cards:
         return []
     
-    # Otimização: Buscar todas as despesas de uma vez para todos os cartões
+    # Totais por cartão calculados no Mongo, em centavos
     card_ids = [card["id"] for card in cards]
-    
-    # Busca única para despesas do mês
-    all_month_expenses = await db.expenses.find({
-        "user_id": user["id"],
-        "credit_card_id": {"$in": card_ids},
-        "month": month,
-        "year": year
-    }, {"_id": 0}).to_list(10000)
-    
-    # Busca única para despesas parceladas
-    all_installment_expenses = await db.expenses.find({
-        "user_id": user["id"],
-        "credit_card_id": {"$in": card_ids},
-        "installments": {"$gt": 1}
-    }, {"_id": 0}).to_list(5000)
+    remaining_installments = {"$subtract": [
+        {"$ifNull": ["$installments", 1]}, {"$ifNull": ["$current_installment", 1]}
+    ]}
+    spent_rows, committed_rows = await asyncio.gather(
+        db.expenses.aggregate([
+            {"$match": {"user_id": user["id"], "credit_card_id": {"$in": card_ids}, "month": month, "year": year}},
+            {"$group": {"_id": "$credit_card_id", "cents": money_sum("value")}}
+        ]).to_list(None),
+        db.expenses.aggregate([
+            {"$match": {"user_id": user["id"], "credit_card_id": {"$in": card_ids}, "installments": {"$gt": 1}}},
+            {"$group": {"_id": "$credit_card_id", "cents": {"$sum": {"$multiply": [money_cents("value"), remaining_installments]}}}}
+        ]).to_list(None)
+    )
+    spent_by_card = {r["_id"]: r["cents"] for r in spent_rows}
+    committed_by_card = {r["_id"]: r["cents"] for r in committed_rows}
     
     summary = []
     for card in cards:
-        # Filtrar despesas do cartão usando dados já carregados
-        card_expenses = [e for e in all_month_expenses if e.get("credit_card_id") == card["id"]]
-        total_spent = sum(e["value"] for e in card_expenses)
-        
-        limit = card.get("limit", 0)
-        available = limit - total_spent
-        
-        # Calcular parcelas futuras usando dados já carregados
-        card_installments = [e for e in all_installment_expenses if e.get("credit_card_id") == card["id"]]
-        future_committed = 0
-        for exp in card_installments:
-            remaining = exp.get("installments", 1) - exp.get("current_installment", 1)
-            future_committed += exp["value"] * remaining
+        spent_cents = spent_by_card.get(card["id"], 0)
+        limit_cents = doc_cents(card, "limit")
         
         summary.append({
             "card": card,
-            "spent": total_spent,
-            "available": available,
-            "limit": limit,
-            "usage_percentage": (total_spent / limit * 100) if limit > 0 else 0,
-            "future_committed": future_committed
+            "spent": from_cents(spent_cents),
+            "available": from_cents(limit_cents - spent_cents),
+            "limit": from_cents(limit_cents),
+            "usage_percentage": (spent_cents / limit_cents * 100) if limit_cents > 0 else 0,
+            "future_committed": from_cents(committed_by_card.get(card["id"], 0))
         })
     
     return summary
 
 # ==================== DASHBOARD/REPORTS ====================
 
-@api_router.get("/dashboard/summary")
-async def get_dashboard_summary(month: int, year: int, user: dict = Depends(get_current_user)):
-    # Get totals
-    incomes = await db.incomes.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-    expenses = await db.expenses.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-    investments = await db.investments.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-    budgets = await db.budgets.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-    
-    total_income = sum(i["value"] for i in incomes if i["status"] == "received")
-    total_income_pending = sum(i["value"] for i in incomes if i["status"] == "pending")
-    total_expense = sum(e["value"] for e in expenses if e["status"] == "paid")
-    total_expense_pending = sum(e["value"] for e in expenses if e["status"] == "pending")
-    total_contributions = sum(inv["contribution"] for inv in investments)
-    total_dividends = sum(inv["dividends"] for inv in investments)
-    
-    planned_income = sum(b["planned_value"] for b in budgets if b["type"] == "income")
-    planned_expense = sum(b["planned_value"] for b in budgets if b["type"] == "expense")
-    
-    balance = total_income - total_expense
-    
+def month_summary(month: int, year: int, cents: dict) -> dict:
+    """Dashboard totals in reais from per-total amounts in cents"""
     return {
         "month": month,
         "year": year,
-        "total_income": total_income,
-        "total_income_pending": total_income_pending,
-        "total_expense": total_expense,
-        "total_expense_pending": total_expense_pending,
-        "total_contributions": total_contributions,
-        "total_dividends": total_dividends,
-        "planned_income": planned_income,
-        "planned_expense": planned_expense,
-        "balance": balance
+        **{name: from_cents(value) for name, value in cents.items()},
+        "balance": from_cents(cents["total_income"] - cents["total_expense"])
+    }
+
+def summarize_month(month: int, year: int, incomes: list, expenses: list, investments: list, budgets: list) -> dict:
+    """Dashboard totals for one month, computed from already loaded records"""
+    def total(docs: list, field: str = "value", **match) -> int:
+        return sum(doc_cents(d, field) for d in docs if all(d.get(k) == v for k, v in match.items()))
+    
+    return month_summary(month, year, {
+        "total_income": total(incomes, status="received"),
+        "total_income_pending": total(incomes, status="pending"),
+        "total_expense": total(expenses, status="paid"),
+        "total_expense_pending": total(expenses, status="pending"),
+        "total_contributions": total(investments, "contribution"),
+        "total_dividends": total(investments, "dividends"),
+        "planned_income": total(budgets, "planned_value", type="income"),
+        "planned_expense": total(budgets, "planned_value", type="expense")
+    })
+
+@api_router.get("/dashboard/summary")
+@cached_response("dashboard/summary")
+async def get_dashboard_summary(
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
+    """Totals for one month, or for the ``from``/``to`` range when given"""
+    dated = {"$match": {"user_id": user["id"], **month_or_range(month, year, period)}}
+    undated = {"$match": {"user_id": user["id"], **month_or_range(month, year, period, dated=False)}}
+    incomes, expenses, investments, budgets = await asyncio.gather(
+        db.incomes.aggregate([dated, {"$group": {"_id": "$status", "cents": money_sum("value")}}]).to_list(None),
+        db.expenses.aggregate([dated, {"$group": {"_id": "$status", "cents": money_sum("value")}}]).to_list(None),
+        db.investments.aggregate([undated, {"$group": {
+            "_id": None, "contribution": money_sum("contribution"), "dividends": money_sum("dividends")
+        }}]).to_list(None),
+        db.budgets.aggregate([undated, {"$group": {"_id": "$type", "cents": money_sum("planned_value")}}]).to_list(None)
+    )
+    income = {r["_id"]: r["cents"] for r in incomes}
+    expense = {r["_id"]: r["cents"] for r in expenses}
+    planned = {r["_id"]: r["cents"] for r in budgets}
+    invested = investments[0] if investments else {}
+    
+    summary = month_summary(month, year, {
+        "total_income": income.get("received", 0),
+        "total_income_pending": income.get("pending", 0),
+        "total_expense": expense.get("paid", 0),
+        "total_expense_pending": expense.get("pending", 0),
+        "total_contributions": invested.get("contribution", 0),
+        "total_dividends": invested.get("dividends", 0),
+        "planned_income": planned.get("income", 0),
+        "planned_expense": planned.get("expense", 0)
+    })
+    return {**summary, **range_fields(period)}
+
+@api_router.get("/dashboard/series")
+@cached_response("dashboard/series")
+async def get_dashboard_series(
+    granularity: str = "month",
+    period: DateRange = Depends(required_date_range),
+    user: dict = Depends(get_current_user)
+):
+    """Received income and paid expenses over ``from``/``to``, bucketed by
+    day, week (starting Monday) or month, empty buckets included"""
+    check_granularity(granularity)
+    starts = range_buckets(period, granularity)
+    scope, by_date = series_scope(period, granularity)
+    match = {"user_id": user["id"], **scope}
+    incomes, expenses = await asyncio.gather(
+        bucket_totals("incomes", {**match, "status": "received"}, granularity, by_date=by_date),
+        bucket_totals("expenses", {**match, "status": "paid"}, granularity, by_date=by_date)
+    )
+    
+    buckets = []
+    for start in starts:
+        income, expense = incomes.get((start, None), 0), expenses.get((start, None), 0)
+        buckets.append({
+            "start": start.isoformat(),
+            "income": from_cents(income),
+            "expense": from_cents(expense),
+            "balance": from_cents(income - expense)
+        })
+    return {"granularity": granularity, **range_fields(period), "buckets": buckets}
+
+# ==================== MONTH SNAPSHOT ====================
+
+SNAPSHOT_SECTIONS = ("categories", "credit_cards", "incomes", "expenses", "investments", "budgets", "summary")
+
+@api_router.get("/snapshot", dependencies=[Depends(collection_etag(
+    "categories", "credit_cards", "incomes", "expenses", "investments", "budgets"
+))])
+async def get_month_snapshot(
+    month: int,
+    year: int,
+    fields: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    """Everything the month screen needs in a single request.
+    
+    ``fields`` is a comma separated subset of SNAPSHOT_SECTIONS; all sections
+    are returned when it is omitted."""
+    if fields:
+        sections = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in sections if f not in SNAPSHOT_SECTIONS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown snapshot fields: {', '.join(unknown)}")
+    else:
+        sections = list(SNAPSHOT_SECTIONS)
+    
+    # The summary is derived from the month's records, so load them even when
+    # the caller only asked for the totals
+    needed = set(sections)
+    if "summary" in needed:
+        needed |= {"incomes", "expenses", "investments", "budgets"}
+    
+    month_query = {"user_id": user["id"], "month": month, "year": year}
+    loaders = {
+        "categories": lambda: db.categories.find({"user_id": user["id"]}, {"_id": 0}).to_list(100),
+        "credit_cards": lambda: db.credit_cards.find({"user_id": user["id"]}, {"_id": 0}).to_list(50),
+        "incomes": lambda: db.incomes.find(month_query, {"_id": 0}).to_list(1000),
+        "expenses": lambda: db.expenses.find(month_query, {"_id": 0}).to_list(1000),
+        "investments": lambda: db.investments.find(month_query, {"_id": 0}).to_list(1000),
+        "budgets": lambda: db.budgets.find(month_query, {"_id": 0}).to_list(1000),
     }
+    names = [name for name in loaders if name in needed]
+    loaded = dict(zip(names, await asyncio.gather(*(loaders[name]() for name in names))))
+    
+    if "summary" in needed:
+        loaded["summary"] = summarize_month(
+            month, year, loaded["incomes"], loaded["expenses"], loaded["investments"], loaded["budgets"]
+        )
+    
+    return {"month": month, "year": year, **{name: loaded[name] for name in sections}}
 
 @api_router.get("/dashboard/yearly")
+@cached_response("dashboard/yearly")
 async def get_yearly_summary(year: int, user: dict = Depends(get_current_user)):
+    match = {"user_id": user["id"], **period_filter((year, 1), (year, 12))}
+    by_month = {"$group": {"_id": "$month", "cents": money_sum("value")}}
+    incomes, expenses = await asyncio.gather(
+        db.incomes.aggregate([{"$match": {**match, "status": "received"}}, by_month]).to_list(None),
+        db.expenses.aggregate([{"$match": {**match, "status": "paid"}}, by_month]).to_list(None)
+    )
+    income = {r["_id"]: r["cents"] for r in incomes}
+    expense = {r["_id"]: r["cents"] for r in expenses}
+    
     monthly_data = []
     for month in range(1, 13):
-        incomes = await db.incomes.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-        expenses = await db.expenses.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-        
-        total_income = sum(i["value"] for i in incomes if i["status"] == "received")
-        total_expense = sum(e["value"] for e in expenses if e["status"] == "paid")
-        
+        total_income = income.get(month, 0)
+        total_expense = expense.get(month, 0)
         monthly_data.append({
             "month": month,
-            "income": total_income,
-            "expense": total_expense,
-            "balance": total_income - total_expense
+            "income": from_cents(total_income),
+            "expense": from_cents(total_expense),
+            "balance": from_cents(total_income - total_expense)
         })
     
     return monthly_data
@@ -1616,295 +2744,82 @@ async def get_yearly_summary(year: int, user: dict = Depends(get_current_user)):
 # ==================== ADVANCED ANALYTICS ====================
 
 @api_router.get("/analytics/comparison")
+@cached_response("analytics/comparison")
 async def analytics_comparison(
     month: int,
     year: int,
     user: dict = Depends(get_current_user)
 ):
     """Compare current month with previous month and year"""
-    user_id = user["id"]
-    
-    # Current month
-    current_incomes = await db.incomes.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year,
-        "status": "received"
-    }).to_list(1000)
-    
-    current_expenses = await db.expenses.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year,
-        "status": "paid"
-    }).to_list(1000)
-    
-    current_income_total = sum(i["value"] for i in current_incomes)
-    current_expense_total = sum(e["value"] for e in current_expenses)
-    current_balance = current_income_total - current_expense_total
-    
-    # Previous month
-    prev_month = month - 1 if month > 1 else 12
-    prev_year = year if month > 1 else year - 1
-    
-    prev_incomes = await db.incomes.find({
-        "user_id": user_id,
-        "month": prev_month,
-        "year": prev_year,
-        "status": "received"
-    }).to_list(1000)
-    
-    prev_expenses = await db.expenses.find({
-        "user_id": user_id,
-        "month": prev_month,
-        "year": prev_year,
-        "status": "paid"
-    }).to_list(1000)
-    
-    prev_income_total = sum(i["value"] for i in prev_incomes)
-    prev_expense_total = sum(e["value"] for e in prev_expenses)
-    prev_balance = prev_income_total - prev_expense_total
-    
-    # Same month last year
-    last_year_incomes = await db.incomes.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year - 1,
-        "status": "received"
-    }).to_list(1000)
-    
-    last_year_expenses = await db.expenses.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year - 1,
-        "status": "paid"
-    }).to_list(1000)
-    
-    last_year_income_total = sum(i["value"] for i in last_year_incomes)
-    last_year_expense_total = sum(e["value"] for e in last_year_expenses)
-    last_year_balance = last_year_income_total - last_year_expense_total
-    
-    # Calculate variations
-    income_variation = ((current_income_total - prev_income_total) / prev_income_total * 100) if prev_income_total > 0 else 0
-    expense_variation = ((current_expense_total - prev_expense_total) / prev_expense_total * 100) if prev_expense_total > 0 else 0
-    balance_variation = ((current_balance - prev_balance) / abs(prev_balance) * 100) if prev_balance != 0 else 0
-    
-    income_year_variation = ((current_income_total - last_year_income_total) / last_year_income_total * 100) if last_year_income_total > 0 else 0
-    expense_year_variation = ((current_expense_total - last_year_expense_total) / last_year_expense_total * 100) if last_year_expense_total > 0 else 0
-    
-    return {
-        "current": {
-            "income": current_income_total,
-            "expense": current_expense_total,
-            "balance": current_balance
-        },
-        "previous_month": {
-            "income": prev_income_total,
-            "expense": prev_expense_total,
-            "balance": prev_balance
-        },
-        "last_year": {
-            "income": last_year_income_total,
-            "expense": last_year_expense_total,
-            "balance": last_year_balance
-        },
-        "variations": {
-            "income_vs_previous": income_variation,
-            "expense_vs_previous": expense_variation,
-            "balance_vs_previous": balance_variation,
-            "income_vs_last_year": income_year_variation,
-            "expense_vs_last_year": expense_year_variation
-        }
-    }
+    return analytics_engine.comparison(await load_user_frame(user["id"], month, year), month, year)
 
 @api_router.get("/analytics/forecast")
+@cached_response("analytics/forecast")
+@precomputed_response("analytics/forecast")
 async def analytics_forecast(
     month: int,
     year: int,
     user: dict = Depends(get_current_user)
 ):
     """Forecast balance for next months based on average"""
-    user_id = user["id"]
-    
-    # Get last 3 months data
-    months_data = []
-    for i in range(3):
-        m = month - i
-        y = year
-        if m <= 0:
-            m += 12
-            y -= 1
-        
-        incomes = await db.incomes.find({
-            "user_id": user_id,
-            "month": m,
-            "year": y,
-            "status": "received"
-        }).to_list(1000)
-        
-        expenses = await db.expenses.find({
-            "user_id": user_id,
-            "month": m,
-            "year": y,
-            "status": "paid"
-        }).to_list(1000)
-        
-        income_total = sum(inc["value"] for inc in incomes)
-        expense_total = sum(exp["value"] for exp in expenses)
-        
-        months_data.append({
-            "month": m,
-            "year": y,
-            "income": income_total,
-            "expense": expense_total,
-            "balance": income_total - expense_total
-        })
-    
-    # Calculate averages
-    avg_income = sum(m["income"] for m in months_data) / len(months_data) if months_data else 0
-    avg_expense = sum(m["expense"] for m in months_data) / len(months_data) if months_data else 0
-    avg_balance = avg_income - avg_expense
-    
-    # Get pending income and expenses for current month
-    pending_income = await db.incomes.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year,
-        "status": "pending"
-    }).to_list(1000)
-    
-    pending_expense = await db.expenses.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year,
-        "status": "pending"
-    }).to_list(1000)
-    
-    pending_income_total = sum(i["value"] for i in pending_income)
-    pending_expense_total = sum(e["value"] for e in pending_expense)
-    
-    # Current balance
-    current_incomes = await db.incomes.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year,
-        "status": "received"
-    }).to_list(1000)
-    
-    current_expenses = await db.expenses.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year,
-        "status": "paid"
-    }).to_list(1000)
-    
-    current_balance = sum(i["value"] for i in current_incomes) - sum(e["value"] for e in current_expenses)
-    
-    # Forecast for end of current month
-    forecast_current = current_balance + pending_income_total - pending_expense_total
-    
-    # Forecast for next 3 months
-    forecast_months = []
-    balance_accumulator = forecast_current
-    
-    for i in range(1, 4):
-        future_month = month + i
-        future_year = year
-        if future_month > 12:
-            future_month -= 12
-            future_year += 1
-        
-        balance_accumulator += avg_balance
-        
-        forecast_months.append({
-            "month": future_month,
-            "year": future_year,
-            "forecasted_balance": balance_accumulator,
-            "avg_income": avg_income,
-            "avg_expense": avg_expense
-        })
-    
-    return {
-        "current_balance": current_balance,
-        "pending_income": pending_income_total,
-        "pending_expense": pending_expense_total,
-        "forecast_current_month": forecast_current,
-        "average_monthly_balance": avg_balance,
-        "forecast_next_months": forecast_months,
-        "historical_data": months_data[::-1]
-    }
+    return analytics_engine.forecast(await load_user_frame(user["id"], month, year), month, year)
 
 @api_router.get("/analytics/highlights")
+@cached_response("analytics/highlights")
+@precomputed_response("analytics/highlights")
 async def analytics_highlights(
     month: int,
     year: int,
     user: dict = Depends(get_current_user)
 ):
     """Get largest income and expense for the month"""
-    user_id = user["id"]
-    
-    # Get all incomes and expenses
-    incomes = await db.incomes.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year
-    }).to_list(1000)
-    
-    expenses = await db.expenses.find({
-        "user_id": user_id,
-        "month": month,
-        "year": year
-    }).to_list(1000)
-    
-    # Find largest
-    largest_expense = max(expenses, key=lambda x: x["value"]) if expenses else None
-    largest_income = max(incomes, key=lambda x: x["value"]) if incomes else None
-    
-    # Get category names
-    largest_expense_data = None
-    largest_income_data = None
-    
-    if largest_expense:
-        cat = await db.categories.find_one({"id": largest_expense["category_id"]})
-        largest_expense_data = {
-            "value": largest_expense["value"],
-            "description": largest_expense["description"],
-            "category": cat["name"] if cat else "N/A",
-            "date": largest_expense.get("date", ""),
-            "status": largest_expense["status"]
-        }
-    
-    if largest_income:
-        cat = await db.categories.find_one({"id": largest_income["category_id"]})
-        largest_income_data = {
-            "value": largest_income["value"],
-            "description": largest_income["description"],
-            "category": cat["name"] if cat else "N/A",
-            "date": largest_income.get("date", ""),
-            "status": largest_income["status"]
-        }
+    query = {"user_id": user["id"], "month": month, "year": year}
+    largest_income, largest_expense, categories = await asyncio.gather(
+        db.incomes.find(query, {"_id": 0}).sort("value", -1).limit(1).to_list(1),
+        db.expenses.find(query, {"_id": 0}).sort("value", -1).limit(1).to_list(1),
+        db.categories.find({"user_id": user["id"]}, {"_id": 0, "id": 1, "name": 1}).to_list(100)
+    )
+    category_names = analytics_engine.category_names(categories)
     
     return {
-        "largest_expense": largest_expense_data,
-        "largest_income": largest_income_data
+        "largest_expense": analytics_engine.highlight(next(iter(largest_expense), None), category_names),
+        "largest_income": analytics_engine.highlight(next(iter(largest_income), None), category_names)
     }
 
 @api_router.get("/reports/by-category")
-async def get_report_by_category(month: int, year: int, type: str, user: dict = Depends(get_current_user)):
-    categories = await db.categories.find({"user_id": user["id"], "type": type}, {"_id": 0}).to_list(100)
-    budgets = await db.budgets.find({"user_id": user["id"], "month": month, "year": year, "type": type}, {"_id": 0}).to_list(100)
-    
-    if type == "income":
-        records = await db.incomes.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
-    else:
-        records = await db.expenses.find({"user_id": user["id"], "month": month, "year": year}, {"_id": 0}).to_list(1000)
+@cached_response("reports/by-category")
+async def get_report_by_category(
+    type: str,
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+    period: Optional[DateRange] = Depends(date_range),
+    user: dict = Depends(get_current_user)
+):
+    """Planned vs realized per category for a month, or for the ``from``/``to``
+    range, in which case the budgets of every month in it are added up"""
+    records_collection = db.incomes if type == "income" else db.expenses
+    categories, planned_rows, realized_rows = await asyncio.gather(
+        db.categories.find({"user_id": user["id"], "type": type}, {"_id": 0}).to_list(100),
+        db.budgets.aggregate([
+            {"$match": {"user_id": user["id"], "type": type, **month_or_range(month, year, period, dated=False)}},
+            {"$group": {"_id": "$category_id", "cents": money_sum("planned_value")}}
+        ]).to_list(None),
+        records_collection.aggregate([
+            {"$match": {
+                "user_id": user["id"],
+                "status": {"$in": ["received", "paid"]},
+                **month_or_range(month, year, period)
+            }},
+            {"$group": {"_id": "$category_id", "cents": money_sum("value")}}
+        ]).to_list(None)
+    )
+    planned_by_category = {r["_id"]: r["cents"] for r in planned_rows}
+    realized_by_category = {r["_id"]: r["cents"] for r in realized_rows}
     
     result = []
     for cat in categories:
-        cat_records = [r for r in records if r["category_id"] == cat["id"]]
-        realized = sum(r["value"] for r in cat_records if r["status"] in ["received", "paid"])
-        budget = next((b for b in budgets if b["category_id"] == cat["id"]), None)
-        planned = budget["planned_value"] if budget else 0
+        realized = from_cents(realized_by_category.get(cat["id"], 0))
+        planned = from_cents(planned_by_category.get(cat["id"], 0))
         
         result.append({
             "category_id": cat["id"],
@@ -1918,7 +2833,7 @@ async def get_report_by_category(month: int, year: int, type: str, user: dict =
 
 # ==================== GOALS (METAS) ROUTES ====================
 
-@api_router.get("/goals")
+@api_router.get("/goals", dependencies=[Depends(collection_etag("goals"))])
 async def get_goals(user: dict = Depends(get_current_user)):
     """Get all goals for current user"""
     goals = await db.goals.find({"user_id": user["id"]}, {"_id": 0}).to_list(100)
@@ -1932,6 +2847,7 @@ async def create_goal(data: GoalBase, user: dict = Depends(get_current_user)):
         user_id=user["id"]
     )
     await db.goals.insert_one(goal.model_dump())
+    data_versions.bump(user["id"], "goals")
     return goal.model_dump()
 
 @api_router.get("/goals/{goal_id}")
@@ -1947,12 +2863,13 @@ async def update_goal(goal_id: str, data: GoalBase, user: dict = Depends(get_cur
     """Update a goal"""
     result = await db.goals.update_one(
         {"id": goal_id, "user_id": user["id"]},
-        {"$set": data.model_dump()}
+        {"$set": {**data.model_dump(), "updated_at": utc_now_iso()}}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Goal not found")
     
     updated = await db.goals.find_one({"id": goal_id}, {"_id": 0})
+    data_versions.bump(user["id"], "goals")
     return updated
 
 @api_router.delete("/goals/{goal_id}")
@@ -1964,6 +2881,8 @@ async def delete_goal(goal_id: str, user: dict = Depends(get_current_user)):
     
     # Also delete contributions
     await db.goal_contributions.delete_many({"goal_id": goal_id})
+    await record_deletion(user["id"], "goals", goal_id)
+    data_versions.bump(user["id"], "goals", "goal_contributions")
     return {"message": "Goal deleted successfully"}
 
 @api_router.post("/goals/{goal_id}/contribute")
@@ -1983,15 +2902,17 @@ async def add_goal_contribution(goal_id: str, value: float, note: Optional[str]
     await db.goal_contributions.insert_one(contribution.model_dump())
     
     # Update goal current value
-    new_value = goal["current_value"] + value
-    is_completed = new_value >= goal["target_value"]
+    new_cents = doc_cents(goal, "current_value") + contribution.value_cents
+    new_value = from_cents(new_cents)
+    is_completed = new_cents >= doc_cents(goal, "target_value")
     
-    update_data = {"current_value": new_value}
+    update_data = {"current_value": new_value, "current_value_cents": new_cents, "updated_at": utc_now_iso()}
     if is_completed and not goal.get("is_completed"):
         update_data["is_completed"] = True
         update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.goals.update_one({"id": goal_id}, {"$set": update_data})
+    data_versions.bump(user["id"], "goals", "goal_contributions")
     
     return {"message": "Contribution added", "new_value": new_value, "is_completed": is_completed}
 
@@ -2010,22 +2931,241 @@ async def get_goal_contributions(goal_id: str, user: dict = Depends(get_current_
 
 # ==================== CHAT ASSISTANT ROUTES ====================
 
-@api_router.post("/chat", response_model=ChatResponse)
-async def chat_with_assistant(data: ChatRequest, user: dict = Depends(get_current_user)):
-    """Chat with the AI financial assistant"""
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
-    session_id = data.session_id or str(uuid.uuid4())
-    
-    # Get user's financial context
-    current_date = datetime.now(timezone.utc)
-    month = current_date.month
-    year = current_date.year
-    
-    # Get financial summary for context
-    incomes = await db.incomes.find({"user_id": user["id"], "month": month, "year": year}).to_list(100)
-    expenses = await db.expenses.find({"user_id": user["id"], "month": month, "year": year}).to_list(100)
-    goals = await db.goals.find({"user_id": user["id"], "is_completed": False}).to_list(10)
+class LLMBackend(ABC):
+    """Chat model used by the assistant; subclasses implement ``stream``"""
+
+    @abstractmethod
+    def stream(self, session_key: str, system_message: str, text: str) -> AsyncIterator[str]:
+        """Answer chunks as they are generated (an async generator)"""
+
+    async def complete(self, session_key: str, system_message: str, text: str) -> str:
+        return "".join([chunk async for chunk in self.stream(session_key, system_message, text)])
+
+class EmergentLLM(LLMBackend):
+    """LLM access through emergentintegrations (OpenAI gpt-4.1)"""
+
+    async def stream(self, session_key: str, system_message: str, text: str) -> AsyncIterator[str]:
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+        
+        api_key = os.environ.get("EMERGENT_LLM_KEY")
+        if not api_key:
+            raise HTTPException(status_code=500, detail="AI service not configured")
+        
+        chat = LlmChat(
+            api_key=api_key,
+            session_id=session_key,
+            system_message=system_message
+        ).with_model("openai", "gpt-4.1")
+        
+        # LlmChat only hands back whole completions, so the stream is one chunk
+        yield await chat.send_message(UserMessage(text=text))
+
+class FakeLLM(LLMBackend):
+    """Offline stand-in that streams a canned answer word by word, with
+    configurable time-to-first-token and inter-token delays. Selected with
+    LLM_BACKEND=fake for local development, load tests and benchmarks."""
+
+    def __init__(self, first_token_ms: float, token_ms: float):
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+
+    async def stream(self, session_key: str, system_message: str, text: str) -> AsyncIterator[str]:
+        await asyncio.sleep(self.first_token_ms / 1000)
+        words = f"Resposta simulada para: {text}".split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_ms / 1000)
+            yield word if i == 0 else f" {word}"
+
+class LLMGateway:
+    """Admission control in front of the chat model.
+    
+    At most ``max_concurrency`` calls run at once and each user may hold
+    ``max_per_user`` of them; further callers wait in a bounded queue for up
+    to ``max_wait`` seconds. A full queue, an exhausted per-user allowance or
+    an expired wait is rejected immediately with 429/503 instead of tying up
+    the request, and each admitted call is cut off after ``timeout`` seconds."""
+
+    def __init__(self, backend: LLMBackend, max_concurrency: int, max_per_user: int,
+                 max_queue: int, max_wait: float, timeout: float):
+        self.backend = backend
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._user_calls: Dict[str, int] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"admitted": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self.wait_ms = deque(maxlen=1000)
+        self.latency_ms = deque(maxlen=1000)
+
+    async def _admit(self, user_id: str):
+        if self._user_calls.get(user_id, 0) >= self.max_per_user:
+            self.counters["rejected"] += 1
+            raise HTTPException(status_code=429, detail="Aguarde a resposta anterior do assistente",
+                                headers={"Retry-After": "2"})
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise HTTPException(status_code=503, detail="Assistente ocupado, tente novamente em instantes",
+                                headers={"Retry-After": "5"})
+        
+        self._user_calls[user_id] = self._user_calls.get(user_id, 0) + 1
+        started = time.perf_counter()
+        if self._slots.locked():
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self._leave(user_id)
+                self.counters["rejected"] += 1
+                raise HTTPException(status_code=503, detail="Assistente ocupado, tente novamente em instantes",
+                                    headers={"Retry-After": "5"})
+            except BaseException:
+                self._leave(user_id)
+                raise
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+        
+        self.wait_ms.append((time.perf_counter() - started) * 1000)
+        self.counters["admitted"] += 1
+        self.in_flight += 1
+
+    def _leave(self, user_id: str):
+        remaining = self._user_calls.get(user_id, 1) - 1
+        if remaining:
+            self._user_calls[user_id] = remaining
+        else:
+            self._user_calls.pop(user_id, None)
+
+    def _release(self, user_id: str, started: float):
+        self.latency_ms.append((time.perf_counter() - started) * 1000)
+        self.in_flight -= 1
+        self._slots.release()
+        self._leave(user_id)
+
+    async def stream(self, user_id: str, session_key: str, system_message: str, text: str) -> AsyncIterator[str]:
+        """Admit a call and return its tokens. Admission is awaited here,
+        before the caller starts a response, so a rejection is still a plain
+        429/503. The slot is held until the returned generator is exhausted
+        or closed."""
+        tokens = self._generate(user_id, session_key, system_message, text)
+        await tokens.__anext__()  # runs up to admission
+        return tokens
+
+    async def _generate(self, user_id: str, session_key: str, system_message: str, text: str) -> AsyncIterator[str]:
+        # Not made current: the generator is resumed from whatever context
+        # consumes it, so the span is only ended here, never activated
+        span = tracer.start_span("llm.chat", kind="client", attributes={
+            "llm.backend": type(self.backend).__name__, "llm.queue_depth": self.queued
+        })
+        try:
+            await self._admit(user_id)
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            tracer.end(span)
+            raise
+        span.add_event("admitted")
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        tokens = self.backend.stream(session_key, system_message, text)
+        chunks = 0
+        try:
+            # Suspends here once admitted, so closing the generator from now
+            # on always reaches the release below
+            yield ""
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(tokens.__anext__(), timeout=max(deadline - time.perf_counter(), 0))
+                except StopAsyncIteration:
+                    return
+                if not chunks:
+                    span.add_event("first_token")
+                chunks += 1
+                yield chunk
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            span.set_error("timeout")
+            raise HTTPException(status_code=504, detail="O assistente demorou demais para responder")
+        except HTTPException:
+            raise
+        except Exception as e:
+            self.counters["errors"] += 1
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            await tokens.aclose()
+            self._release(user_id, started)
+            span.set_attribute("llm.chunks", chunks)
+            tracer.end(span)
+
+    async def complete(self, user_id: str, session_key: str, system_message: str, text: str) -> str:
+        tokens = await self.stream(user_id, session_key, system_message, text)
+        try:
+            return "".join([chunk async for chunk in tokens])
+        finally:
+            await tokens.aclose()
+
+    def stats(self) -> dict:
+        def percentiles(samples) -> dict:
+            ordered = sorted(samples)
+            if not ordered:
+                return {"p50": None, "p95": None, "max": None}
+
+            def pick(q: float) -> float:
+                return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 1)
+            return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 1)}
+        
+        return {
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            **self.counters,
+            "wait_ms": percentiles(self.wait_ms),
+            "latency_ms": percentiles(self.latency_ms)
+        }
+
+llm = LLMGateway(
+    FakeLLM(FAKE_LLM_FIRST_TOKEN_MS, FAKE_LLM_TOKEN_MS) if LLM_BACKEND == "fake" else EmergentLLM(),
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_per_user=LLM_MAX_CONCURRENCY_PER_USER,
+    max_queue=LLM_MAX_QUEUE,
+    max_wait=LLM_MAX_WAIT_SECONDS,
+    timeout=LLM_CALL_TIMEOUT_SECONDS
+)
+
+# Financial context for the assistant, rebuilt only when the user's data
+# version (or the day, for due dates) changes
+chat_context_cache = ResponseCache(CHAT_CONTEXT_CACHE_MAX_BYTES, ttl_seconds=24 * 60 * 60)
+
+async def get_financial_context(user: dict) -> str:
+    today = datetime.now(timezone.utc).date()
+    key = (user["id"], "chat-context", (today.isoformat(), user["name"]))
+    version = data_versions.get(user["id"])
+    cached = chat_context_cache.get(key, version)
+    if cached is not None:
+        return cached.decode("utf-8")
+    
+    context = await build_financial_context(user, today)
+    chat_context_cache.put(key, version, context.encode("utf-8"))
+    return context
+
+async def build_financial_context(user: dict, today) -> str:
+    month = today.month
+    year = today.year
+    month_query = {"user_id": user["id"], "month": month, "year": year}
+    
+    incomes, expenses, goals, categories, budgets, pending = await asyncio.gather(
+        db.incomes.find(month_query, {"_id": 0}).to_list(100),
+        db.expenses.find(month_query, {"_id": 0}).to_list(100),
+        db.goals.find({"user_id": user["id"], "is_completed": False}, {"_id": 0}).to_list(10),
+        db.categories.find({"user_id": user["id"]}, {"_id": 0}).to_list(100),
+        db.budgets.find({**month_query, "type": "expense"}, {"_id": 0}).to_list(100),
+        db.expenses.find({"user_id": user["id"], "status": "pending"}, {"_id": 0}).to_list(1000)
+    )
+    cat_names = {c["id"]: c["name"] for c in categories}
     
     total_income = sum(i.get("value", 0) for i in incomes)
     total_expenses = sum(e.get("value", 0) for e in expenses)
@@ -2041,20 +3181,67 @@ Contexto Financeiro do Usuário ({user['name']}):
 - Metas ativas: {len(goals)}
 """
     
+    spent_by_category = {}
+    for e in expenses:
+        spent_by_category[e["category_id"]] = spent_by_category.get(e["category_id"], 0) + e.get("value", 0)
+    if spent_by_category:
+        financial_context += "\nMaiores gastos por categoria:\n"
+        for cat_id, total in sorted(spent_by_category.items(), key=lambda x: x[1], reverse=True)[:5]:
+            financial_context += f"  - {cat_names.get(cat_id, 'Outros')}: R$ {total:.2f}\n"
+    
+    if budgets:
+        financial_context += "\nOrçamentos do mês:\n"
+        for b in budgets:
+            spent = spent_by_category.get(b["category_id"], 0)
+            planned = b["planned_value"]
+            usage = f"{spent / planned * 100:.0f}%" if planned > 0 else "sem limite"
+            financial_context += f"  - {cat_names.get(b['category_id'], 'Categoria')}: R$ {spent:.2f} de R$ {planned:.2f} ({usage})\n"
+    
+    upcoming = []
+    overdue_total = 0
+    overdue_count = 0
+    for e in pending:
+        due_date = expense_due_day(e)
+        if not due_date:
+            continue
+        if due_date < today:
+            overdue_count += 1
+            overdue_total += e.get("value", 0)
+        elif (due_date - today).days <= 7:
+            upcoming.append((due_date, e))
+    if upcoming:
+        financial_context += "\nContas a vencer nos próximos 7 dias:\n"
+        for due_date, e in sorted(upcoming, key=lambda x: x[0])[:5]:
+            financial_context += f"  - {e.get('description') or 'Sem descrição'}: R$ {e.get('value', 0):.2f} em {due_date.strftime('%d/%m')}\n"
+    if overdue_count:
+        financial_context += f"\nContas vencidas: {overdue_count} (R$ {overdue_total:.2f})\n"
+    
     if goals:
         financial_context += "\nMetas em andamento:\n"
         for g in goals[:5]:
             progress = (g.get("current_value", 0) / g.get("target_value", 1)) * 100
             financial_context += f"  - {g['name']}: {progress:.1f}% (R$ {g.get('current_value', 0):.2f} / R$ {g.get('target_value', 0):.2f})\n"
     
-    # Get previous messages for context
-    previous_messages = await db.chat_messages.find(
-        {"user_id": user["id"], "session_id": session_id}
-    ).sort("created_at", 1).to_list(20)
+    return financial_context
+
+async def build_chat_system_message(user: dict, session_id: str) -> str:
+    """System prompt with the user's financial context and recent history"""
+    financial_context = await get_financial_context(user)
+    
+    # Older turns are folded into the session summary; only the most recent
+    # window is sent verbatim
+    summary_doc, recent_messages = await asyncio.gather(
+        db.chat_summaries.find_one({"user_id": user["id"], "session_id": session_id}),
+        db.chat_messages.find(
+            {"user_id": user["id"], "session_id": session_id}
+        ).sort("created_at", -1).limit(CHAT_HISTORY_WINDOW).to_list(CHAT_HISTORY_WINDOW)
+    )
     
     # Build conversation history as text
     conversation_history = ""
-    for msg in previous_messages[-10:]:
+    if summary_doc and summary_doc.get("summary"):
+        conversation_history += f"Resumo da conversa anterior: {summary_doc['summary']}\n\n"
+    for msg in reversed(recent_messages):
         role_label = "Usuário" if msg["role"] == "user" else "Assistente"
         conversation_history += f"{role_label}: {msg['content']}\n\n"
     
@@ -2074,45 +3261,305 @@ Regras:
 
 {f"Histórico da conversa:{chr(10)}{conversation_history}" if conversation_history else ""}
 """
-    
+    return system_message
+
+async def save_chat_turn(user_id: str, session_id: str, question: str, answer: str):
+    user_msg = ChatMessage(
+        user_id=user_id,
+        session_id=session_id,
+        role="user",
+        content=question
+    )
+    assistant_msg = ChatMessage(
+        user_id=user_id,
+        session_id=session_id,
+        role="assistant",
+        content=answer
+    )
+    key = {"user_id": user_id, "session_id": session_id}
+    await db.chat_messages.insert_many([user_msg.model_dump(), assistant_msg.model_dump()])
+    # Retention runs from the session's last message and is tracked on the
+    # session document alone; purge_expired_chats takes the rest with it
+    result = await db.chat_sessions.update_one(
+        key,
+        {
+            "$set": {
+                "last_message": answer,
+                "updated_at": assistant_msg.created_at,
+                "expires_at": chat_session_expiry(datetime.now(timezone.utc))
+            },
+            "$inc": {"message_count": 2},
+            "$setOnInsert": {"created_at": user_msg.created_at}
+        },
+        upsert=True
+    )
+    if result.upserted_id is not None:
+        # New session, or one purged while this turn was being saved:
+        # count the messages that are actually there
+        count = await db.chat_messages.count_documents(key)
+        if count != 2:
+            await db.chat_sessions.update_one(key, {"$set": {"message_count": count}})
+    run_in_background(refresh_chat_summary(user_id, session_id))
+
+async def ensure_chat_indexes():
+    await db.chat_messages.create_index([("user_id", 1), ("session_id", 1), ("created_at", 1)])
+    await db.chat_summaries.create_index([("user_id", 1), ("session_id", 1)], unique=True)
+    await db.chat_sessions.create_index([("user_id", 1), ("session_id", 1)], unique=True)
+    await db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)])
+    # Retention: only sessions carry an expiry. purge_expired_chats drops them
+    # with their messages and summary; the TTL index is a backstop for
+    # sessions it has not reached a day later
+    await db.chat_sessions.create_index("expires_at", expireAfterSeconds=0)
+    for collection in ("chat_messages", "chat_summaries"):
+        # Messages and summaries used to expire on their own
+        try:
+            await db[collection].drop_index("expires_at_1")
+        except OperationFailure:
+            pass
+
+def chat_session_expiry(last_activity: datetime) -> datetime:
+    """``expires_at`` of a session active at ``last_activity``: the end of its
+    retention plus the TTL grace period"""
+    return last_activity + timedelta(days=CHAT_RETENTION_DAYS + CHAT_TTL_GRACE_DAYS)
+
+async def purge_expired_chats(batch_size: int = 500) -> int:
+    """Delete the sessions whose retention has ended along with their
+    messages and summary; returns how many sessions went. The session goes
+    last, so an interrupted purge is picked up again on the next run."""
+    # Retention ended: the expiry, less the grace period, has passed
+    cutoff = datetime.now(timezone.utc) + timedelta(days=CHAT_TTL_GRACE_DAYS)
+    purged = 0
+    while True:
+        sessions = await db.chat_sessions.find(
+            {"expires_at": {"$lte": cutoff}}, {"_id": 1, "user_id": 1, "session_id": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not sessions:
+            return purged
+        for session in sessions:
+            key = {"user_id": session["user_id"], "session_id": session["session_id"]}
+            await db.chat_messages.delete_many(key)
+            await db.chat_summaries.delete_one(key)
+        # A session that got a new turn meanwhile has moved its expiry and stays
+        result = await db.chat_sessions.delete_many(
+            {"_id": {"$in": [session["_id"] for session in sessions]}, "expires_at": {"$lte": cutoff}}
+        )
+        purged += result.deleted_count
+        if len(sessions) < batch_size:
+            return purged
+
+async def purge_expired_chats_periodically():
+    while True:
+        try:
+            await purge_expired_chats()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Chat purge error: {e}")
+        await asyncio.sleep(CHAT_PURGE_INTERVAL_SECONDS)
+
+async def backfill_chat_sessions():
+    """Build chat_sessions from messages stored before it existed. Their
+    retention starts at the deploy, not at their last message, so history
+    older than CHAT_RETENTION_DAYS is not wiped the moment this runs."""
+    pipeline = [
+        {"$sort": {"created_at": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "session_id": "$session_id"},
+            "last_message": {"$last": "$content"},
+            "message_count": {"$sum": 1},
+            "created_at": {"$first": "$created_at"},
+            "updated_at": {"$last": "$created_at"}
+        }}
+    ]
+    expires_at = chat_session_expiry(datetime.now(timezone.utc))
+    async for s in db.chat_messages.aggregate(pipeline, allowDiskUse=True):
+        await db.chat_sessions.update_one(
+            {"user_id": s["_id"]["user_id"], "session_id": s["_id"]["session_id"]},
+            {"$setOnInsert": {
+                "last_message": s["last_message"],
+                "message_count": s["message_count"],
+                "created_at": s["created_at"],
+                "updated_at": s["updated_at"],
+                "expires_at": expires_at
+            }},
+            upsert=True
+        )
+
+# ==================== CHAT MEMORY ====================
+
+CHAT_SUMMARY_PROMPT = """Você resume conversas entre um usuário e um assistente financeiro.
+Atualize o resumo existente com as novas mensagens, mantendo fatos, valores,
+decisões e pedidos do usuário que possam importar nas próximas respostas.
+Responda apenas com o resumo atualizado, em português, em no máximo 150 palavras."""
+
+background_tasks = set()
+summaries_in_progress = set()
+
+def run_in_background(coro):
+    """Fire-and-forget a coroutine, keeping a reference until it finishes"""
+    # Outlives the request that started it, so keep its queries off that
+    # request's stats and its spans out of that request's trace
+    context = contextvars.copy_context()
+    context.run(current_mongo_stats.set, None)
+    context.run(tracing.current_span.set, None)
+    task = asyncio.create_task(coro, context=context)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def refresh_chat_summary(user_id: str, session_id: str):
+    """Fold messages that have left the recent window into the session's
+    rolling summary. Runs after a turn is saved, off the request path."""
+    key = (user_id, session_id)
+    if key in summaries_in_progress:
+        return
+    summaries_in_progress.add(key)
     try:
-        # Initialize chat
-        api_key = os.environ.get("EMERGENT_LLM_KEY")
-        if not api_key:
-            raise HTTPException(status_code=500, detail="AI service not configured")
-        
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"{user['id']}_{session_id}",
-            system_message=system_message
-        ).with_model("openai", "gpt-4.1")
-        
-        # Send new message
-        user_message = UserMessage(text=data.message)
-        response = await chat.send_message(user_message)
+        summary_doc = await db.chat_summaries.find_one({"user_id": user_id, "session_id": session_id}) or {}
+        query = {"user_id": user_id, "session_id": session_id}
+        if summary_doc.get("summarized_until"):
+            query["created_at"] = {"$gt": summary_doc["summarized_until"]}
+        batch = CHAT_HISTORY_WINDOW + 50
+        pending = await db.chat_messages.find(query).sort("created_at", 1).limit(batch).to_list(batch)
+        to_fold = pending[:-CHAT_HISTORY_WINDOW] if CHAT_HISTORY_WINDOW else pending
+        if not to_fold:
+            return
         
-        # Save messages to database
-        user_msg = ChatMessage(
-            user_id=user["id"],
-            session_id=session_id,
-            role="user",
-            content=data.message
+        transcript = "\n".join(
+            f"{'Usuário' if m['role'] == 'user' else 'Assistente'}: {m['content']}" for m in to_fold
         )
-        assistant_msg = ChatMessage(
-            user_id=user["id"],
-            session_id=session_id,
-            role="assistant",
-            content=response
+        request = f"Resumo existente: {summary_doc.get('summary') or '(vazio)'}\n\nNovas mensagens:\n{transcript}"
+        # Summaries have their own per-user allowance so they never crowd out the user's next question
+        summary = await llm.complete(f"{user_id}:summary", f"{user_id}_{session_id}_summary", CHAT_SUMMARY_PROMPT, request)
+        
+        await db.chat_summaries.update_one(
+            {"user_id": user_id, "session_id": session_id},
+            {"$set": {
+                "summary": summary.strip()[:CHAT_SUMMARY_MAX_CHARS],
+                "summarized_until": to_fold[-1]["created_at"],
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }},
+            upsert=True
         )
+    except Exception as e:
+        # The unsummarised messages stay pending and are retried next turn
+        logging.error(f"Chat summary error: {e}")
+    finally:
+        summaries_in_progress.discard(key)
+
+# Answers to repeated questions asked against the same financial context
+llm_response_cache = ResponseCache(LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS)
+
+def normalize_question(text: str) -> str:
+    """Fold case, accents, whitespace and trailing punctuation, so that
+    "Quanto gastei este mês?" and "quanto gastei este mes" share an entry"""
+    return fold_text(text).strip(" ?!.")
+
+# Words that point back at earlier turns ("e isso?", "como assim a anterior?"):
+# the answer depends on the conversation, not just the question
+FOLLOW_UP_WORDS = re.compile(
+    r"\b(isso|isto|disso|disto|nisso|nisto|anterior|acima|mencionou|mencionado|disse|falou|"
+    r"falamos|respondeu|resposta|continue|continua|explique melhor|como assim)\b"
+)
+
+def refers_to_history(message: str) -> bool:
+    return bool(FOLLOW_UP_WORDS.search(fold_text(message)))
+
+async def llm_cache_key(user: dict, message: str) -> Optional[Tuple]:
+    """The normalized question plus a hash of the financial context, which is
+    rebuilt with the user's data version: the same question over the same
+    data gets the same answer, across turns and users. None (do not cache)
+    when the question refers back to the conversation."""
+    if refers_to_history(message):
+        return None
+    context = await get_financial_context(user)
+    context_hash = hashlib.sha1(context.encode("utf-8")).hexdigest()
+    return ("llm", normalize_question(message), context_hash)
+
+async def replay_answer(answer: str) -> AsyncIterator[str]:
+    yield answer
+
+@api_router.post("/chat", response_model=ChatResponse)
+async def chat_with_assistant(data: ChatRequest, user: dict = Depends(get_current_user)):
+    """Chat with the AI financial assistant"""
+    session_id = data.session_id or str(uuid.uuid4())
+    
+    try:
+        with tracer.span("chat.context"):
+            cache_key = await llm_cache_key(user, data.message)
+        cached = llm_response_cache.get(cache_key, 0) if cache_key else None
+        if cached is not None:
+            response = cached.decode("utf-8")
+        else:
+            with tracer.span("chat.system_message"):
+                system_message = await build_chat_system_message(user, session_id)
+            response = await llm.complete(user["id"], f"{user['id']}_{session_id}", system_message, data.message)
+            if cache_key:
+                llm_response_cache.put(cache_key, 0, response.encode("utf-8"))
         
-        await db.chat_messages.insert_many([user_msg.model_dump(), assistant_msg.model_dump()])
+        # Save messages to database
+        await save_chat_turn(user["id"], session_id, data.message, response)
         
         return ChatResponse(response=response, session_id=session_id)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+@api_router.post("/chat/stream")
+async def chat_with_assistant_stream(data: ChatRequest, user: dict = Depends(get_current_user)):
+    """Chat with the AI financial assistant, streaming the answer as
+    server-sent events: ``session``, then ``token`` chunks, then ``done``.
+    
+    The message pair is saved once the answer is complete; if the client
+    disconnects first, generation is cancelled and nothing is saved. The
+    call is admitted before the stream starts, so a busy assistant answers
+    429/503 like ``/chat``."""
+    session_id = data.session_id or str(uuid.uuid4())
+    with tracer.span("chat.context"):
+        cache_key = await llm_cache_key(user, data.message)
+    cached = llm_response_cache.get(cache_key, 0) if cache_key else None
+    if cached is not None:
+        tokens = replay_answer(cached.decode("utf-8"))
+    else:
+        with tracer.span("chat.system_message"):
+            system_message = await build_chat_system_message(user, session_id)
+        tokens = await llm.stream(user["id"], f"{user['id']}_{session_id}", system_message, data.message)
+    
+    async def event_stream():
+        yield f"event: session\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        chunks = []
+        try:
+            async for chunk in tokens:
+                chunks.append(chunk)
+                yield f"event: token\ndata: {json.dumps({'text': chunk}, ensure_ascii=False)}\n\n"
+        except asyncio.CancelledError:
+            logging.info(f"Chat stream cancelled by client (session {session_id})")
+            raise
+        except HTTPException as e:
+            yield f"event: error\ndata: {json.dumps({'status': e.status_code, 'detail': e.detail}, ensure_ascii=False)}\n\n"
+            return
+        except Exception as e:
+            logging.error(f"Chat error: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': f'Error processing chat: {str(e)}'})}\n\n"
+            return
+        finally:
+            await tokens.aclose()
+        
+        answer = "".join(chunks)
+        if cached is None and cache_key:
+            llm_response_cache.put(cache_key, 0, answer.encode("utf-8"))
+        await save_chat_turn(user["id"], session_id, data.message, answer)
+        yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/chat/history")
 async def get_chat_history(session_id: Optional[str] = None, user: dict = Depends(get_current_user)):
     """Get chat history for user"""
@@ -2120,161 +3567,40 @@ async def get_chat_history(session_id: Optional[str] = None, user: dict = Depend
     if session_id:
         query["session_id"] = session_id
     
-    messages = await db.chat_messages.find(query, {"_id": 0}).sort("created_at", 1).to_list(100)
+    messages = await db.chat_messages.find(query, {"_id": 0, "expires_at": 0}).sort("created_at", 1).to_list(100)
     return messages
 
 @api_router.get("/chat/sessions")
 async def get_chat_sessions(user: dict = Depends(get_current_user)):
     """Get list of chat sessions for user"""
-    pipeline = [
-        {"$match": {"user_id": user["id"]}},
-        {"$group": {
-            "_id": "$session_id",
-            "last_message": {"$last": "$content"},
-            "message_count": {"$sum": 1},
-            "created_at": {"$first": "$created_at"},
-            "updated_at": {"$last": "$created_at"}
-        }},
-        {"$sort": {"updated_at": -1}},
-        {"$limit": 20}
-    ]
-    sessions = await db.chat_messages.aggregate(pipeline).to_list(20)
-    return [{"session_id": s["_id"], **{k: v for k, v in s.items() if k != "_id"}} for s in sessions]
+    return await db.chat_sessions.find(
+        {"user_id": user["id"]},
+        {"_id": 0, "user_id": 0, "expires_at": 0}
+    ).sort("updated_at", -1).limit(20).to_list(20)
 
 @api_router.delete("/chat/sessions/{session_id}")
 async def delete_chat_session(session_id: str, user: dict = Depends(get_current_user)):
     """Delete a chat session"""
     result = await db.chat_messages.delete_many({"session_id": session_id, "user_id": user["id"]})
+    await db.chat_summaries.delete_one({"session_id": session_id, "user_id": user["id"]})
+    await db.chat_sessions.delete_one({"session_id": session_id, "user_id": user["id"]})
     return {"deleted": result.deleted_count}
 
 # ==================== PERSONALIZED TIPS ROUTES ====================
 
 @api_router.get("/tips/personalized")
+@cached_response("tips/personalized")
+@precomputed_response("tips/personalized")
 async def get_personalized_tips(user: dict = Depends(get_current_user)):
     """Get personalized financial tips based on user's data"""
     current_date = datetime.now(timezone.utc)
-    month = current_date.month
-    year = current_date.year
-    
-    tips = []
-    
-    # Get current month data
-    expenses = await db.expenses.find({"user_id": user["id"], "month": month, "year": year}).to_list(500)
-    incomes = await db.incomes.find({"user_id": user["id"], "month": month, "year": year}).to_list(100)
-    
-    # Get last month data for comparison
-    last_month = month - 1 if month > 1 else 12
-    last_year = year if month > 1 else year - 1
-    last_month_expenses = await db.expenses.find({"user_id": user["id"], "month": last_month, "year": last_year}).to_list(500)
-    
-    total_income = sum(i.get("value", 0) for i in incomes if i.get("status") == "received")
-    total_expenses = sum(e.get("value", 0) for e in expenses if e.get("status") == "paid")
-    total_last_month = sum(e.get("value", 0) for e in last_month_expenses if e.get("status") == "paid")
-    
-    # Tip 1: Spending comparison
-    if total_last_month > 0:
-        change_percent = ((total_expenses - total_last_month) / total_last_month) * 100
-        if change_percent > 20:
-            tips.append({
-                "type": "warning",
-                "icon": "trending-up",
-                "title": "Gastos aumentaram",
-                "message": f"Seus gastos aumentaram {change_percent:.1f}% em relação ao mês passado. Considere revisar suas despesas.",
-                "priority": "high"
-            })
-        elif change_percent < -10:
-            tips.append({
-                "type": "success",
-                "icon": "trending-down",
-                "title": "Parabéns! Gastos reduziram",
-                "message": f"Você reduziu seus gastos em {abs(change_percent):.1f}% em relação ao mês passado. Continue assim!",
-                "priority": "low"
-            })
-    
-    # Tip 2: Savings rate
-    if total_income > 0:
-        savings_rate = ((total_income - total_expenses) / total_income) * 100
-        if savings_rate < 10:
-            tips.append({
-                "type": "warning",
-                "icon": "piggy-bank",
-                "title": "Taxa de poupança baixa",
-                "message": f"Você está economizando apenas {savings_rate:.1f}% da sua renda. Especialistas recomendam poupar pelo menos 20%.",
-                "priority": "high"
-            })
-        elif savings_rate >= 20:
-            tips.append({
-                "type": "success",
-                "icon": "piggy-bank",
-                "title": "Excelente taxa de poupança!",
-                "message": f"Você está economizando {savings_rate:.1f}% da sua renda. Parabéns pela disciplina financeira!",
-                "priority": "low"
-            })
-    
-    # Tip 3: Category analysis
-    category_totals = {}
-    for exp in expenses:
-        cat_id = exp.get("category_id", "other")
-        category_totals[cat_id] = category_totals.get(cat_id, 0) + exp.get("value", 0)
-    
-    if category_totals:
-        top_category_id = max(category_totals, key=category_totals.get)
-        top_category = await db.categories.find_one({"id": top_category_id})
-        top_category_name = top_category.get("name", "Outros") if top_category else "Outros"
-        top_category_value = category_totals[top_category_id]
-        top_category_percent = (top_category_value / total_expenses * 100) if total_expenses > 0 else 0
-        
-        if top_category_percent > 40:
-            tips.append({
-                "type": "info",
-                "icon": "pie-chart",
-                "title": f"Concentração em {top_category_name}",
-                "message": f"{top_category_percent:.1f}% dos seus gastos estão em '{top_category_name}'. Considere diversificar ou reduzir gastos nessa categoria.",
-                "priority": "medium"
-            })
-    
-    # Tip 4: Pending bills
-    pending_expenses = [e for e in expenses if e.get("status") == "pending"]
-    total_pending = sum(e.get("value", 0) for e in pending_expenses)
-    if total_pending > 0:
-        tips.append({
-            "type": "info",
-            "icon": "clock",
-            "title": "Contas pendentes",
-            "message": f"Você tem R$ {total_pending:.2f} em contas pendentes este mês. Não esqueça de pagá-las!",
-            "priority": "medium"
-        })
-    
-    # Tip 5: Goals progress
-    goals = await db.goals.find({"user_id": user["id"], "is_completed": False}).to_list(10)
-    for goal in goals:
-        progress = (goal.get("current_value", 0) / goal.get("target_value", 1)) * 100
-        if progress >= 90 and progress < 100:
-            tips.append({
-                "type": "success",
-                "icon": "target",
-                "title": f"Meta '{goal['name']}' quase lá!",
-                "message": f"Faltam apenas R$ {goal['target_value'] - goal['current_value']:.2f} para completar sua meta. Continue!",
-                "priority": "medium"
-            })
-    
-    # Tip 6: Credit card usage
-    credit_expenses = [e for e in expenses if e.get("payment_method") == "credit"]
-    credit_total = sum(e.get("value", 0) for e in credit_expenses)
-    if total_expenses > 0 and credit_total / total_expenses > 0.5:
-        tips.append({
-            "type": "warning",
-            "icon": "credit-card",
-            "title": "Alto uso de cartão de crédito",
-            "message": f"Mais de 50% dos seus gastos são no cartão de crédito. Cuidado com os juros!",
-            "priority": "high"
-        })
-    
-    # Sort by priority
-    priority_order = {"high": 0, "medium": 1, "low": 2}
-    tips.sort(key=lambda x: priority_order.get(x["priority"], 1))
-    
-    return tips[:6]  # Return max 6 tips
+    frame, categories, goals = await asyncio.gather(
+        load_user_frame(user["id"], current_date.month, current_date.year),
+        db.categories.find({"user_id": user["id"]}, {"_id": 0, "id": 1, "name": 1}).to_list(100),
+        db.goals.find({"user_id": user["id"], "is_completed": False}, {"_id": 0}).to_list(10)
+    )
+    category_names = analytics_engine.category_names(categories)
+    return analytics_engine.tips(frame, current_date.month, current_date.year, category_names, goals)
 
 # ==================== HEALTH CHECK ====================
 
@@ -2361,6 +3687,9 @@ async def import_bank_statement(data: BankStatementImport, user: dict = Depends(
         except Exception as e:
             errors.append(f"Linha {i+1}: {str(e)}")
     
+    if imported_incomes or imported_expenses:
+        data_versions.bump(user["id"], "incomes", "expenses")
+    
     return {
         "success": True,
         "imported_incomes": imported_incomes,
@@ -2369,13 +3698,12 @@ async def import_bank_statement(data: BankStatementImport, user: dict = Depends(
         "errors": errors[:10] if errors else []  # Return max 10 errors
     }
 
-@api_router.post("/import/parse-csv")
-async def parse_csv_content(request: Request, user: dict = Depends(get_current_user)):
-    """Parse CSV content and return structured data for review"""
+def read_csv_preview(body: bytes, limit: int = 100) -> Tuple[str, List[List[str]]]:
+    """Delimiter and first ``limit`` rows (header included) of a CSV upload"""
     import io
     import csv
+    import itertools
     
-    body = await request.body()
     content = body.decode('utf-8')
     
     # Try to detect delimiter
@@ -2383,7 +3711,15 @@ async def parse_csv_content(request: Request, user: dict = Depends(get_current_u
     delimiter = ';' if sample.count(';') > sample.count(',') else ','
     
     reader = csv.reader(io.StringIO(content), delimiter=delimiter)
-    rows = list(reader)
+    # Only the preview is returned, so the rest of the file is never parsed
+    return delimiter, list(itertools.islice(reader, limit))
+
+@api_router.post("/import/parse-csv")
+async def parse_csv_content(request: Request, user: dict = Depends(get_current_user)):
+    """Parse CSV content and return structured data for review"""
+    body = await request.body()
+    # Decoding and splitting a large statement is CPU work; keep it off the loop
+    delimiter, rows = await asyncio.to_thread(read_csv_preview, body)
     
     if len(rows) < 2:
         raise HTTPException(status_code=400, detail="CSV vazio ou inválido")
@@ -2457,6 +3793,238 @@ async def remove_notification_token(user: dict = Depends(get_current_user)):
     await db.notification_tokens.delete_one({"user_id": user["id"]})
     return {"success": True}
 
+# ==================== DELTA SYNC ====================
+
+SYNC_COLLECTIONS = (
+    "categories", "credit_cards", "incomes", "expenses", "investments",
+    "budgets", "goals", "benefit_credits", "benefit_expenses"
+)
+
+async def record_deletion(user_id: str, collection: str, doc_id: str):
+    """Leave a tombstone so clients syncing with /sync learn about the delete"""
+    now = datetime.now(timezone.utc)
+    await db.sync_tombstones.insert_one({
+        "id": doc_id,
+        "user_id": user_id,
+        "collection": collection,
+        "updated_at": now.isoformat(timespec="microseconds"),
+        "deleted_at": now
+    })
+
+async def ensure_sync_indexes():
+    for collection in SYNC_COLLECTIONS + ("sync_tombstones",):
+        await db[collection].create_index([("user_id", 1), ("updated_at", 1), ("id", 1)])
+    await db.sync_tombstones.create_index(
+        "deleted_at", expireAfterSeconds=SYNC_TOMBSTONE_RETENTION_DAYS * 24 * 60 * 60
+    )
+
+async def backfill_sync_updated_at():
+    # Documents written before updated_at existed take their creation time
+    for collection in SYNC_COLLECTIONS:
+        await db[collection].update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": {"$ifNull": ["$created_at", "1970-01-01T00:00:00.000000+00:00"]}}}]
+        )
+
+SYNC_STAMP_FORMAT = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}\+00:00$")
+
+def normalize_sync_stamp(value) -> str:
+    """``updated_at`` in the fixed-precision UTC form of ``utc_now_iso``.
+    Copied ``created_at`` values may lack microseconds or a timezone (naive
+    ones are UTC), and then do not sort correctly as text."""
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return "1970-01-01T00:00:00.000000+00:00"
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+async def normalize_sync_updated_at(batch_size: int = 1000):
+    for collection in SYNC_COLLECTIONS:
+        cursor = db[collection].find(
+            {"updated_at": {"$not": SYNC_STAMP_FORMAT}}, {"_id": 1, "updated_at": 1}
+        )
+        ops = []
+        async for doc in cursor:
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"updated_at": normalize_sync_stamp(doc["updated_at"])}}))
+            if len(ops) >= batch_size:
+                await db[collection].bulk_write(ops, ordered=False)
+                ops = []
+        if ops:
+            await db[collection].bulk_write(ops, ordered=False)
+
+def encode_sync_token(updated_at: str, doc_id: str, issued_at: str) -> str:
+    """``issued_at`` is the moment up to which the client has seen every change"""
+    raw = json.dumps({"t": updated_at, "id": doc_id, "i": issued_at}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_sync_token(token: str) -> Tuple[str, str, str]:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        # Tokens from before issued_at existed fall back to their position
+        return data["t"], data["id"], data.get("i", data["t"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+@api_router.get("/sync")
+async def sync_changes(since: Optional[str] = None, limit: int = 500, user: dict = Depends(get_current_user)):
+    """Changes across all synced collections after ``since``, oldest first.
+    
+    Every change is ordered by (updated_at, id), and the returned
+    ``next_token`` points after the last change in the page. Without
+    ``since`` the stream starts from the beginning of the user's data."""
+    limit = max(1, min(limit, 1000))
+    now = datetime.now(timezone.utc)
+    
+    # Leave out the last few seconds so writes still in flight cannot commit
+    # behind a token that was already handed out
+    settled = (now - timedelta(seconds=SYNC_SETTLE_SECONDS)).isoformat(timespec="microseconds")
+    
+    query = {"user_id": user["id"]}
+    since_at, since_id, issued_at = "", "", settled
+    if since:
+        since_at, since_id, issued_at = decode_sync_token(since)
+        retention_start = now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+        if issued_at < retention_start.isoformat(timespec="microseconds"):
+            # The client last synced before the oldest tombstones still kept,
+            # so deletions may have been missed; it has to re-pull everything
+            return {"reset": True, "changes": [], "next_token": None, "has_more": False}
+        query["$or"] = [
+            {"updated_at": {"$gt": since_at}},
+            {"updated_at": since_at, "id": {"$gt": since_id}}
+        ]
+    query["updated_at"] = {"$lte": settled}
+    
+    sort = [("updated_at", 1), ("id", 1)]
+    results = await asyncio.gather(
+        *(db[c].find(query, {"_id": 0}).sort(sort).to_list(limit + 1) for c in SYNC_COLLECTIONS),
+        db.sync_tombstones.find(query, {"_id": 0, "deleted_at": 0}).sort(sort).to_list(limit + 1)
+    )
+    
+    changes = []
+    for collection, docs in zip(SYNC_COLLECTIONS, results[:-1]):
+        for doc in docs:
+            changes.append({"collection": collection, "op": "upsert", "id": doc["id"], "updated_at": doc["updated_at"], "data": doc})
+    for tombstone in results[-1]:
+        changes.append({"collection": tombstone["collection"], "op": "delete", "id": tombstone["id"], "updated_at": tombstone["updated_at"]})
+    changes.sort(key=lambda c: (c["updated_at"], c["id"]))
+    
+    page = changes[:limit]
+    has_more = len(changes) > limit
+    if page:
+        since_at, since_id = page[-1]["updated_at"], page[-1]["id"]
+    # Retention is checked against when the client was last fully caught up:
+    # this request once the stream is drained, the earlier token while pages remain.
+    # The token is re-issued even when nothing changed.
+    next_token = encode_sync_token(since_at, since_id, issued_at if has_more else settled) if page or since else None
+    return {
+        "reset": False,
+        "changes": page,
+        "next_token": next_token,
+        "has_more": has_more
+    }
+
+# ==================== EVENTS (SSE) ====================
+
+class EventBus:
+    """In-process pub/sub of data-version changes, one queue per connection.
+    
+    Queues hold a single pending event: a version notification supersedes the
+    one before it, so a slow or idle client costs one small object no matter
+    how many writes happen."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, set] = {}
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: str, version: int, collections: Tuple[str, ...]):
+        for queue in self._subscribers.get(user_id, ()):
+            pending = queue.get_nowait() if queue.full() else None
+            merged = set(collections) | set(pending["collections"] if pending else ())
+            queue.put_nowait({"version": version, "collections": sorted(merged)})
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+event_bus = EventBus()
+data_versions.listeners.append(event_bus.publish)
+
+async def watch_mongo_changes():
+    """Bump data versions from a Mongo change stream, so that writes made by
+    other workers reach this worker's caches and event subscribers. Needs a
+    replica set; enabled with EVENTS_BACKEND=mongo."""
+    pipeline = [{"$match": {
+        "operationType": {"$in": ["insert", "update", "replace"]},
+        "ns.coll": {"$in": list(SYNC_COLLECTIONS) + ["sync_tombstones"]}
+    }}]
+    resume_token = None
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    doc = change.get("fullDocument") or {}
+                    if not doc.get("user_id"):
+                        continue
+                    collection = change["ns"]["coll"]
+                    if collection == "sync_tombstones":
+                        collection = doc["collection"]
+                    data_versions.bump(doc["user_id"], collection)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Change stream error, retrying: {e}")
+            await asyncio.sleep(5)
+
+@api_router.post("/events/ticket")
+async def create_events_ticket(user: dict = Depends(get_current_user)):
+    """A ticket for opening /events, valid for STREAM_TICKET_SECONDS"""
+    return {"ticket": create_stream_ticket(user["id"]), "expires_in": STREAM_TICKET_SECONDS}
+
+@api_router.get("/events")
+async def stream_events(user: dict = Depends(get_stream_user)):
+    """Server-sent events announcing changes to the user's data"""
+    queue = event_bus.subscribe(user["id"])
+    
+    async def event_stream():
+        try:
+            hello = {"version": data_versions.get(user["id"]), "epoch": data_versions.epoch}
+            yield f"event: hello\ndata: {json.dumps(hello)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                # Let bursts (imports, recurring generation) settle into one message
+                await asyncio.sleep(SSE_COALESCE_SECONDS)
+                if not queue.empty():
+                    later = queue.get_nowait()
+                    later["collections"] = sorted(set(later["collections"]) | set(event["collections"]))
+                    event = later
+                yield f"event: version\ndata: {json.dumps(event)}\n\n"
+        finally:
+            event_bus.unsubscribe(user["id"], queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ==================== ROOT ROUTES ====================
 
 @api_router.get("/")
@@ -2473,9 +4041,255 @@ async def root_health():
     """Health check endpoint for Kubernetes liveness/readiness probes"""
     return {"status": "healthy", "service": "carfinancas"}
 
+# ==================== METRICS ====================
+
+event_loop_lag = metrics.REGISTRY.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer that was due",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+event_loop_lag_last = metrics.REGISTRY.gauge("event_loop_lag_last_seconds", "Most recent event loop lag sample")
+
+async def measure_event_loop_lag():
+    """Sleep for a fixed interval and record how much later than that the
+    loop woke us up: time it spent running something that did not yield"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL_SECONDS)
+        lag = max(loop.time() - started - EVENT_LOOP_LAG_INTERVAL_SECONDS, 0)
+        event_loop_lag.observe(value=lag)
+        event_loop_lag_last.set(value=lag)
+
+event_loop_stalls = metrics.REGISTRY.counter(
+    "event_loop_stalls_total", "Stalls longer than LOOP_STALL_THRESHOLD_MS, by innermost application frame", ("location",)
+)
+event_loop_stall_duration = metrics.REGISTRY.histogram(
+    "event_loop_stall_seconds", "Length of detected event loop stalls", buckets=(0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+def report_loop_stall(stall: Stall):
+    """Called from the watchdog thread once a stalled loop catches up"""
+    event_loop_stalls.inc(stall.location)
+    event_loop_stall_duration.observe(value=stall.duration)
+    logging.warning(json.dumps({
+        "event": "event_loop_stall",
+        "duration_ms": round(stall.duration * 1000, 1),
+        "location": stall.location,
+        "task": stall.task,
+        "stack": stall.stack
+    }, ensure_ascii=False))
+
+def collect_cache_metrics():
+    caches = {
+        "responses": response_cache, "chat_context": chat_context_cache,
+        "llm_responses": llm_response_cache, "analytics_frames": frame_cache
+    }
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    for field, type, help in (
+        ("hits", "counter", "Cache lookups served from the cache"),
+        ("misses", "counter", "Cache lookups that had to compute"),
+        ("evictions", "counter", "Entries evicted to stay under the size limit"),
+        ("hit_rate", "gauge", "Hits over lookups since start"),
+        ("size_bytes", "gauge", "Memory held by cached entries"),
+        ("entries", "gauge", "Cached entries")
+    ):
+        name = f"cache_{field}_total" if type == "counter" else f"cache_{field}"
+        yield name, type, help, ("cache",), [((cache,), s[field]) for cache, s in stats.items()]
+
+def collect_runtime_metrics():
+    loop = asyncio.get_running_loop()
+    executors = {"motor": motor_executor, "default": getattr(loop, "_default_executor", None)}
+    yield "executor_queue_depth", "gauge", "Calls waiting for a worker thread", ("executor",), [
+        ((name,), executor._work_queue.qsize()) for name, executor in executors.items() if executor is not None
+    ]
+    yield "executor_threads", "gauge", "Worker threads started", ("executor",), [
+        ((name,), len(executor._threads)) for name, executor in executors.items() if executor is not None
+    ]
+    yield "background_tasks", "gauge", "Fire-and-forget tasks still running", (), [((), len(background_tasks))]
+    yield "sse_connections", "gauge", "Open server-sent event streams", (), [((), event_bus.connection_count)]
+    trace_stats = tracer.stats()
+    yield "trace_spans_total", "counter", "Sampled spans by export outcome", ("outcome",), [
+        ((outcome,), trace_stats[outcome]) for outcome in ("exported", "dropped")
+    ]
+
+def collect_llm_metrics():
+    stats = llm.stats()
+    yield "llm_queue_depth", "gauge", "LLM calls waiting for a slot", (), [((), stats["queue_depth"])]
+    yield "llm_in_flight", "gauge", "LLM calls running", (), [((), stats["in_flight"])]
+    yield "llm_calls_total", "counter", "LLM calls by admission outcome", ("outcome",), [
+        ((outcome,), stats[outcome]) for outcome in ("admitted", "rejected", "timeouts", "errors")
+    ]
+
+metrics.REGISTRY.collectors.extend([collect_cache_metrics, collect_runtime_metrics, collect_llm_metrics])
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus text exposition of the process's metrics, for scrapers
+    holding METRICS_TOKEN; denied to everyone while it is unset"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=403, detail="Metrics are disabled: set METRICS_TOKEN to enable them")
+    authorization = request.headers.get("authorization", "")
+    if not hmac.compare_digest(authorization.encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return Response(content=metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# ==================== PROFILING ====================
+
+# cProfile hooks the whole thread, so concurrent requests on the loop show up
+# in a profile too; one profile at a time keeps the noise bounded
+profile_lock = asyncio.Lock()
+
+async def ensure_profile_indexes():
+    await db.request_profiles.create_index("id", unique=True)
+    await db.request_profiles.create_index([("created_at", -1)])
+    await db.request_profiles.create_index("expires_at", expireAfterSeconds=0)
+
+async def profiling_admin(scope) -> Optional[dict]:
+    """The admin making the request, or None if it is anyone else"""
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user = await load_user_from_token(token)
+    except HTTPException:
+        return None
+    return user if user["role"] == "admin" else None
+
+class ProfilingMiddleware:
+    """Runs requests carrying ``X-Profile: 1`` from an admin under cProfile
+    and stores the pstats in ``request_profiles``; the response names it in
+    ``X-Profile-Id``. Any other request only pays for the header scan."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(k == b"x-profile" and v == b"1" for k, v in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        admin = await profiling_admin(scope)
+        if admin is None:
+            await self.app(scope, receive, send)
+            return
+        if profile_lock.locked():
+            await self.app(scope, receive, self.with_header(send, "X-Profile", "busy"))
+            return
+        
+        async with profile_lock:
+            profile_id = str(uuid.uuid4())
+            status = 500
+            
+            async def send_and_track(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+            
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, self.with_header(send_and_track, "X-Profile-Id", profile_id))
+            finally:
+                profiler.disable()
+                duration_ms = (time.perf_counter() - started) * 1000
+                profiler.create_stats()
+                run_in_background(store_profile({
+                    "id": profile_id,
+                    "user_id": admin["id"],
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status,
+                    "duration_ms": round(duration_ms, 1)
+                }, marshal.dumps(profiler.stats)))
+
+    @staticmethod
+    def with_header(send, name: str, value: str):
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((name.lower().encode("latin-1"), value.encode("latin-1")))
+            await send(message)
+        return send_with_header
+
+async def store_profile(meta: dict, stats: bytes):
+    now = datetime.now(timezone.utc)
+    if len(stats) > 15 * 1024 * 1024:
+        logging.error(f"Profile {meta['id']} is too large to store ({len(stats)} bytes)")
+        return
+    try:
+        await db.request_profiles.insert_one({
+            **meta,
+            "size_bytes": len(stats),
+            "pstats": Binary(stats),
+            "created_at": now.isoformat(),
+            "expires_at": now + timedelta(hours=PROFILE_RETENTION_HOURS)
+        })
+    except Exception as e:
+        logging.error(f"Failed to store profile {meta['id']}: {e}")
+
+class StoredProfile:
+    """Stands in for a profiler so pstats can load stats from the database"""
+    
+    def __init__(self, stats: dict):
+        self.stats = stats
+    
+    def create_stats(self):
+        pass
+
+@api_router.get("/admin/profiles")
+async def list_profiles(limit: int = Query(50, ge=1, le=200), admin: dict = Depends(get_admin_user)):
+    """Most recent request profiles, without their data"""
+    return await db.request_profiles.find(
+        {}, {"_id": 0, "pstats": 0, "expires_at": 0}
+    ).sort("created_at", -1).limit(limit).to_list(limit)
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|text)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    """A request profile as a .pstats file (for snakeviz, flameprof or
+    ``python -m pstats``) or as a text report of the top functions"""
+    doc = await db.request_profiles.find_one({"id": profile_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "pstats":
+        return Response(
+            content=bytes(doc["pstats"]),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'}
+        )
+    
+    report = io.StringIO()
+    report.write(f"{doc['method']} {doc['path']} -> {doc['status']} in {doc['duration_ms']} ms\n\n")
+    stats = pstats.Stats(StoredProfile(marshal.loads(bytes(doc["pstats"]))), stream=report)
+    stats.sort_stats(sort).print_stats(60)
+    return Response(content=report.getvalue(), media_type="text/plain; charset=utf-8")
+
 # Include router and middleware
 app.include_router(api_router)
 
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """GZip everything except event streams, which must reach the client unbuffered"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in STREAMING_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+STREAMING_PATHS = {"/api/events", "/api/chat/stream"}
+
+app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1024)
+
+app.add_middleware(MongoStatsMiddleware, round_trip_budget=MONGO_ROUND_TRIP_BUDGET)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -2484,13 +4298,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ProfilingMiddleware)
+
+# Outside the other middleware, so latency and sizes include them (and compression)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Around everything else, so every log line of a request carries its trace id
+app.add_middleware(tracing.TracingMiddleware, tracer=tracer, trusted_peers=TRACE_TRUSTED_PEERS)
+
 # Configure logging
+tracing.install_log_correlation()
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    format='%(asctime)s - %(name)s - %(levelname)s - [trace=%(trace_id)s] %(message)s'
 )
 logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task_name in ("change_stream_task", "loop_lag_task", "chat_purge_task"):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+    watchdog = getattr(app.state, "loop_watchdog", None)
+    if watchdog:
+        watchdog.stop()
+    await outbound_http.close()
     client.close()
@@ -0,0 +1,37 @@
+"""
+Local stand-in for the Emergent Auth session-data endpoint, so the Google
+login flow (/api/auth/google/session) can be exercised and load-tested
+without reaching the real service.
+
+    uvicorn stub_auth_server:app --port 8002
+    EMERGENT_AUTH_URL=http://localhost:8002/auth/v1/env/oauth/session-data
+
+Every session id resolves to a deterministic fake Google account derived
+from it ("loadtest-42" -> loadtest-42@stub.local). Session ids starting with
+"invalid" are rejected with 404, mimicking an expired session.
+"""
+from fastapi import FastAPI, Header, HTTPException
+import asyncio
+import hashlib
+import os
+
+# Simulated latency of the real service, in milliseconds
+STUB_AUTH_LATENCY_MS = float(os.environ.get('STUB_AUTH_LATENCY_MS', 0))
+
+app = FastAPI(title="Stub Emergent Auth")
+
+@app.get("/auth/v1/env/oauth/session-data")
+async def session_data(x_session_id: str = Header(...)):
+    if STUB_AUTH_LATENCY_MS:
+        await asyncio.sleep(STUB_AUTH_LATENCY_MS / 1000)
+    if x_session_id.startswith("invalid"):
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    digest = hashlib.sha256(x_session_id.encode("utf-8")).hexdigest()
+    return {
+        "id": digest[:21],
+        "email": f"{x_session_id}@stub.local",
+        "name": f"Stub {x_session_id}",
+        "picture": None,
+        "session_token": digest
+    }
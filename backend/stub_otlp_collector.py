@@ -0,0 +1,63 @@
+"""
+Local stand-in for an OpenTelemetry collector's OTLP/HTTP receiver, so the
+API's traces can be inspected without running a tracing backend.
+
+    uvicorn stub_otlp_collector:app --port 4318
+    TRACE_EXPORTER=otlp OTLP_ENDPOINT=http://localhost:4318 TRACE_SAMPLE_RATE=1
+
+Spans posted to /v1/traces (JSON encoding) are kept in memory, the most
+recent STUB_OTLP_MAX_SPANS of them, and optionally appended to
+STUB_OTLP_FILE. GET /traces lists recent traces with their root span and
+duration; GET /traces/{trace_id} returns the spans of one trace in start
+order.
+"""
+from fastapi import FastAPI, HTTPException, Request
+from collections import deque
+import json
+import os
+
+STUB_OTLP_MAX_SPANS = int(os.environ.get('STUB_OTLP_MAX_SPANS', 100000))
+STUB_OTLP_FILE = os.environ.get('STUB_OTLP_FILE')
+
+app = FastAPI(title="Stub OTLP Collector")
+
+spans = deque(maxlen=STUB_OTLP_MAX_SPANS)
+
+def flatten_attributes(attributes: list) -> dict:
+    return {a["key"]: next(iter(a.get("value", {}).values()), None) for a in attributes or []}
+
+@app.post("/v1/traces")
+async def receive_traces(request: Request):
+    payload = await request.json()
+    for resource_spans in payload.get("resourceSpans", []):
+        service = flatten_attributes(resource_spans.get("resource", {}).get("attributes")).get("service.name")
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                spans.append({
+                    **span,
+                    "service": service,
+                    "attributes": flatten_attributes(span.get("attributes")),
+                    "durationMs": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+                })
+    if STUB_OTLP_FILE:
+        with open(STUB_OTLP_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+    return {"partialSuccess": {}}
+
+@app.get("/traces")
+async def list_traces(limit: int = 50):
+    roots = [s for s in reversed(spans) if not s.get("parentSpanId")][:limit]
+    counts = {}
+    for span in spans:
+        counts[span["traceId"]] = counts.get(span["traceId"], 0) + 1
+    return [
+        {"trace_id": r["traceId"], "name": r["name"], "duration_ms": r["durationMs"], "spans": counts[r["traceId"]]}
+        for r in roots
+    ]
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = sorted((s for s in spans if s["traceId"] == trace_id), key=lambda s: int(s["startTimeUnixNano"]))
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
@@ -0,0 +1,378 @@
+"""
+Lightweight tracing that follows the OpenTelemetry data model.
+
+Spans carry W3C trace context (``traceparent``) ids and are exported as
+OTLP/JSON, either appended to a local file or posted to an OTLP/HTTP
+collector (``stub_otlp_collector.py`` stands in for one locally), so the
+output loads into any OpenTelemetry-compatible backend without pulling the
+SDK into the API.
+
+The active span lives in a context variable: it follows requests across
+awaits, reaches Motor's executor threads (Motor copies the context) and is
+stamped on every log record as ``trace_id``/``span_id``. Sampling is decided
+once per trace, at the root, unless an incoming ``traceparent`` from a
+trusted peer already made that decision: anyone else could force every
+request they send to be recorded. Unsampled spans still carry ids for log
+correlation but are never recorded.
+"""
+import contextvars
+import ipaddress
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import httpx
+from pymongo import monitoring
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "sampled",
+                 "start_ns", "end_ns", "attributes", "events", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: str, sampled: bool,
+                 attributes: Optional[Dict[str, Any]] = None, start_ns: Optional[int] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.events: List[Tuple[int, str, Dict[str, Any]]] = []
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if self.sampled:
+            self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        if self.sampled:
+            self.events.append((time.time_ns(), name, attributes or {}))
+
+    def set_error(self, message: str):
+        self.error = message
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": otlp_attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error is not None else {"code": 0}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.events:
+            span["events"] = [
+                {"timeUnixNano": str(t), "name": name, "attributes": otlp_attributes(attrs)}
+                for t, name, attrs in self.events
+            ]
+        return span
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[dict]:
+    encoded = []
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            encoded.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            encoded.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            encoded.append({"key": key, "value": {"stringValue": str(value)}})
+    return encoded
+
+current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C ``traceparent`` header"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+# ==================== EXPORT ====================
+
+def otlp_payload(spans: List[Span], service_name: str) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": otlp_attributes({"service.name": service_name})},
+        "scopeSpans": [{"scope": {"name": "carfinancas.tracing"}, "spans": [s.to_otlp() for s in spans]}]
+    }]}
+
+class FileSpanWriter:
+    """One OTLP/JSON export request per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, payload: dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+class OTLPHttpSpanWriter:
+    """POSTs to an OTLP/HTTP collector's ``/v1/traces`` in the JSON encoding"""
+
+    def __init__(self, endpoint: str, timeout: float = 5):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.client = httpx.Client(timeout=timeout)
+
+    def __call__(self, payload: dict):
+        self.client.post(self.url, json=payload).raise_for_status()
+
+class BatchSpanExporter(threading.Thread):
+    """Buffers finished spans and writes them in batches from its own thread,
+    so exporting never blocks the event loop. Spans are dropped, and counted,
+    when the buffer is full."""
+
+    def __init__(self, write: Callable[[dict], None], service_name: str,
+                 max_batch: int = 512, interval: float = 1.0, max_queue: int = 10000):
+        super().__init__(name="span-exporter", daemon=True)
+        self.write = write
+        self.service_name = service_name
+        self.max_batch = max_batch
+        self.interval = interval
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self.exported = 0
+        self.dropped = 0
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0.001)))
+                except queue.Empty:
+                    break
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch: List[Span]):
+        try:
+            self.write(otlp_payload(batch, self.service_name))
+            self.exported += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logging.error(f"Span export failed, dropped {len(batch)} spans: {e}")
+
+# ==================== TRACER ====================
+
+class Tracer:
+    def __init__(self, sample_rate: float, exporter: Optional[BatchSpanExporter]):
+        # Without an exporter nothing is recorded, but ids still reach the logs
+        self.sample_rate = sample_rate if exporter is not None else 0
+        self.exporter = exporter
+
+    def start_span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None,
+                   parent: Optional[Span] = None, remote_parent: Optional[Tuple[str, str, bool]] = None,
+                   start_ns: Optional[int] = None) -> Span:
+        """A new span, child of ``parent`` (default: the current span) or of a
+        remote parent from ``traceparent``. A remote parent whose sampled flag
+        is None leaves the sampling decision to this tracer. The span is not
+        made current."""
+        parent = parent or current_span.get()
+        if parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        elif remote_parent is not None:
+            trace_id, parent_id, sampled = remote_parent
+            if sampled is None:
+                sampled = random.random() < self.sample_rate
+            else:
+                sampled = sampled and self.exporter is not None
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        return Span(name, trace_id, parent_id, kind, sampled, attributes if sampled else None, start_ns)
+
+    def end(self, span: Span):
+        span.end_ns = time.time_ns()
+        if span.sampled:
+            self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None):
+        """Run a block as the current span"""
+        span = self.start_span(name, kind, attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            current_span.reset(token)
+            self.end(span)
+
+    def stats(self) -> dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "exported": self.exporter.exported if self.exporter else 0,
+            "dropped": self.exporter.dropped if self.exporter else 0
+        }
+
+def build_tracer(exporter: str, sample_rate: float, service_name: str,
+                 trace_file: Optional[str] = None, otlp_endpoint: Optional[str] = None) -> Tracer:
+    """``exporter`` is none, file or otlp"""
+    if exporter == "file":
+        writer = FileSpanWriter(trace_file)
+    elif exporter == "otlp":
+        writer = OTLPHttpSpanWriter(otlp_endpoint)
+    else:
+        return Tracer(sample_rate, None)
+    batch_exporter = BatchSpanExporter(writer, service_name)
+    batch_exporter.start()
+    return Tracer(sample_rate, batch_exporter)
+
+# ==================== INTEGRATIONS ====================
+
+def parse_networks(value: str) -> List[Network]:
+    """Comma separated addresses or CIDR ranges"""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening a server span per HTTP request, named by
+    route template once routing is done.
+
+    An incoming ``traceparent`` always links the span into the caller's
+    trace, but its sampled flag is only honoured from ``trusted_peers``."""
+
+    def __init__(self, app, tracer: Tracer, trusted_peers: Iterable[Network] = ()):
+        self.app = app
+        self.tracer = tracer
+        self.trusted_peers = list(trusted_peers)
+
+    def is_trusted(self, client: Optional[Tuple[str, int]]) -> bool:
+        if not client or not self.trusted_peers:
+            return False
+        try:
+            address = ipaddress.ip_address(client[0])
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_peers)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"traceparent"), None)
+        remote_parent = parse_traceparent(traceparent)
+        if remote_parent is not None and not self.is_trusted(scope.get("client")):
+            remote_parent = (remote_parent[0], remote_parent[1], None)
+        span = self.tracer.start_span(
+            f"{scope['method']} {scope['path']}", kind="server", parent=None,
+            remote_parent=remote_parent,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]}
+        )
+        token = current_span.set(span)
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.set_error(f"HTTP {message['status']}")
+                message.setdefault("headers", []).append((b"x-trace-id", span.trace_id.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            current_span.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            span.name = f"{scope['method']} {route or 'unmatched'}"
+            span.set_attribute("http.route", route)
+            self.tracer.end(span)
+
+class TracingCommandListener(monitoring.CommandListener):
+    """A client span per Mongo command, under the span that issued it"""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._spans: Dict[int, Span] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event: monitoring.CommandStartedEvent):
+        parent = current_span.get()
+        if parent is None or not parent.sampled:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        collection = collection if isinstance(collection, str) else None
+        span = self.tracer.start_span(
+            f"mongo.{event.command_name} {collection or ''}".strip(), kind="client", parent=parent,
+            attributes={
+                "db.system": "mongodb",
+                "db.name": event.database_name,
+                "db.operation": event.command_name,
+                "db.mongodb.collection": collection
+            }
+        )
+        with self._lock:
+            self._spans[event.request_id] = span
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent):
+        self._finish(event, None)
+
+    def failed(self, event: monitoring.CommandFailedEvent):
+        self._finish(event, str(event.failure.get("errmsg", "failed")) if isinstance(event.failure, dict) else "failed")
+
+    def _finish(self, event, error: Optional[str]):
+        with self._lock:
+            span = self._spans.pop(event.request_id, None)
+        if span is None:
+            return
+        if error is not None:
+            span.set_error(error)
+        self.tracer.end(span)
+
+def install_log_correlation():
+    """Give every log record ``trace_id`` and ``span_id`` attributes ("-"
+    outside a span) for use in log formats"""
+    default_factory = logging.getLogRecordFactory()
+
+    def factory(*args, **kwargs):
+        record = default_factory(*args, **kwargs)
+        span = current_span.get()
+        record.trace_id = span.trace_id if span else "-"
+        record.span_id = span.span_id if span else "-"
+        return record
+
+    logging.setLogRecordFactory(factory)
@@ -0,0 +1,15 @@
+"""
+Endpoint benchmarks for the API.
+
+    python -m benchmarks.run [--scales 1k,50k,500k] [--iterations 30]
+    python -m benchmarks.compare benchmarks/results/<base>.json benchmarks/results/<head>.json
+
+``run`` seeds a local MongoDB (``MONGO_URL``, one database per scale) with
+synthetic users shaped like the real data in ``backup_dados/``, then drives
+every ``/api`` route in-process through ``httpx.ASGITransport`` and writes
+latency percentiles, Mongo round trips and allocated memory per endpoint to a
+JSON report named after the commit. ``compare`` diffs two reports.
+
+The chat model is replaced by the fake backend and the Google auth service by
+``backend/stub_auth_server.py``, so no external service is called.
+"""
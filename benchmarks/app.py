@@ -0,0 +1,60 @@
+"""
+Loading and starting the API in-process, configured for benchmarking.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Never reach real external services from a benchmark
+FORCED_ENV = {
+    "LLM_BACKEND": "fake",
+    "EMERGENT_AUTH_URL": "http://stub-auth/auth/v1/env/oauth/session-data",
+}
+
+# Defaults that keep measurements about the server itself; override from the environment
+DEFAULT_ENV = {
+    "MONGO_URL": "mongodb://localhost:27017",
+    "FAKE_LLM_FIRST_TOKEN_MS": "0",
+    "FAKE_LLM_TOKEN_MS": "0",
+    "TRACE_EXPORTER": "none",
+    "LOOP_STALL_THRESHOLD_MS": "0",
+    # Round trips are in the report; no warning per request
+    "MONGO_ROUND_TRIP_BUDGET": "1000000",
+    # Reply sizing was on by default before; keep it so results compare with older baselines
+    "MONGO_MEASURE_REPLY_BYTES": "true",
+}
+
+def load_server(db_name: str):
+    """Import ``backend/server.py`` bound to ``db_name``. The server reads its
+    configuration at import, so this can only happen once per process."""
+    os.environ["DB_NAME"] = db_name
+    os.environ.update(FORCED_ENV)
+    for key, value in DEFAULT_ENV.items():
+        os.environ.setdefault(key, value)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    return server
+
+async def start(server):
+    """Run the startup handlers and route outbound HTTP to the auth stub"""
+    import stub_auth_server
+    await server.app.router.startup()
+    # Startup leaves some migrations running in the background; wait for them
+    # so the database (and any snapshot of it) is fully migrated before measuring
+    await asyncio.gather(*server.background_tasks)
+    await server.outbound_http.close()
+    server.outbound_http.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_auth_server.app))
+
+async def stop(server):
+    await server.app.router.shutdown()
+
+def client(server, token: str = None) -> httpx.AsyncClient:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=server.app), base_url="http://bench", headers=headers, timeout=None
+    )
@@ -0,0 +1,91 @@
+"""
+Compare two benchmark reports.
+
+    python -m benchmarks.compare base.json head.json [--threshold 10] [--min-ms 1] [--fail-on-regression]
+
+Prints, per scale and endpoint, p50/p95/p99 latency, Mongo round trips and
+peak allocation of both reports with the relative change. An endpoint
+regresses when a latency percentile grows by more than ``--threshold``
+percent and ``--min-ms`` milliseconds, when it makes more round trips, when
+its peak allocation grows by more than ``--threshold`` percent, or when it
+starts failing. With ``--fail-on-regression`` the exit status is 1 if any
+endpoint regressed, for use in CI.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+LATENCIES = ("p50_ms", "p95_ms", "p99_ms")
+
+def change(base: Optional[float], head: Optional[float]) -> str:
+    if base is None or head is None:
+        return "n/a"
+    if base == 0:
+        return "=" if head == 0 else "new"
+    return f"{(head - base) / base * 100:+.0f}%"
+
+def regressions(base: dict, head: dict, threshold: float, min_ms: float) -> List[str]:
+    found = []
+    for metric in LATENCIES:
+        b, h = base.get(metric), head.get(metric)
+        if b is not None and h is not None and h - b > min_ms and h > b * (1 + threshold / 100):
+            found.append(f"{metric} {b} -> {h}")
+    if (head.get("round_trips") or 0) > (base.get("round_trips") or 0):
+        found.append(f"round trips {base.get('round_trips')} -> {head.get('round_trips')}")
+    b, h = base.get("alloc_peak_kb"), head.get("alloc_peak_kb")
+    if b is not None and h is not None and h > b * (1 + threshold / 100) and h - b > 1:
+        found.append(f"alloc peak {b} -> {h} KiB")
+    if head.get("errors", 0) > base.get("errors", 0):
+        found.append(f"errors {base.get('errors', 0)} -> {head['errors']} {head.get('status')}")
+    return found
+
+def compare(base: dict, head: dict, threshold: float, min_ms: float) -> int:
+    print(f"base {base['commit'][:10]}{' (dirty)' if base.get('dirty') else ''}  "
+          f"head {head['commit'][:10]}{' (dirty)' if head.get('dirty') else ''}")
+    regressed = 0
+    for scale in [s for s in head["scales"] if s in base["scales"]]:
+        base_endpoints = base["scales"][scale]["endpoints"]
+        head_endpoints = head["scales"][scale]["endpoints"]
+        print(f"\n== {scale} ==")
+        print(f"{'endpoint':<52} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'trips':>7} {'peak KiB':>17}")
+        for name in [n for n in head_endpoints if n in base_endpoints]:
+            b, h = base_endpoints[name], head_endpoints[name]
+            columns = [f"{h.get(m)} {change(b.get(m), h.get(m)):>5}" for m in LATENCIES]
+            trips = f"{b.get('round_trips')}>{h.get('round_trips')}" if b.get("round_trips") != h.get("round_trips") \
+                else str(h.get("round_trips"))
+            peak = f"{h.get('alloc_peak_kb')} {change(b.get('alloc_peak_kb'), h.get('alloc_peak_kb')):>5}"
+            print(f"{name:<52} {columns[0]:>17} {columns[1]:>17} {columns[2]:>17} {trips:>7} {peak:>17}")
+            for finding in regressions(b, h, threshold, min_ms):
+                regressed += 1
+                print(f"    REGRESSION: {finding}")
+        only_base = sorted(set(base_endpoints) - set(head_endpoints))
+        only_head = sorted(set(head_endpoints) - set(base_endpoints))
+        if only_base:
+            print(f"  only in base: {', '.join(only_base)}")
+        if only_head:
+            print(f"  only in head: {', '.join(only_head)}")
+    missing = sorted(set(base["scales"]) ^ set(head["scales"]))
+    if missing:
+        print(f"\nscales in only one report: {', '.join(missing)}")
+    print(f"\n{regressed} regression(s)")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=10, help="percent change tolerated")
+    parser.add_argument("--min-ms", type=float, default=1, help="latency change always tolerated, in ms")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    base = json.loads(args.base.read_text(encoding="utf-8"))
+    head = json.loads(args.head.read_text(encoding="utf-8"))
+    regressed = compare(base, head, args.threshold, args.min_ms)
+    if regressed and args.fail_on_regression:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+The requests the benchmark makes, one ``Endpoint`` per ``/api`` route.
+
+Path parameters are filled from the seed fixture by name, unless the
+endpoint's ``setup`` (run before every timed call, untimed) returns fresh
+ones, e.g. a record created only to be deleted. Reads come first in
+``CATALOGUE`` and writes last, so writes do not invalidate the caches that
+reads are measured against halfway through.
+
+``SKIPPED`` lists routes that cannot be timed as a request/response; any
+other route without an entry is reported as uncovered, so new routes show
+up in the report until they are added here.
+"""
+import asyncio
+import itertools
+import uuid
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+class Endpoint(NamedTuple):
+    method: str
+    route: str  # as registered, e.g. /api/goals/{goal_id}
+    params: Optional[Callable[[dict], dict]] = None  # query string, from the fixture
+    json: Optional[Callable[[dict], Any]] = None
+    content: Optional[Callable[[dict], bytes]] = None
+    setup: Optional[Callable] = None  # async (user client, admin client, fixture) -> path params
+    admin: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+SKIPPED = {
+    "GET /api/events": "server-sent event stream that never ends",
+}
+
+_seq = itertools.count()
+
+def month(f: dict) -> dict:
+    return {"month": f["month"], "year": f["year"]}
+
+def year(f: dict) -> dict:
+    return {"year": f["year"]}
+
+def last_quarter(f: dict) -> dict:
+    start_month, start_year = (f["month"] - 3) % 12 + 1, f["year"] - (f["month"] <= 3)
+    return {"from": f"{start_year}-{start_month:02d}", "to": f"{f['year']}-{f['month']:02d}"}
+
+def day(f: dict, d: int = 10) -> str:
+    return f"{f['year']}-{f['month']:02d}-{d:02d}"
+
+def income(f: dict) -> dict:
+    return {"category_id": f["income_category_id"], "description": "Benchmark", "value": 1234.56,
+            "date": day(f), "status": "received", "payment_date": day(f), **month(f)}
+
+def expense(f: dict) -> dict:
+    return {"category_id": f["expense_category_id"], "description": "Benchmark", "value": 321.09,
+            "date": day(f), "payment_method": "credit", "credit_card_id": f["card_id"], "installments": 3,
+            "status": "pending", **month(f)}
+
+def card(f: dict) -> dict:
+    return {"name": "Benchmark", "limit": 5000, "closing_day": 5, "due_day": 12}
+
+def investment(f: dict) -> dict:
+    return {"category_id": f["investment_category_id"], "description": "Benchmark", "initial_balance": 1000,
+            "contribution": 200, "dividends": 10, "withdrawal": 0, **month(f)}
+
+def budget(f: dict) -> dict:
+    return {"category_id": f["expense_category_id"], "planned_value": 800, "type": "expense", **month(f)}
+
+def new_budget(f: dict) -> dict:
+    # A month no seeded budget uses, so the POST inserts instead of updating
+    return {**budget(f), "month": next(_seq) % 12 + 1, "year": 1900 + next(_seq) % 100}
+
+def benefit_credit(f: dict) -> dict:
+    return {"benefit_type": "vr", "value": 900, "date": day(f, 1), "description": "Benchmark", **month(f)}
+
+def benefit_expense(f: dict) -> dict:
+    return {"benefit_type": "va", "category": "mercado", "description": "Benchmark", "value": 87.4,
+            "date": day(f), "establishment": "Mercado", **month(f)}
+
+def recurring(f: dict) -> dict:
+    return {"type": "expense", "category_id": f["expense_category_id"], "description": "Benchmark", "value": 99.9,
+            "frequency": "monthly", "start_date": day(f, 1), "day_of_month": 15, "payment_method": "cash"}
+
+def goal(f: dict) -> dict:
+    return {"name": "Benchmark", "target_value": 10000, "current_value": 0, "category": "other"}
+
+def category(f: dict) -> dict:
+    return {"name": "Benchmark", "type": "expense"}
+
+def new_user(f: dict) -> dict:
+    # Unique across runs too, since seeded databases are reused
+    key = uuid.uuid4().hex[:12]
+    return {"name": f"Bench New {key}", "email": f"bench-new-{key}@benchmark.lpfinancas.com", "password": "Bench@2024"}
+
+def chat(f: dict) -> dict:
+    return {"message": "Quanto gastei este mês?"}
+
+def statement(f: dict) -> dict:
+    return {
+        "default_category_id": f["expense_category_id"],
+        "transactions": [
+            {"date": day(f, d % 28 + 1), "description": f"Compra {d}", "value": 10 + d, "type": "expense"}
+            for d in range(50)
+        ]
+    }
+
+def csv_body(f: dict) -> bytes:
+    rows = ["Data;Descrição;Valor"] + [f"{d % 28 + 1:02d}/{f['month']:02d}/{f['year']};Compra {d};-{10 + d},90" for d in range(500)]
+    return "\n".join(rows).encode("utf-8")
+
+async def _created(client, path: str, body: dict) -> str:
+    response = await client.post(path, json=body)
+    response.raise_for_status()
+    return response.json()["id"]
+
+def created(path: str, body: Callable[[dict], dict], key: str, admin: bool = False):
+    """Setup creating a fresh record through the API for the timed call to use"""
+    async def setup(user_client, admin_client, f: dict) -> dict:
+        return {key: await _created(admin_client if admin else user_client, path, body(f))}
+    return setup
+
+async def chat_session(user_client, admin_client, f: dict) -> dict:
+    response = await user_client.post("/api/chat", json={"message": f"Sessão {next(_seq)}"})
+    response.raise_for_status()
+    return {"session_id": response.json()["session_id"]}
+
+async def deletion_job(user_client, admin_client, f: dict) -> dict:
+    user_id = await _created(admin_client, "/api/admin/users", new_user(f))
+    response = await admin_client.delete(f"/api/admin/users/{user_id}")
+    response.raise_for_status()
+    return {"job_id": response.json()["job_id"]}
+
+async def stored_profile(user_client, admin_client, f: dict) -> dict:
+    # Profiles are stored in the background after the response; wait for it
+    if "profile_id" not in f:
+        response = await admin_client.get("/api/health", headers={"X-Profile": "1"})
+        profile_id = response.headers["X-Profile-Id"]
+        for _ in range(100):
+            if (await admin_client.get(f"/api/admin/profiles/{profile_id}")).status_code == 200:
+                break
+            await asyncio.sleep(0.02)
+        f["profile_id"] = profile_id
+    return {}
+
+CATALOGUE = [
+    # Reads
+    Endpoint("GET", "/api/"),
+    Endpoint("GET", "/api/health"),
+    Endpoint("GET", "/api/auth/me"),
+    Endpoint("GET", "/api/categories"),
+    Endpoint("GET", "/api/incomes", params=month),
+    Endpoint("GET", "/api/expenses", params=month),
+    Endpoint("GET", "/api/credit-cards"),
+    Endpoint("GET", "/api/investments", params=month),
+    Endpoint("GET", "/api/budgets", params=month),
+    Endpoint("GET", "/api/benefits/credits", params=month),
+    Endpoint("GET", "/api/benefits/expenses", params=month),
+    Endpoint("GET", "/api/benefits/summary", params=month),
+    Endpoint("GET", "/api/benefits/series", params=lambda f: {**last_quarter(f), "granularity": "week"}),
+    Endpoint("GET", "/api/benefits/yearly", params=year),
+    Endpoint("GET", "/api/recurring"),
+    Endpoint("GET", "/api/alerts/budget", params=month),
+    Endpoint("GET", "/api/alerts/due-dates"),
+    Endpoint("GET", "/api/analysis/trends", params=month),
+    Endpoint("GET", "/api/credit-cards/{card_id}/statement", params=month),
+    Endpoint("GET", "/api/credit-cards/{card_id}/installments"),
+    Endpoint("GET", "/api/credit-cards/{card_id}/available", params=month),
+    Endpoint("GET", "/api/credit-cards/summary", params=month),
+    Endpoint("GET", "/api/dashboard/summary", params=month),
+    Endpoint("GET", "/api/dashboard/series", params=lambda f: {**last_quarter(f), "granularity": "week"}),
+    Endpoint("GET", "/api/snapshot", params=month),
+    Endpoint("GET", "/api/dashboard/yearly", params=year),
+    Endpoint("GET", "/api/analytics/comparison", params=month),
+    Endpoint("GET", "/api/analytics/forecast", params=month),
+    Endpoint("GET", "/api/analytics/highlights", params=month),
+    Endpoint("GET", "/api/reports/by-category", params=lambda f: {"type": "expense", **last_quarter(f)}),
+    Endpoint("GET", "/api/goals"),
+    Endpoint("GET", "/api/goals/{goal_id}"),
+    Endpoint("GET", "/api/goals/{goal_id}/contributions"),
+    Endpoint("GET", "/api/tips/personalized"),
+    Endpoint("GET", "/api/notifications/status"),
+    Endpoint("GET", "/api/sync", params=lambda f: {"limit": 500}),
+    Endpoint("GET", "/api/admin/users", params=lambda f: {"page_size": 50, "q": "bench"}, admin=True),
+    Endpoint("GET", "/api/admin/deletion-jobs", admin=True),
+    Endpoint("GET", "/api/admin/cache/stats", admin=True),
+    Endpoint("GET", "/api/admin/llm/stats", admin=True),
+    Endpoint("GET", "/api/admin/profiles", admin=True),
+    Endpoint("GET", "/api/admin/profiles/{profile_id}", setup=stored_profile, admin=True),
+    # Chat: the first call misses the answer cache, the rest hit it
+    Endpoint("POST", "/api/chat", json=chat),
+    Endpoint("POST", "/api/chat/stream", json=chat),
+    Endpoint("GET", "/api/chat/history"),
+    Endpoint("GET", "/api/chat/sessions"),
+    # Auth
+    Endpoint("POST", "/api/auth/login", json=lambda f: {"email": f["email"], "password": f["password"]}),
+    Endpoint("POST", "/api/auth/register", json=new_user),
+    # The stub maps a session id to a fixed account: the first call signs up, the rest sign in
+    Endpoint("POST", "/api/auth/google/session", json=lambda f: {"session_id": "bench-google"}),
+    Endpoint("POST", "/api/auth/logout"),
+    # Writes
+    Endpoint("POST", "/api/categories", json=category),
+    Endpoint("PUT", "/api/categories/{category_id}", json=lambda f: {"name": "Mercado", "type": "expense"}),
+    Endpoint("DELETE", "/api/categories/{category_id}", setup=created("/api/categories", category, "category_id")),
+    Endpoint("POST", "/api/incomes", json=income),
+    Endpoint("PUT", "/api/incomes/{income_id}", json=income),
+    Endpoint("DELETE", "/api/incomes/{income_id}", setup=created("/api/incomes", income, "income_id")),
+    Endpoint("POST", "/api/expenses", json=expense),
+    Endpoint("PUT", "/api/expenses/{expense_id}", json=expense),
+    Endpoint("DELETE", "/api/expenses/{expense_id}", setup=created("/api/expenses", expense, "expense_id")),
+    Endpoint("POST", "/api/credit-cards", json=card),
+    Endpoint("PUT", "/api/credit-cards/{card_id}", json=lambda f: {**card(f), "name": "Nubank", "limit": 8000}),
+    Endpoint("DELETE", "/api/credit-cards/{card_id}", setup=created("/api/credit-cards", card, "card_id")),
+    Endpoint("POST", "/api/investments", json=investment),
+    Endpoint("PUT", "/api/investments/{investment_id}", json=investment),
+    Endpoint("DELETE", "/api/investments/{investment_id}",
+             setup=created("/api/investments", investment, "investment_id")),
+    Endpoint("POST", "/api/budgets", json=budget),
+    Endpoint("DELETE", "/api/budgets/{budget_id}", setup=created("/api/budgets", new_budget, "budget_id")),
+    Endpoint("POST", "/api/benefits/credits", json=benefit_credit),
+    Endpoint("PUT", "/api/benefits/credits/{credit_id}", json=benefit_credit),
+    Endpoint("DELETE", "/api/benefits/credits/{credit_id}",
+             setup=created("/api/benefits/credits", benefit_credit, "credit_id")),
+    Endpoint("POST", "/api/benefits/expenses", json=benefit_expense),
+    Endpoint("PUT", "/api/benefits/expenses/{expense_id}", json=benefit_expense,
+             setup=lambda u, a, f: _fixed(expense_id=f["benefit_expense_id"])),
+    Endpoint("DELETE", "/api/benefits/expenses/{expense_id}",
+             setup=created("/api/benefits/expenses", benefit_expense, "expense_id")),
+    Endpoint("POST", "/api/recurring", json=recurring),
+    Endpoint("PUT", "/api/recurring/{transaction_id}", json=recurring),
+    Endpoint("DELETE", "/api/recurring/{transaction_id}", setup=created("/api/recurring", recurring, "transaction_id")),
+    Endpoint("POST", "/api/recurring/generate", params=month),
+    Endpoint("POST", "/api/goals", json=goal),
+    Endpoint("PUT", "/api/goals/{goal_id}", json=lambda f: {**goal(f), "name": "Reserva de emergência",
+                                                            "target_value": 30000}),
+    Endpoint("DELETE", "/api/goals/{goal_id}", setup=created("/api/goals", goal, "goal_id")),
+    Endpoint("POST", "/api/goals/{goal_id}/contribute", params=lambda f: {"value": 50}),
+    Endpoint("DELETE", "/api/chat/sessions/{session_id}", setup=chat_session),
+    Endpoint("POST", "/api/import/bank-statement", json=statement),
+    Endpoint("POST", "/api/import/parse-csv", content=csv_body),
+    Endpoint("POST", "/api/notifications/token", json=lambda f: {"token": "ExponentPushToken[benchmark]"}),
+    Endpoint("DELETE", "/api/notifications/token"),
+    # Admin writes
+    Endpoint("POST", "/api/admin/users", json=new_user, admin=True),
+    Endpoint("PUT", "/api/admin/users/{user_id}", json=lambda f: {"name": "Benchmark Other"},
+             setup=lambda u, a, f: _fixed(user_id=f["other_user_id"]), admin=True),
+    Endpoint("PATCH", "/api/admin/users/{user_id}/block",
+             setup=lambda u, a, f: _fixed(user_id=f["other_user_id"]), admin=True),
+    Endpoint("PATCH", "/api/admin/users/{user_id}/approve",
+             setup=lambda u, a, f: _fixed(user_id=f["other_user_id"]), admin=True),
+    Endpoint("DELETE", "/api/admin/users/{user_id}",
+             setup=created("/api/admin/users", new_user, "user_id", admin=True), admin=True),
+    Endpoint("GET", "/api/admin/deletion-jobs/{job_id}", setup=deletion_job, admin=True),
+]
+
+async def _fixed(**params) -> Dict[str, str]:
+    return params
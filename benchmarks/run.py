@@ -0,0 +1,260 @@
+"""
+Run the endpoint benchmarks and write a JSON report.
+
+    python -m benchmarks.run [--scales 1k,50k,500k] [--iterations 30] [--warmup 3]
+                             [--memory-iterations 5] [--only /api/dashboard] [--reseed]
+                             [--out benchmarks/results/<commit>.json]
+
+Each scale runs in its own process, so caches and allocator state never leak
+from one scale into the next. The seeded data is kept in ``benchmark_<scale>``
+and reused while ``seed.SEED_VERSION`` is unchanged; ``--reseed`` rebuilds
+it. Every run works on a fresh copy of it, ``benchmark_<scale>_run``, so what
+the write endpoints create or delete never carries over into the next run.
+
+For every endpoint in ``endpoints.CATALOGUE`` the first call is kept apart as
+``cold_ms`` (empty caches), ``--warmup`` calls are discarded and
+``--iterations`` calls give the latency percentiles, Mongo round trips and
+Mongo time, both read from the ``Server-Timing`` header. Memory is measured
+in a separate pass of ``--memory-iterations`` calls under ``tracemalloc``,
+which slows allocation down too much to share a pass with the timings:
+``alloc_peak_kb`` is the most memory allocated at once while serving a call
+and ``alloc_retained_kb`` what was still allocated when it returned, both
+medians over the pass.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from benchmarks import app, seed
+from benchmarks.endpoints import CATALOGUE, SKIPPED, Endpoint
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+ROUND_TRIPS = re.compile(r'mongo;dur=([\d.]+);desc="(\d+) round trips"')
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 2)
+
+async def prepare(endpoint: Endpoint, user_client, admin_client, fixture: dict) -> dict:
+    """Arguments of one call, running the endpoint's setup"""
+    path_params = {name: fixture.get(name) for name in re.findall(r"{(\w+)}", endpoint.route)}
+    if endpoint.setup:
+        path_params.update(await endpoint.setup(user_client, admin_client, fixture))
+    request = {"method": endpoint.method, "url": endpoint.route.format(**path_params)}
+    if endpoint.params:
+        request["params"] = endpoint.params(fixture)
+    if endpoint.json:
+        request["json"] = endpoint.json(fixture)
+    if endpoint.content:
+        request["content"] = endpoint.content(fixture)
+    return request
+
+async def measure(endpoint: Endpoint, user_client, admin_client, fixture: dict, args) -> dict:
+    client = admin_client if endpoint.admin else user_client
+    latencies, round_trips, mongo_ms = [], [], []
+    statuses = Counter()
+    cold_ms = None
+    size = 0
+
+    for i in range(args.warmup + args.iterations):
+        request = await prepare(endpoint, user_client, admin_client, fixture)
+        started = time.perf_counter()
+        response = await client.request(**request)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if i == 0:
+            cold_ms = round(elapsed_ms, 2)
+        if i < args.warmup:
+            continue
+        latencies.append(elapsed_ms)
+        statuses[str(response.status_code)] += 1
+        size = len(response.content)
+        timing = ROUND_TRIPS.search(response.headers.get("server-timing", ""))
+        if timing:
+            mongo_ms.append(float(timing.group(1)))
+            round_trips.append(int(timing.group(2)))
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(args.memory_iterations):
+            request = await prepare(endpoint, user_client, admin_client, fixture)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await client.request(**request)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append((peak - before) / 1024)
+            retained.append((current - before) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "samples": len(latencies),
+        "status": dict(statuses),
+        "errors": sum(n for status, n in statuses.items() if not (status.startswith("2") or status == "304")),
+        "cold_ms": cold_ms,
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "max_ms": round(max(latencies), 2) if latencies else None,
+        "round_trips": percentile(round_trips, 0.5),
+        "round_trips_max": max(round_trips) if round_trips else None,
+        "mongo_ms": percentile(mongo_ms, 0.5),
+        "response_bytes": size,
+        "alloc_peak_kb": percentile(peaks, 0.5),
+        "alloc_retained_kb": percentile(retained, 0.5),
+    }
+
+def uncovered_routes(server) -> List[str]:
+    covered = {e.name for e in CATALOGUE} | set(SKIPPED)
+    routes = []
+    for route in server.app.routes:
+        if getattr(route, "path", "").startswith("/api") and hasattr(route, "methods"):
+            routes.extend(f"{method} {route.path}" for method in sorted(route.methods) if method != "HEAD")
+    return sorted(r for r in routes if r not in covered)
+
+async def login(client, email: str, password: str) -> str:
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+async def run_scale(args) -> dict:
+    scale = args.worker
+    seed_db = f"{args.db_prefix}_{scale}"
+    server = app.load_server(f"{seed_db}_run")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    fixture = None if args.reseed else await seed.seeded(server.client[seed_db], scale)
+    if fixture is None:
+        await server.client.drop_database(server.db.name)
+    else:
+        await seed.copy_database(server.client, seed_db, server.db.name)
+    await app.start(server)
+    try:
+        if fixture is None:
+            logging.info(f"Seeding {scale} ({seed.SCALES[scale]} transactions per user)")
+            fixture = await seed.seed(server, scale, users=args.users, background_users=args.background_users)
+            # Seeded through the started server (migrations recorded), before any endpoint writes
+            await seed.copy_database(server.client, server.db.name, seed_db)
+        meta = await server.db.benchmark_meta.find_one({"scale": scale}, {"_id": 0})
+
+        async with app.client(server) as anonymous:
+            user_token = await login(anonymous, fixture["email"], fixture["password"])
+            admin_token = await login(
+                anonymous,
+                os.environ.get('ADMIN_EMAIL', 'admin@lpfinancas.com'),
+                os.environ.get('ADMIN_PASSWORD', 'AdminLP@2024')
+            )
+
+        results = {}
+        async with app.client(server, user_token) as user_client, app.client(server, admin_token) as admin_client:
+            for endpoint in CATALOGUE:
+                if args.only and not any(part in endpoint.route for part in args.only):
+                    continue
+                results[endpoint.name] = result = await measure(endpoint, user_client, admin_client, fixture, args)
+                logging.info(
+                    f"[{scale}] {endpoint.name}: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+                    f"{result['round_trips']} round trips, peak {result['alloc_peak_kb']} KiB"
+                    + (f", {result['errors']} errors {result['status']}" if result["errors"] else "")
+                )
+        return {
+            "transactions_per_user": seed.SCALES[scale],
+            "documents": meta["documents"],
+            "seed_seconds": meta["seconds"],
+            "endpoints": results,
+            "uncovered": uncovered_routes(server),
+        }
+    finally:
+        await app.stop(server)
+
+def git(*command: str) -> str:
+    return subprocess.run(["git", *command], capture_output=True, text=True).stdout.strip()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark every /api endpoint against seeded data")
+    parser.add_argument("--scales", default="1k,50k", help=f"comma-separated, of {', '.join(seed.SCALES)}")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--memory-iterations", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1, help="users seeded at the full scale")
+    parser.add_argument("--background-users", type=int, default=50, help="lighter users seeded alongside")
+    parser.add_argument("--only", action="append", help="only routes containing this (repeatable)")
+    parser.add_argument("--reseed", action="store_true", help="rebuild the seeded databases")
+    parser.add_argument("--db-prefix", default="benchmark")
+    parser.add_argument("--out", type=Path, help="report path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.worker_output.write_text(json.dumps(asyncio.run(run_scale(args))), encoding="utf-8")
+        return
+
+    scales = [s.strip() for s in args.scales.split(",") if s.strip()]
+    unknown = [s for s in scales if s not in seed.SCALES]
+    if unknown:
+        parser.error(f"unknown scales: {', '.join(unknown)}")
+    if args.background_users < 1:
+        parser.error("--background-users must be at least 1 (admin endpoints act on one)")
+
+    commit = git("rev-parse", "HEAD")
+    dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "memory_iterations": args.memory_iterations,
+            "users": args.users,
+            "background_users": args.background_users,
+        },
+        "skipped": SKIPPED,
+        "scales": {},
+    }
+
+    worker_args = [
+        "--iterations", str(args.iterations), "--warmup", str(args.warmup),
+        "--memory-iterations", str(args.memory_iterations), "--users", str(args.users),
+        "--background-users", str(args.background_users), "--db-prefix", args.db_prefix,
+        *(["--reseed"] if args.reseed else []), *(f"--only={part}" for part in args.only or ()),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            output = Path(tmp) / f"{scale}.json"
+            subprocess.run(
+                [sys.executable, "-m", "benchmarks.run", "--worker", scale, "--worker-output", str(output), *worker_args],
+                check=True, cwd=Path(__file__).resolve().parent.parent
+            )
+            report["scales"][scale] = json.loads(output.read_text(encoding="utf-8"))
+            uncovered = report["scales"][scale]["uncovered"]
+            if uncovered:
+                logging.warning(f"Routes without a benchmark: {', '.join(uncovered)}")
+
+    out = args.out or RESULTS_DIR / f"{commit[:10] or 'unknown'}{'-dirty' if dirty else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    logging.info(f"Report written to {out}")
+
+if __name__ == "__main__":
+    main()
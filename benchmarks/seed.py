@@ -0,0 +1,266 @@
+"""
+Synthetic users shaped like the real data in ``backup_dados/``.
+
+Categories, transaction descriptions, value ranges and payment methods come
+from the most recent backup; each generated user gets ``transactions``
+incomes and expenses spread over ``MONTHS`` months up to the current one,
+plus cards, budgets, investments, VR/VA benefits, recurring transactions and
+goals. Documents are built with the server's own models, so they carry every
+derived field (cents, periods, day fields, ``updated_at``) a document written
+through the API has. Generation is deterministic per scale and user index.
+"""
+import json
+import random
+import statistics
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import bcrypt
+
+BACKUP_DIR = Path(__file__).resolve().parent.parent / "backup_dados"
+
+SCALES = {"1k": 1_000, "50k": 50_000, "500k": 500_000}  # transactions per user
+MONTHS = 36
+INCOME_SHARE = 0.15
+BENEFIT_EXPENSE_SHARE = 0.05  # VR/VA purchases, relative to transactions
+BATCH_SIZE = 5000
+SEED_VERSION = 1  # bump when the generated shape changes, to force a reseed
+
+BENCH_PASSWORD = "Bench@2024"
+BENEFIT_CATEGORIES = ("restaurante", "mercado", "padaria", "acougue", "lanchonete", "outros")
+CARDS = (("Nubank", 8000.0, 5, 12), ("Itaú", 15000.0, 25, 3))
+INSTALLMENTS = (1, 1, 1, 2, 3, 6, 10)
+
+def load_templates() -> dict:
+    """Categories and per-category transaction templates from the latest backup"""
+    backup = json.loads(sorted(BACKUP_DIR.glob("backup_completo_*.json"))[-1].read_text(encoding="utf-8"))
+    names = {c["id"]: c["name"] for c in backup["categories"]}
+    categories = [{"name": c["name"], "type": c["type"]} for c in backup["categories"]]
+    templates: Dict[str, list] = {c["name"]: [] for c in categories}
+    for kind in ("incomes", "expenses"):
+        for doc in backup[kind]:
+            name = names.get(doc["category_id"])
+            if name is not None:
+                templates[name].append({
+                    "description": doc.get("description") or "-",
+                    "value": float(doc["value"]),
+                    "payment_method": doc.get("payment_method", "cash")
+                })
+    # Categories without samples get their own name and the median value of their type
+    medians = {
+        kind: statistics.median(float(d["value"]) for d in backup[f"{kind}s"])
+        for kind in ("income", "expense")
+    }
+    for c in categories:
+        if not templates[c["name"]] and c["type"] in medians:
+            templates[c["name"]].append({"description": c["name"], "value": medians[c["type"]], "payment_method": "cash"})
+    return {"categories": categories, "templates": templates}
+
+def recent_months(count: int, today: date) -> List[tuple]:
+    months = []
+    month, year = today.month, today.year
+    for _ in range(count):
+        months.append((month, year))
+        month, year = (12, year - 1) if month == 1 else (month - 1, year)
+    return months[::-1]
+
+def jitter(rng: random.Random, value: float) -> float:
+    return max(round(value * rng.lognormvariate(0, 0.35), 2), 0.01)
+
+def generate_user(server, templates: dict, transactions: int, rng: random.Random, email: str,
+                  name: str, password_hash: str, today: date) -> Iterator[Tuple[str, list]]:
+    """Every document of one user as (collection, batch) pairs; transactions
+    are produced a batch at a time, so the largest scales fit in memory"""
+    user = server.User(email=email, name=name, role="user", status="approved").model_dump()
+    user.update(password=password_hash, **server.user_search_fields(email, name))
+    uid = user["id"]
+    docs: Dict[str, list] = {"users": [user]}
+
+    categories = [server.Category(**c, user_id=uid, is_default=True).model_dump() for c in templates["categories"]]
+    docs["categories"] = categories
+    by_type: Dict[str, list] = {}
+    for c in categories:
+        by_type.setdefault(c["type"], []).append(c)
+
+    cards = [server.CreditCard(name=n, limit=l, closing_day=cd, due_day=dd, user_id=uid).model_dump()
+             for n, l, cd, dd in CARDS]
+    docs["credit_cards"] = cards
+
+    months = recent_months(MONTHS, today)
+    current = (today.month, today.year)
+
+    def day_in(month: int, year: int) -> str:
+        return date(year, month, rng.randint(1, 28)).isoformat()
+
+    def batched(collection: str, items: Iterator[dict]) -> Iterator[Tuple[str, list]]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == BATCH_SIZE:
+                yield collection, batch
+                batch = []
+        if batch:
+            yield collection, batch
+
+    def transaction(i: int, kind: str) -> dict:
+        month, year = months[i % len(months)]
+        settled = (month, year) != current or rng.random() < 0.5
+        category = rng.choice(by_type[kind])
+        template = rng.choice(templates["templates"][category["name"]])
+        day = day_in(month, year)
+        common = dict(
+            category_id=category["id"], description=template["description"], value=jitter(rng, template["value"]),
+            date=day, payment_date=day if settled else None, month=month, year=year, user_id=uid
+        )
+        if kind == "income":
+            return server.Income(**common, status="received" if settled else "pending").model_dump()
+        method = template["payment_method"]
+        if method == "cash" and rng.random() < 0.3:
+            method = rng.choice(("debit", "credit"))
+        installments = rng.choice(INSTALLMENTS) if method == "credit" else 1
+        return server.Expense(
+            **common, payment_method=method, due_date=day, status="paid" if settled else "pending",
+            credit_card_id=rng.choice(cards)["id"] if method == "credit" else None,
+            installments=installments, current_installment=rng.randint(1, installments)
+        ).model_dump()
+
+    docs["budgets"] = [
+        server.Budget(category_id=c["id"], planned_value=jitter(rng, 500), month=m, year=y, type="expense",
+                      user_id=uid).model_dump()
+        for m, y in months[-12:] for c in by_type.get("expense", [])
+    ]
+    docs["investments"] = [
+        server.Investment(category_id=rng.choice(by_type["investment"])["id"], description="Aporte mensal",
+                          initial_balance=10000, contribution=jitter(rng, 800), dividends=jitter(rng, 60),
+                          month=m, year=y, user_id=uid).model_dump()
+        for m, y in months
+    ] if "investment" in by_type else []
+    docs["benefit_credits"] = [
+        server.BenefitCredit(benefit_type=t, value=v, date=date(y, m, 1).isoformat(), description="Crédito mensal",
+                             month=m, year=y, user_id=uid).model_dump()
+        for m, y in months for t, v in (("vr", 900.0), ("va", 700.0))
+    ]
+
+    def benefit_expense(i: int) -> dict:
+        month, year = months[i % len(months)]
+        category = rng.choice(BENEFIT_CATEGORIES)
+        return server.BenefitExpense(
+            benefit_type="vr" if category in ("restaurante", "lanchonete", "padaria") else "va",
+            category=category, description=category.capitalize(), value=jitter(rng, 45),
+            date=day_in(month, year), establishment=f"Estabelecimento {rng.randint(1, 40)}",
+            month=month, year=year, user_id=uid
+        ).model_dump()
+
+    start = date(months[0][1], months[0][0], 1).isoformat()
+    docs["recurring_transactions"] = [
+        server.RecurringTransaction(type=c["type"], category_id=c["id"], description=c["name"],
+                                    value=templates["templates"][c["name"]][0]["value"], frequency="monthly",
+                                    start_date=start, day_of_month=rng.randint(1, 28),
+                                    payment_method="cash" if c["type"] == "expense" else None,
+                                    user_id=uid).model_dump()
+        for c in (by_type["income"][:2] + by_type["expense"][:3])
+    ]
+    goals = [
+        server.Goal(name=n, target_value=t, category=k, deadline=date(today.year + 2, 12, 31).isoformat(),
+                    user_id=uid).model_dump()
+        for n, t, k in (("Reserva de emergência", 30000, "emergency"), ("Viagem", 12000, "travel"),
+                        ("Carro", 60000, "car"))
+    ]
+    contributions = []
+    for goal in goals:
+        for m, y in months[-12:]:
+            contribution = server.GoalContribution(goal_id=goal["id"], user_id=uid, value=jitter(rng, 300),
+                                                   date=date(y, m, 10).isoformat())
+            contributions.append(contribution.model_dump())
+            goal["current_value"] = round(goal["current_value"] + contribution.value, 2)
+        goal["current_value_cents"] = server.to_cents(goal["current_value"])
+    docs["goals"], docs["goal_contributions"] = goals, contributions
+
+    for collection, items in docs.items():
+        yield from batched(collection, iter(items))
+    n_incomes = round(transactions * INCOME_SHARE)
+    yield from batched("incomes", (transaction(i, "income") for i in range(n_incomes)))
+    yield from batched("expenses", (transaction(i, "expense") for i in range(n_incomes, transactions)))
+    yield from batched("benefit_expenses", (
+        benefit_expense(i) for i in range(round(transactions * BENEFIT_EXPENSE_SHARE))
+    ))
+
+async def copy_database(client, source: str, target: str):
+    """Replace database ``target`` with a server-side copy of every collection
+    of ``source`` (``$out`` across databases needs MongoDB 4.4). Indexes are
+    not copied; the server builds its own at startup."""
+    await client.drop_database(target)
+    for name in await client[source].list_collection_names():
+        await client[source][name].aggregate([{"$out": {"db": target, "coll": name}}]).to_list(None)
+
+async def seeded(db, scale: str):
+    """The fixture of an existing seed of ``scale``, if it is current"""
+    meta = await db.benchmark_meta.find_one({"scale": scale, "seed_version": SEED_VERSION}, {"_id": 0})
+    return meta["fixture"] if meta else None
+
+async def seed(server, scale: str, users: int = 1, background_users: int = 50,
+               background_transactions: int = 100) -> dict:
+    """Insert ``users`` users with the scale's transaction count, plus lighter
+    background users so admin listings and indexes are not trivially small,
+    and return the fixture of the first user"""
+    db = server.db
+    started = time.monotonic()
+    templates = load_templates()
+    today = datetime.now(timezone.utc).date()
+    # One hash shared by every user: bcrypt at the server's cost is slow by design
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+    first: Dict[str, list] = {}  # first batch of each collection of the first user
+    user_ids = []
+    counts: Dict[str, int] = {}
+    plan = [(i, SCALES[scale]) for i in range(users)] + \
+           [(users + i, background_transactions) for i in range(background_users)]
+    for index, transactions in plan:
+        rng = random.Random(f"{scale}-{index}")
+        for collection, batch in generate_user(server, templates, transactions, rng,
+                                               f"bench-{scale}-{index}@benchmark.lpfinancas.com", f"Benchmark {index}",
+                                               password_hash, today):
+            await db[collection].insert_many(batch, ordered=False)
+            counts[collection] = counts.get(collection, 0) + len(batch)
+            if index == 0:
+                first.setdefault(collection, batch)
+            if collection == "users":
+                user_ids.append(batch[0]["id"])
+
+    fixture = fixture_of(first, today)
+    # Admin actions (approve, block) target a user the benchmark does not log in as
+    fixture["other_user_id"] = user_ids[1]
+    await db.benchmark_meta.replace_one(
+        {"scale": scale},
+        {"scale": scale, "seed_version": SEED_VERSION, "fixture": fixture, "documents": counts,
+         "seconds": round(time.monotonic() - started, 1), "created_at": datetime.now(timezone.utc).isoformat()},
+        upsert=True
+    )
+    return fixture
+
+def fixture_of(docs: Dict[str, list], today: date) -> dict:
+    """Ids and credentials the endpoint catalogue needs"""
+    def first_of(collection: str, **match) -> str:
+        return next(d["id"] for d in docs[collection] if all(d.get(k) == v for k, v in match.items()))
+
+    return {
+        "user_id": docs["users"][0]["id"],
+        "email": docs["users"][0]["email"],
+        "password": BENCH_PASSWORD,
+        "month": today.month,
+        "year": today.year,
+        "category_id": first_of("categories", type="expense"),
+        "income_category_id": first_of("categories", type="income"),
+        "expense_category_id": first_of("categories", type="expense"),
+        "investment_category_id": first_of("categories", type="investment"),
+        "income_id": docs["incomes"][0]["id"],
+        "expense_id": docs["expenses"][0]["id"],
+        "card_id": docs["credit_cards"][0]["id"],
+        "investment_id": docs["investments"][0]["id"],
+        "credit_id": docs["benefit_credits"][0]["id"],
+        "benefit_expense_id": docs["benefit_expenses"][0]["id"],
+        "transaction_id": docs["recurring_transactions"][0]["id"],
+        "goal_id": docs["goals"][0]["id"],
+    }
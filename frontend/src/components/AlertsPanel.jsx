@@ -12,6 +12,7 @@ import {
   DollarSign,
   CheckCircle
 } from 'lucide-react';
+import { useFinance } from '../contexts/FinanceContext';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL;
 
@@ -20,10 +21,11 @@ export function AlertsPanel({ month, year }) {
   const [dueDateAlerts, setDueDateAlerts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [dismissed, setDismissed] = useState([]);
+  const { dataVersion } = useFinance();
 
   useEffect(() => {
     fetchAlerts();
-  }, [month, year]);
+  }, [month, year, dataVersion]);
 
   const fetchAlerts = async () => {
     try {
@@ -5,6 +5,7 @@ import {
   TrendingUp, TrendingDown, PiggyBank, PieChart, Clock, Target, 
   CreditCard, AlertTriangle, CheckCircle, Info, Lightbulb
 } from 'lucide-react';
+import { useFinance } from '../contexts/FinanceContext';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -43,9 +44,11 @@ export function PersonalizedTips() {
   const [tips, setTips] = useState([]);
   const [loading, setLoading] = useState(true);
 
+  const { dataVersion } = useFinance();
+
   useEffect(() => {
     fetchTips();
-  }, []);
+  }, [dataVersion]);
 
   const fetchTips = async () => {
     try {
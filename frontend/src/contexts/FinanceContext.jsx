@@ -17,6 +17,7 @@ export function FinanceProvider({ children }) {
   const [budgets, setBudgets] = useState([]);
   const [summary, setSummary] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [dataVersion, setDataVersion] = useState(0);
 
   const fetchCategories = useCallback(async () => {
     try {
@@ -93,22 +94,68 @@ export function FinanceProvider({ children }) {
 
   const refreshAll = useCallback(async () => {
     setLoading(true);
-    await Promise.all([
-      fetchCategories(),
-      fetchCreditCards(),
-      fetchIncomes(),
-      fetchExpenses(),
-      fetchInvestments(),
-      fetchBudgets(),
-      fetchSummary()
-    ]);
+    try {
+      // Single request for everything the month screen needs
+      const response = await axios.get(`${API}/snapshot`, {
+        params: { month: selectedMonth, year: selectedYear }
+      });
+      const snapshot = response.data;
+      setCategories(snapshot.categories);
+      setCreditCards(snapshot.credit_cards);
+      setIncomes(snapshot.incomes);
+      setExpenses(snapshot.expenses);
+      setInvestments(snapshot.investments);
+      setBudgets(snapshot.budgets);
+      setSummary(snapshot.summary);
+    } catch (error) {
+      console.error('Error fetching snapshot:', error);
+    }
     setLoading(false);
-  }, [fetchCategories, fetchCreditCards, fetchIncomes, fetchExpenses, fetchInvestments, fetchBudgets, fetchSummary]);
+  }, [selectedMonth, selectedYear]);
 
   useEffect(() => {
     refreshAll();
   }, [selectedMonth, selectedYear, refreshAll]);
 
+  // Server pushes a new data version whenever this user's data changes
+  // (other devices, recurring generation, imports); refetch only then
+  useEffect(() => {
+    if (!localStorage.getItem('token') || typeof EventSource === 'undefined') return undefined;
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    // The stream is opened with a short-lived ticket, not the session token,
+    // so every (re)connection asks for a fresh one
+    const connect = async () => {
+      try {
+        const { data } = await axios.post(`${API}/events/ticket`);
+        if (closed) return;
+        source = new EventSource(`${API}/events?ticket=${encodeURIComponent(data.ticket)}`);
+        source.addEventListener('version', (event) => {
+          setDataVersion(JSON.parse(event.data).version);
+        });
+        source.onerror = () => {
+          source.close();
+          if (!closed) retryTimer = setTimeout(connect, 5000);
+        };
+      } catch (error) {
+        if (!closed) retryTimer = setTimeout(connect, 30000);
+      }
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, []);
+
+  useEffect(() => {
+    if (dataVersion) refreshAll();
+  }, [dataVersion]);
+
   // CRUD Operations
   const createIncome = async (data) => {
     const response = await axios.post(`${API}/incomes`, data);
@@ -231,6 +278,7 @@ export function FinanceProvider({ children }) {
       budgets,
       summary,
       loading,
+      dataVersion,
       refreshAll,
       createIncome,
       updateIncome,
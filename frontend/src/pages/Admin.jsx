@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback } from 'react';
 import axios from 'axios';
 import { useAuth } from '../contexts/AuthContext';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '../components/ui/card';
@@ -28,13 +28,21 @@ import {
 } from '../components/ui/dialog';
 import { Badge } from '../components/ui/badge';
 import { toast } from '../components/ui/toast-provider';
-import { Users, UserCheck, UserX, Trash2, Shield, Pencil, UserPlus } from 'lucide-react';
+import { Users, UserCheck, UserX, Trash2, Shield, Pencil, UserPlus, Search, ChevronLeft, ChevronRight } from 'lucide-react';
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const PAGE_SIZE = 25;
 
 export function Admin() {
   const { user: currentUser } = useAuth();
   const [users, setUsers] = useState([]);
+  const [total, setTotal] = useState(0);
+  const [counts, setCounts] = useState({ total: 0, pending: 0, approved: 0, blocked: 0 });
+  // Cursor of each page visited so far; the last one is the page shown
+  const [cursors, setCursors] = useState([null]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [search, setSearch] = useState('');
+  const [statusFilter, setStatusFilter] = useState('all');
   const [loading, setLoading] = useState(true);
   const [isEditOpen, setIsEditOpen] = useState(false);
   const [isCreateOpen, setIsCreateOpen] = useState(false);
@@ -47,20 +55,35 @@ export function Admin() {
     status: 'approved'
   });
 
-  useEffect(() => {
-    fetchUsers();
-  }, []);
-
-  const fetchUsers = async () => {
+  const fetchUsers = useCallback(async () => {
     try {
-      const response = await axios.get(`${API}/admin/users`);
-      setUsers(response.data);
+      const response = await axios.get(`${API}/admin/users`, {
+        params: {
+          cursor: cursors[cursors.length - 1] || undefined,
+          page_size: PAGE_SIZE,
+          q: search || undefined,
+          status: statusFilter === 'all' ? undefined : statusFilter
+        }
+      });
+      setUsers(response.data.items);
+      setTotal(response.data.total);
+      setNextCursor(response.data.next_cursor);
+      setCounts(response.data.counts);
     } catch (error) {
       toast.error('Erro ao carregar usuários');
     } finally {
       setLoading(false);
     }
-  };
+  }, [cursors, search, statusFilter]);
+
+  useEffect(() => {
+    // Debounce typing in the search box
+    const timer = setTimeout(fetchUsers, search ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [fetchUsers]);
+
+  const page = cursors.length;
+  const totalPages = Math.max(1, Math.ceil(total / PAGE_SIZE));
 
   const resetForm = () => {
     setFormData({
@@ -186,8 +209,6 @@ export function Admin() {
     return <Badge variant="secondary">Usuário</Badge>;
   };
 
-  const pendingCount = users.filter(u => u.status === 'pending').length;
-
   return (
     <div className="space-y-6 animate-fade-in" data-testid="admin-page">
       {/* Header */}
@@ -215,7 +236,7 @@ export function Admin() {
             <Users className="h-4 w-4 text-muted-foreground" />
           </CardHeader>
           <CardContent>
-            <div className="text-2xl font-bold text-foreground">{users.length}</div>
+            <div className="text-2xl font-bold text-foreground">{counts.total}</div>
           </CardContent>
         </Card>
         <Card className="card-hover">
@@ -224,7 +245,7 @@ export function Admin() {
             <UserCheck className="h-4 w-4 text-yellow-500" />
           </CardHeader>
           <CardContent>
-            <div className="text-2xl font-bold text-yellow-500">{pendingCount}</div>
+            <div className="text-2xl font-bold text-yellow-500">{counts.pending}</div>
           </CardContent>
         </Card>
         <Card className="card-hover">
@@ -233,9 +254,7 @@ export function Admin() {
             <UserCheck className="h-4 w-4 text-emerald-500" />
           </CardHeader>
           <CardContent>
-            <div className="text-2xl font-bold text-emerald-500">
-              {users.filter(u => u.status === 'approved').length}
-            </div>
+            <div className="text-2xl font-bold text-emerald-500">{counts.approved}</div>
           </CardContent>
         </Card>
       </div>
@@ -245,6 +264,29 @@ export function Admin() {
         <CardHeader>
           <CardTitle>Usuários</CardTitle>
           <CardDescription>Lista de todos os usuários cadastrados no sistema</CardDescription>
+          <div className="flex flex-col sm:flex-row gap-2 pt-2">
+            <div className="relative flex-1">
+              <Search className="absolute left-3 top-1/2 -translate-y-1/2 h-4 w-4 text-muted-foreground" />
+              <Input
+                value={search}
+                onChange={(e) => { setSearch(e.target.value); setCursors([null]); }}
+                placeholder="Buscar por nome ou e-mail"
+                className="pl-9"
+                data-testid="admin-user-search"
+              />
+            </div>
+            <Select value={statusFilter} onValueChange={(v) => { setStatusFilter(v); setCursors([null]); }}>
+              <SelectTrigger className="sm:w-44">
+                <SelectValue />
+              </SelectTrigger>
+              <SelectContent>
+                <SelectItem value="all">Todos os status</SelectItem>
+                <SelectItem value="pending">Pendentes</SelectItem>
+                <SelectItem value="approved">Aprovados</SelectItem>
+                <SelectItem value="blocked">Bloqueados</SelectItem>
+              </SelectContent>
+            </Select>
+          </div>
         </CardHeader>
         <CardContent className="p-0">
           <Table>
@@ -331,6 +373,31 @@ export function Admin() {
               ))}
             </TableBody>
           </Table>
+          <div className="flex items-center justify-between px-4 py-3 border-t">
+            <span className="text-sm text-muted-foreground">
+              {total} usuário(s) · Página {page} de {totalPages}
+            </span>
+            <div className="flex gap-2">
+              <Button
+                variant="outline"
+                size="sm"
+                onClick={() => setCursors(cursors.slice(0, -1))}
+                disabled={page <= 1}
+              >
+                <ChevronLeft className="h-4 w-4" />
+                Anterior
+              </Button>
+              <Button
+                variant="outline"
+                size="sm"
+                onClick={() => setCursors([...cursors, nextCursor])}
+                disabled={!nextCursor}
+              >
+                Próxima
+                <ChevronRight className="h-4 w-4" />
+              </Button>
+            </div>
+          </div>
         </CardContent>
       </Card>
 
@@ -81,18 +81,21 @@ export const FinanceProvider = ({ children }) => {
   const refreshAll = useCallback(async () => {
     setLoading(true);
     try {
-      await Promise.all([
-        fetchSummary(),
-        fetchIncomes(),
-        fetchExpenses(),
-        fetchCategories(),
-        fetchCreditCards(),
-        fetchInvestments(),
-      ]);
+      // Single request for everything the month screen needs
+      const response = await dashboardService.getSnapshot(month, year);
+      const snapshot = response.data;
+      setSummary(snapshot.summary);
+      setIncomes(snapshot.incomes);
+      setExpenses(snapshot.expenses);
+      setCategories(snapshot.categories);
+      setCreditCards(snapshot.credit_cards);
+      setInvestments(snapshot.investments);
+    } catch (error) {
+      console.error('Error fetching snapshot:', error);
     } finally {
       setLoading(false);
     }
-  }, [fetchSummary, fetchIncomes, fetchExpenses, fetchCategories, fetchCreditCards, fetchInvestments]);
+  }, [month, year]);
 
   const changeMonth = (newMonth, newYear) => {
     setMonth(newMonth);
@@ -18,10 +18,16 @@ import { Ionicons } from '@expo/vector-icons';
 import { useTheme } from '../contexts/ThemeContext';
 import api from '../services/api';
 
+const PAGE_SIZE = 30;
+
 export default function AdminScreen() {
   const { colors, isDark } = useTheme();
   const [refreshing, setRefreshing] = useState(false);
   const [users, setUsers] = useState([]);
+  const [page, setPage] = useState(1);
+  const [total, setTotal] = useState(0);
+  const [search, setSearch] = useState('');
+  const [loadingMore, setLoadingMore] = useState(false);
   const [modalVisible, setModalVisible] = useState(false);
   const [formData, setFormData] = useState({
     name: '',
@@ -30,24 +36,38 @@ export default function AdminScreen() {
     role: 'user',
   });
 
-  const fetchUsers = async () => {
+  const fetchUsers = useCallback(async (nextPage = 1) => {
     try {
-      const response = await api.get('/admin/users');
-      setUsers(response.data);
+      const response = await api.get('/admin/users', {
+        params: { page: nextPage, page_size: PAGE_SIZE, q: search || undefined },
+      });
+      const { items, total: matching } = response.data;
+      setUsers((current) => (nextPage === 1 ? items : [...current, ...items]));
+      setPage(nextPage);
+      setTotal(matching);
     } catch (error) {
       console.log('Error fetching users:', error);
     }
-  };
+  }, [search]);
 
   useEffect(() => {
-    fetchUsers();
-  }, []);
+    // Debounce the search box; the first page is fetched on mount too
+    const timer = setTimeout(() => fetchUsers(1), search ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [fetchUsers]);
 
   const onRefresh = useCallback(async () => {
     setRefreshing(true);
-    await fetchUsers();
+    await fetchUsers(1);
     setRefreshing(false);
-  }, []);
+  }, [fetchUsers]);
+
+  const loadMore = async () => {
+    if (loadingMore || users.length >= total) return;
+    setLoadingMore(true);
+    await fetchUsers(page + 1);
+    setLoadingMore(false);
+  };
 
   const openAddModal = () => {
     setFormData({
@@ -244,12 +264,24 @@ export default function AdminScreen() {
         <View style={styles.headerContent}>
           <View>
             <Text style={styles.headerTitle}>Administração</Text>
-            <Text style={styles.headerSubtitle}>{users.length} usuários cadastrados</Text>
+            <Text style={styles.headerSubtitle}>{total} usuários {search ? 'encontrados' : 'cadastrados'}</Text>
           </View>
           <TouchableOpacity onPress={openAddModal} style={styles.addButton}>
             <Ionicons name="person-add" size={24} color="#1a2d47" />
           </TouchableOpacity>
         </View>
+        <View style={styles.searchContainer}>
+          <Ionicons name="search" size={18} color={colors.textSecondary} />
+          <TextInput
+            style={styles.searchInput}
+            placeholder="Buscar por nome ou e-mail"
+            placeholderTextColor={colors.textSecondary}
+            value={search}
+            onChangeText={setSearch}
+            autoCapitalize="none"
+            autoCorrect={false}
+          />
+        </View>
       </LinearGradient>
 
       <FlatList
@@ -258,6 +290,8 @@ export default function AdminScreen() {
         renderItem={renderUser}
         contentContainerStyle={styles.listContainer}
         refreshControl={<RefreshControl refreshing={refreshing} onRefresh={onRefresh} tintColor={colors.gold} />}
+        onEndReached={loadMore}
+        onEndReachedThreshold={0.5}
         ListEmptyComponent={
           <View style={styles.emptyContainer}>
             <Ionicons name="people-outline" size={64} color={colors.gold} />
@@ -394,6 +428,21 @@ const createStyles = (colors, isDark) => StyleSheet.create({
     color: colors.gold,
     marginTop: 4,
   },
+  searchContainer: {
+    flexDirection: 'row',
+    alignItems: 'center',
+    gap: 8,
+    marginTop: 16,
+    paddingHorizontal: 14,
+    borderRadius: 12,
+    backgroundColor: colors.surface,
+  },
+  searchInput: {
+    flex: 1,
+    paddingVertical: 10,
+    fontSize: 15,
+    color: colors.text,
+  },
   listContainer: { 
     padding: 20, 
     paddingBottom: 100 
@@ -48,6 +48,7 @@ export const authService = {
 export const dashboardService = {
   getSummary: (month, year) => api.get(`/dashboard/summary?month=${month}&year=${year}`),
   getYearly: (year) => api.get(`/dashboard/yearly?year=${year}`),
+  getSnapshot: (month, year) => api.get(`/snapshot?month=${month}&year=${year}`),
 };
 
 // Analytics
@@ -0,0 +1,92 @@
+"""
+Shared fixtures: the API imported once against an in-memory Mongo
+(mongomock-motor), with the fake LLM and no tracing or loop watchdog.
+
+Every test gets an empty database and a freshly started app; tests that
+need the event loop are marked ``anyio``.
+"""
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+os.environ.update({
+    "MONGO_URL": "mongodb://localhost:27017",
+    "DB_NAME": "lpfinancas_tests",
+    "LLM_BACKEND": "fake",
+    "FAKE_LLM_FIRST_TOKEN_MS": "0",
+    "FAKE_LLM_TOKEN_MS": "0",
+    "TRACE_EXPORTER": "none",
+    "LOOP_STALL_THRESHOLD_MS": "0",
+    "MONGO_ROUND_TRIP_BUDGET": "1000000",
+})
+
+import mongomock_motor  # noqa: E402
+import motor.motor_asyncio  # noqa: E402
+
+motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+ADMIN_EMAIL = os.environ.get("ADMIN_EMAIL", "admin@lpfinancas.com")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "AdminLP@2024")
+USER_PASSWORD = "Teste@2024"
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+def api_client(token: str = None) -> httpx.AsyncClient:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test", headers=headers)
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+@pytest.fixture
+async def app(anyio_backend):
+    """The started server module, on an empty database"""
+    await server.client.drop_database(server.db.name)
+    server.completed_migrations.clear()
+    await server.app.router.startup()
+    try:
+        yield server
+    finally:
+        await server.app.router.shutdown()
+
+@pytest.fixture
+async def admin_client(app):
+    async with api_client() as anonymous:
+        token = await login(anonymous, ADMIN_EMAIL, ADMIN_PASSWORD)
+    async with api_client(token) as client:
+        yield client
+
+@pytest.fixture
+async def make_user(app, admin_client):
+    """Create an approved user and return a client logged in as them"""
+    clients = []
+
+    async def create(name: str = "Usuária Teste") -> httpx.AsyncClient:
+        email = f"teste{len(clients) + 1}@lpfinancas.com"
+        response = await admin_client.post("/api/admin/users", json={
+            "name": name, "email": email, "password": USER_PASSWORD
+        })
+        response.raise_for_status()
+        async with api_client() as anonymous:
+            token = await login(anonymous, email, USER_PASSWORD)
+        client = api_client(token)
+        clients.append(client)
+        return client
+
+    yield create
+    for client in clients:
+        await client.aclose()
+
+@pytest.fixture
+async def user_client(make_user):
+    return await make_user()
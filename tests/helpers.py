@@ -0,0 +1,28 @@
+"""Request helpers shared by the API tests"""
+from datetime import date
+from typing import Optional
+
+async def category_id(client, kind: str = "expense") -> str:
+    """Id of one of the user's default categories of ``kind``"""
+    categories = (await client.get("/api/categories")).json()
+    return next(c["id"] for c in categories if c["type"] == kind)
+
+async def add_expense(client, value: float, day: Optional[date] = None, **fields) -> dict:
+    day = day or date.today()
+    response = await client.post("/api/expenses", json={
+        "category_id": fields.pop("category_id", None) or await category_id(client, "expense"),
+        "description": "Mercado", "value": value, "date": day.isoformat(),
+        "month": day.month, "year": day.year, **fields
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+async def add_income(client, value: float, day: Optional[date] = None, **fields) -> dict:
+    day = day or date.today()
+    response = await client.post("/api/incomes", json={
+        "category_id": fields.pop("category_id", None) or await category_id(client, "income"),
+        "description": "Salário", "value": value, "date": day.isoformat(),
+        "month": day.month, "year": day.year, **fields
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
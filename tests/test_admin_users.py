@@ -0,0 +1,47 @@
+"""Keyset pagination of the admin user listing (user-038)"""
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def users(app):
+    """Seven users, several sharing a creation time and a name so the id
+    has to break ties"""
+    docs = [{
+        "id": f"u{i}", "email": f"pessoa{i % 4}{i}@lpfinancas.com", "name": f"Pessoa {i % 3}",
+        "role": "user", "status": "approved", "created_at": f"2024-01-0{i % 3 + 1}T00:00:00+00:00",
+        **app.user_search_fields(f"pessoa{i % 4}{i}@lpfinancas.com", f"Pessoa {i % 3}")
+    } for i in range(7)]
+    await app.db.users.insert_many(docs)
+    return docs
+
+async def all_pages(client, **params) -> list:
+    ids, cursor = [], None
+    for _ in range(10):
+        response = await client.get("/api/admin/users", params={
+            "page_size": 3, "q": "pessoa", **params, **({"cursor": cursor} if cursor else {})
+        })
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert page["total"] == 7
+        ids.extend(u["id"] for u in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+    raise AssertionError("pagination did not end")
+
+@pytest.mark.parametrize("sort", ["-created_at", "created_at", "name", "-name", "email", "-email"])
+async def test_pages_cover_every_user_once_in_order(admin_client, users, sort):
+    field, reverse = sort.lstrip("-"), sort.startswith("-")
+    expected = [u["id"] for u in sorted(users, key=lambda u: (u[field], u["id"]), reverse=reverse)]
+
+    assert await all_pages(admin_client, sort=sort) == expected
+
+async def test_last_full_page_has_no_cursor(admin_client, users):
+    response = await admin_client.get("/api/admin/users", params={"page_size": 7, "q": "pessoa"})
+    assert len(response.json()["items"]) == 7
+    assert response.json()["next_cursor"] is None
+
+async def test_invalid_cursor_is_400(admin_client):
+    response = await admin_client.get("/api/admin/users", params={"cursor": "not a cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,207 @@
+"""Columnar analytics against the per-month loops they replaced (user-043)"""
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+import analytics_engine as ae
+from tests.helpers import add_expense
+
+CATEGORIES = [{"id": f"c{i}", "name": f"Categoria {i}"} for i in range(4)]
+
+def history(seed: int = 7, count: int = 400):
+    """Incomes and expenses spread over 2023-2025, with reais values that
+    do not add up exactly as floats"""
+    rng = random.Random(seed)
+
+    def record(statuses):
+        year, month = rng.choice((2023, 2024, 2025)), rng.randint(1, 12)
+        return {
+            "year": year, "month": month, "category_id": rng.choice(CATEGORIES)["id"],
+            "value": round(rng.uniform(0.01, 900), 2), "status": rng.choice(statuses),
+            "payment_method": rng.choice(("pix", "credit", "debit"))
+        }
+
+    incomes = [record(("received", "pending")) for _ in range(count // 4)]
+    expenses = [record(("paid", "pending")) for _ in range(count)]
+    return incomes, expenses
+
+def old_total(docs, month, year, status=None, **fields):
+    """Sum of ``value`` the way the old handlers filtered a month"""
+    return sum(
+        d["value"] for d in docs
+        if d["month"] == month and d["year"] == year and (status is None or d["status"] == status)
+        and all(d.get(k) == v for k, v in fields.items())
+    )
+
+def old_months_back(month, year, count):
+    """(month, year) from ``count - 1`` months ago up to the given one"""
+    months = []
+    for i in range(count - 1, -1, -1):
+        m, y = month - i, year
+        while m <= 0:
+            m += 12
+            y -= 1
+        months.append((m, y))
+    return months
+
+@pytest.mark.parametrize("period, delta, expected", [
+    (202405, 0, 202405),
+    (202405, -4, 202401),
+    (202405, -5, 202312),
+    (202401, -12, 202301),
+    (202401, -13, 202212),
+    (202411, 3, 202502),
+    (202412, 1, 202501),
+    (202406, 30, 202612),
+])
+def test_shift_period(period, delta, expected):
+    assert ae.shift_period(period, delta) == expected
+
+def test_rolling_mean_averages_what_is_available_at_the_start():
+    means = ae.rolling_mean(np.array([10, 20, 30, 40, 50]), 3)
+
+    assert means.tolist() == pytest.approx([10, 15, 20, 30, 40])
+
+def test_rolling_mean_runs_along_the_last_axis():
+    means = ae.rolling_mean(np.array([[1, 1, 1, 1], [0, 4, 8, 12]]), 2)
+
+    np.testing.assert_allclose(means, [[1, 1, 1, 1], [0, 2, 6, 10]])
+
+def test_frame_keeps_cents_and_falls_back_to_reais():
+    frame = ae.UserFrame.from_documents(
+        [{"year": 2024, "month": 1, "value": 0.125, "status": "received"}],
+        [{"year": 2024, "month": 1, "value": 99, "value_cents": 1050, "status": "paid", "category_id": "c1"}]
+    )
+
+    assert frame.total(ae.INCOME) == 13
+    assert frame.total(ae.EXPENSE, ("paid",), [202401]) == 1050
+    assert frame.total(ae.EXPENSE, ("paid",), [202402]) == 0
+    assert frame.category_totals(202401, ae.EXPENSE) == {"c1": 1050}
+
+@pytest.mark.parametrize("month, year", [(3, 2025), (1, 2024), (12, 2024)])
+def test_trends_match_old_handler(month, year):
+    incomes, expenses = history()
+    result = ae.trends(ae.UserFrame.from_documents(incomes, expenses), month, year, CATEGORIES)
+
+    months = old_months_back(month, year, 6)
+    expected = [{
+        "month": m, "year": y,
+        "income": old_total(incomes, m, y, "received"),
+        "expense": old_total(expenses, m, y, "paid")
+    } for m, y in months]
+    assert [(d["month"], d["year"]) for d in result["monthly_data"]] == months
+    for row, old in zip(result["monthly_data"], expected):
+        assert row["income"] == pytest.approx(old["income"])
+        assert row["expense"] == pytest.approx(old["expense"])
+    assert result["averages"]["income"] == pytest.approx(sum(d["income"] for d in expected[:-1]) / 5)
+    assert result["averages"]["expense"] == pytest.approx(sum(d["expense"] for d in expected[:-1]) / 5)
+
+    for trend in result["category_trends"]:
+        current = old_total(expenses, month, year, category_id=trend["category_id"])
+        average = sum(old_total(expenses, m, y, category_id=trend["category_id"]) for m, y in months[:-1]) / 5
+        assert trend["current"] == pytest.approx(current)
+        assert trend["average"] == pytest.approx(average)
+    assert [t["category_id"] for t in result["category_trends"]] == [c["id"] for c in CATEGORIES]
+
+def test_trends_skip_categories_without_spending():
+    frame = ae.UserFrame.from_documents([], [
+        {"year": 2024, "month": 5, "value": 10, "status": "paid", "category_id": "c1"}
+    ])
+
+    result = ae.trends(frame, 5, 2024, CATEGORIES)
+    assert [t["category_id"] for t in result["category_trends"]] == ["c1"]
+    assert result["category_trends"][0]["variation"] == 0
+    assert result["variations"]["expense_trend"] == "stable"
+
+@pytest.mark.parametrize("month, year", [(3, 2025), (1, 2025)])
+def test_comparison_matches_old_handler(month, year):
+    incomes, expenses = history()
+    result = ae.comparison(ae.UserFrame.from_documents(incomes, expenses), month, year)
+
+    prev_month, prev_year = (month - 1, year) if month > 1 else (12, year - 1)
+    for key, (m, y) in (("current", (month, year)), ("previous_month", (prev_month, prev_year)),
+                        ("last_year", (month, year - 1))):
+        income, expense = old_total(incomes, m, y, "received"), old_total(expenses, m, y, "paid")
+        assert result[key]["income"] == pytest.approx(income)
+        assert result[key]["expense"] == pytest.approx(expense)
+        assert result[key]["balance"] == pytest.approx(income - expense)
+
+    current, previous = result["current"], result["previous_month"]
+    assert result["variations"]["expense_vs_previous"] == pytest.approx(
+        (current["expense"] - previous["expense"]) / previous["expense"] * 100
+    )
+
+@pytest.mark.parametrize("month, year", [(6, 2025), (2, 2024), (12, 2025)])
+def test_forecast_matches_old_handler(month, year):
+    incomes, expenses = history()
+    result = ae.forecast(ae.UserFrame.from_documents(incomes, expenses), month, year)
+
+    months = old_months_back(month, year, 3)
+    balances = [old_total(incomes, m, y, "received") - old_total(expenses, m, y, "paid") for m, y in months]
+    current_balance = balances[-1]
+    forecast_current = (
+        current_balance + old_total(incomes, month, year, "pending") - old_total(expenses, month, year, "pending")
+    )
+    assert [(d["month"], d["year"]) for d in result["historical_data"]] == months
+    assert result["current_balance"] == pytest.approx(current_balance)
+    assert result["forecast_current_month"] == pytest.approx(forecast_current)
+    assert result["average_monthly_balance"] == pytest.approx(sum(balances) / 3)
+    assert [f["forecasted_balance"] for f in result["forecast_next_months"]] == pytest.approx(
+        [forecast_current + sum(balances) / 3 * i for i in (1, 2, 3)]
+    )
+
+def test_tips_match_old_rules():
+    names = {c["id"]: c["name"] for c in CATEGORIES}
+    frame = ae.UserFrame.from_documents(
+        [{"year": 2024, "month": 5, "value": 1000, "status": "received"}],
+        [
+            {"year": 2024, "month": 4, "value": 100, "status": "paid", "category_id": "c1"},
+            {"year": 2024, "month": 5, "value": 600, "status": "paid", "category_id": "c2", "payment_method": "credit"},
+            {"year": 2024, "month": 5, "value": 350, "status": "paid", "category_id": "c3"},
+            {"year": 2024, "month": 5, "value": 80.5, "status": "pending", "category_id": "c3"},
+        ]
+    )
+    goals = [{"name": "Viagem", "current_value": 950, "target_value": 1000}]
+
+    result = ae.tips(frame, 5, 2024, names, goals)
+    assert [t["title"] for t in result] == [
+        "Gastos aumentaram",
+        "Taxa de poupança baixa",
+        "Alto uso de cartão de crédito",
+        "Concentração em Categoria 2",
+        "Contas pendentes",
+        "Meta 'Viagem' quase lá!",
+    ]
+    assert "850.0%" in result[0]["message"]
+    assert "R$ 80.50" in result[4]["message"]
+
+def test_tips_name_unknown_top_category_outros():
+    frame = ae.UserFrame.from_documents([], [
+        {"year": 2024, "month": 5, "value": 10, "status": "paid", "category_id": "gone"}
+    ])
+
+    result = ae.tips(frame, 5, 2024, {}, [])
+    assert [t["title"] for t in result] == ["Concentração em Outros"]
+
+def test_history_periods_cover_a_year_back():
+    assert ae.history_periods(3, 2025) == (202403, 202503)
+
+@pytest.mark.anyio
+async def test_frame_loads_only_the_history_window(app, user_client):
+    user_id = (await user_client.get("/api/auth/me")).json()["id"]
+    for day in (date(2024, 2, 10), date(2024, 3, 10), date(2025, 3, 10), date(2025, 4, 10)):
+        await add_expense(user_client, 10, day)
+
+    frame = await app.load_user_frame(user_id, 3, 2025)
+    assert sorted(frame.period.tolist()) == [202403, 202503]
+    frame = await app.load_user_frame(user_id, 4, 2025)
+    assert sorted(frame.period.tolist()) == [202503, 202504]
+
+def test_unnamed_categories_fall_back_like_deleted_ones():
+    names = ae.category_names([{"id": "c1", "name": "Mercado"}, {"id": "c2"}, {"id": "c3", "name": ""}])
+    assert names == {"c1": "Mercado"}
+
+    record = {"value": 10, "description": "x", "category_id": "c2", "status": "paid"}
+    assert ae.highlight(record, names)["category"] == ae.highlight({**record, "category_id": "gone"}, names)["category"]
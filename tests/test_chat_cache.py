@@ -0,0 +1,89 @@
+"""LLM answer cache (user-035), exercised offline through the fake LLM backend"""
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def llm_cache(app, monkeypatch):
+    cache = server.ResponseCache(1024 * 1024, ttl_seconds=600)
+    monkeypatch.setattr(server, "llm_response_cache", cache)
+    return cache
+
+@pytest.fixture
+def llm_calls(app, monkeypatch):
+    calls = []
+    stream = server.llm.backend.stream
+
+    def counting(session_key, system_message, text):
+        calls.append(text)
+        return stream(session_key, system_message, text)
+
+    monkeypatch.setattr(server.llm.backend, "stream", counting)
+    return calls
+
+async def ask(client, message: str, session_id: str = "s1") -> str:
+    response = await client.post("/api/chat", json={"message": message, "session_id": session_id})
+    assert response.status_code == 200
+    return response.json()["response"]
+
+def test_normalize_question_folds_case_accents_and_punctuation():
+    assert server.normalize_question("Quanto gastei este mês?") == server.normalize_question("  quanto gastei  este mes ")
+
+@pytest.mark.parametrize("message, follow_up", [
+    ("quanto gastei este mês?", False),
+    ("qual a melhor forma de economizar?", False),
+    ("e isso?", True),
+    ("Explique melhor a resposta anterior", True),
+    ("como assim?", True),
+])
+def test_refers_to_history(message, follow_up):
+    assert server.refers_to_history(message) is follow_up
+
+async def test_repeated_question_hits_across_turns(user_client, llm_cache, llm_calls):
+    first = await ask(user_client, "Quanto gastei este mês?")
+    second = await ask(user_client, "quanto gastei este mes")
+
+    assert second == first
+    assert len(llm_calls) == 1
+    assert llm_cache.stats()["hits"] == 1
+    assert llm_cache.stats()["hit_rate"] == 0.5
+
+async def test_same_question_and_context_hits_across_users(make_user, llm_cache, llm_calls):
+    alice, bruno = await make_user("Mesmo Nome"), await make_user("Mesmo Nome")
+    await ask(alice, "quanto gastei este mês?")
+    await ask(bruno, "Quanto gastei este mês?", session_id="s2")
+
+    assert len(llm_calls) == 1
+
+async def test_data_change_misses(user_client, llm_cache, llm_calls):
+    await ask(user_client, "quanto gastei este mês?")
+    categories = (await user_client.get("/api/categories")).json()
+    category = next(c for c in categories if c["type"] == "expense")
+    now = server.datetime.now(server.timezone.utc)
+    response = await user_client.post("/api/expenses", json={
+        "category_id": category["id"], "description": "Mercado", "value": 120.5,
+        "date": now.date().isoformat(), "month": now.month, "year": now.year, "payment_method": "cash"
+    })
+    assert response.status_code == 200
+    await ask(user_client, "quanto gastei este mês?")
+
+    assert len(llm_calls) == 2
+    assert llm_cache.stats()["hits"] == 0
+
+async def test_follow_up_question_bypasses_cache(user_client, llm_cache, llm_calls):
+    await ask(user_client, "e isso?")
+    await ask(user_client, "e isso?")
+
+    assert len(llm_calls) == 2
+    assert llm_cache.stats()["entries"] == 0
+
+async def test_stream_replays_cached_answer(user_client, llm_cache, llm_calls):
+    answer = await ask(user_client, "quanto gastei este mês?")
+    response = await user_client.post("/api/chat/stream", json={"message": "Quanto gastei este mês?", "session_id": "s1"})
+
+    assert response.status_code == 200
+    assert answer.split(" ")[-1] in response.text
+    assert "event: done" in response.text
+    assert len(llm_calls) == 1
@@ -0,0 +1,51 @@
+"""Chat retention kept on the session document (user-037)"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+def as_utc(value: datetime) -> datetime:
+    # Mongo hands datetimes back naive
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+async def seed_session(db, session_id: str, expires_at: datetime):
+    key = {"user_id": "u1", "session_id": session_id}
+    await db.chat_sessions.insert_one({**key, "expires_at": expires_at, "message_count": 2})
+    await db.chat_messages.insert_many([{**key, "role": role, "content": "oi"} for role in ("user", "assistant")])
+    await db.chat_summaries.insert_one({**key, "summary": "resumo"})
+
+async def test_turn_only_moves_the_session_expiry(app):
+    await server.save_chat_turn("u1", "s1", "oi", "olá")
+    await server.save_chat_turn("u1", "s1", "tudo bem?", "tudo")
+
+    session = await app.db.chat_sessions.find_one({"session_id": "s1"})
+    assert session["message_count"] == 4
+    expected = datetime.now(timezone.utc) + timedelta(days=server.CHAT_RETENTION_DAYS + server.CHAT_TTL_GRACE_DAYS)
+    assert abs(as_utc(session["expires_at"]) - expected) < timedelta(minutes=1)
+    assert await app.db.chat_messages.count_documents({"expires_at": {"$exists": True}}) == 0
+
+async def test_purge_takes_messages_and_summary_with_the_session(app):
+    now = datetime.now(timezone.utc)
+    # Retention ended an hour ago; the TTL index would only drop it a day later
+    await seed_session(app.db, "expired", now + timedelta(days=server.CHAT_TTL_GRACE_DAYS, hours=-1))
+    await seed_session(app.db, "live", server.chat_session_expiry(now))
+
+    assert await server.purge_expired_chats(batch_size=1) == 1
+    for collection in ("chat_sessions", "chat_messages", "chat_summaries"):
+        assert {d["session_id"] for d in await app.db[collection].find().to_list(None)} == {"live"}, collection
+
+async def test_backfill_starts_retention_at_deploy(app):
+    old = (datetime.now(timezone.utc) - timedelta(days=server.CHAT_RETENTION_DAYS * 2)).isoformat()
+    await app.db.chat_messages.insert_many([
+        {"user_id": "u1", "session_id": "old", "role": "user", "content": "oi", "created_at": old}
+    ])
+
+    await server.backfill_chat_sessions()
+    session = await app.db.chat_sessions.find_one({"session_id": "old"})
+    assert session["updated_at"] == old
+    assert as_utc(session["expires_at"]) > datetime.now(timezone.utc) + timedelta(days=server.CHAT_RETENTION_DAYS)
+    assert await server.purge_expired_chats() == 0
+    assert await app.db.chat_messages.count_documents({"session_id": "old"}) == 1
@@ -0,0 +1,47 @@
+"""Conditional GETs with per-collection ETags (user-027)"""
+import pytest
+
+from tests.helpers import add_expense
+
+pytestmark = pytest.mark.anyio
+
+async def test_matching_etag_answers_304(user_client):
+    response = await user_client.get("/api/categories")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    cached = await user_client.get("/api/categories", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+async def test_weak_and_listed_etags_match(user_client):
+    etag = (await user_client.get("/api/categories")).headers["etag"]
+
+    for header in (f"W/{etag}", f'"other", {etag}', "*"):
+        response = await user_client.get("/api/categories", headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+
+async def test_write_to_the_collection_changes_etag(user_client):
+    etag = (await user_client.get("/api/categories")).headers["etag"]
+    await user_client.post("/api/categories", json={"name": "Pets", "type": "expense"})
+
+    response = await user_client.get("/api/categories", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert any(c["name"] == "Pets" for c in response.json())
+
+async def test_write_to_another_collection_keeps_etag(user_client):
+    etag = (await user_client.get("/api/categories")).headers["etag"]
+    await add_expense(user_client, 10)
+
+    response = await user_client.get("/api/categories", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+async def test_etag_is_per_user(make_user):
+    alice, bruno = await make_user(), await make_user()
+    etag = (await alice.get("/api/categories")).headers["etag"]
+
+    response = await bruno.get("/api/categories", headers={"If-None-Match": etag})
+    assert response.status_code == 200
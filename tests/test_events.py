@@ -0,0 +1,41 @@
+"""Event stream tickets (user-030)"""
+import pytest
+
+import server
+from tests.conftest import api_client
+
+pytestmark = pytest.mark.anyio
+
+async def ticket(client) -> str:
+    response = await client.post("/api/events/ticket")
+    assert response.status_code == 200, response.text
+    assert response.json()["expires_in"] == server.STREAM_TICKET_SECONDS
+    return response.json()["ticket"]
+
+async def test_ticket_opens_the_stream(user_client):
+    me = (await user_client.get("/api/auth/me")).json()
+
+    user = await server.get_stream_user(await ticket(user_client))
+    assert user["id"] == me["id"]
+
+async def test_ticket_needs_a_session(app):
+    async with api_client() as client:
+        assert (await client.post("/api/events/ticket")).status_code in (401, 403)
+
+async def test_stream_rejects_session_tokens(user_client):
+    session_token = user_client.headers["authorization"].split(" ", 1)[1]
+
+    for params in ({"token": session_token}, {"ticket": session_token}, {}):
+        response = await user_client.get("/api/events", params=params)
+        assert response.status_code == 401, params
+
+async def test_ticket_is_not_a_session_token(user_client):
+    response = await user_client.get("/api/auth/me", headers={"Authorization": f"Bearer {await ticket(user_client)}"})
+    assert response.status_code == 401
+
+async def test_expired_ticket_is_rejected(user_client, monkeypatch):
+    monkeypatch.setattr(server, "STREAM_TICKET_SECONDS", -1)
+
+    with pytest.raises(server.HTTPException) as error:
+        await server.get_stream_user(server.create_stream_ticket((await user_client.get("/api/auth/me")).json()["id"]))
+    assert error.value.detail == "Token expired"
@@ -0,0 +1,97 @@
+"""Admission control in front of the chat model (user-036)"""
+import asyncio
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+class SlowLLM(server.LLMBackend):
+    """Streams one chunk once released"""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    async def stream(self, session_key, system_message, text):
+        await self.release.wait()
+        yield f"ok {text}"
+
+def gateway(backend=None, **limits) -> server.LLMGateway:
+    settings = {"max_concurrency": 1, "max_per_user": 1, "max_queue": 1, "max_wait": 1.0, "timeout": 5.0, **limits}
+    return server.LLMGateway(backend or SlowLLM(), **settings)
+
+async def test_per_user_limit_rejects_with_429():
+    llm = gateway(max_concurrency=4)
+    held = await llm.stream("u1", "k", "sys", "a")
+
+    with pytest.raises(server.HTTPException) as error:
+        await llm.stream("u1", "k", "sys", "b")
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"]
+    # Another user still gets in
+    other = await llm.stream("u2", "k", "sys", "c")
+
+    await held.aclose()
+    await other.aclose()
+    assert llm.stats()["rejected"] == 1
+    assert llm.stats()["in_flight"] == 0
+
+async def test_full_queue_rejects_with_503():
+    llm = gateway(max_per_user=10, max_queue=0)
+    held = await llm.stream("u1", "k", "sys", "a")
+
+    with pytest.raises(server.HTTPException) as error:
+        await llm.stream("u2", "k", "sys", "b")
+    assert error.value.status_code == 503
+    await held.aclose()
+
+async def test_expired_wait_rejects_with_503():
+    llm = gateway(max_per_user=10, max_wait=0.05)
+    held = await llm.stream("u1", "k", "sys", "a")
+
+    with pytest.raises(server.HTTPException) as error:
+        await llm.stream("u2", "k", "sys", "b")
+    assert error.value.status_code == 503
+    assert llm.stats()["queue_depth"] == 0
+    await held.aclose()
+
+async def test_queued_call_admitted_when_slot_frees():
+    backend = SlowLLM()
+    llm = gateway(backend, max_per_user=10)
+    first = await llm.stream("u1", "k", "sys", "a")
+    waiting = asyncio.create_task(llm.stream("u2", "k", "sys", "b"))
+    await asyncio.sleep(0.01)
+    assert llm.stats()["queue_depth"] == 1
+
+    backend.release.set()
+    assert "".join([chunk async for chunk in first]) == "ok a"
+    second = await waiting
+    assert "".join([chunk async for chunk in second]) == "ok b"
+    assert llm.stats()["admitted"] == 2
+    assert llm.stats()["in_flight"] == 0
+
+async def test_unread_stream_releases_slot_on_close():
+    llm = gateway()
+    tokens = await llm.stream("u1", "k", "sys", "a")
+    assert llm.stats()["in_flight"] == 1
+
+    await tokens.aclose()
+    assert llm.stats()["in_flight"] == 0
+    await (await llm.stream("u1", "k", "sys", "b")).aclose()
+
+async def test_call_cut_off_after_timeout():
+    llm = gateway(timeout=0.05)
+
+    with pytest.raises(server.HTTPException) as error:
+        await llm.complete("u1", "k", "sys", "a")
+    assert error.value.status_code == 504
+    assert llm.stats()["timeouts"] == 1
+    assert llm.stats()["in_flight"] == 0
+
+async def test_chat_stream_rejection_is_an_http_status(user_client, monkeypatch):
+    llm = gateway(max_per_user=0)
+    monkeypatch.setattr(server, "llm", llm)
+
+    response = await user_client.post("/api/chat/stream", json={"message": "e isso?", "session_id": "s1"})
+    assert response.status_code == 429
@@ -0,0 +1,74 @@
+"""Prometheus text output at /metrics (user-046)"""
+import pytest
+
+import metrics
+import server
+from tests.conftest import api_client
+
+def test_counter_and_gauge_lines():
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests", ("route", "status"))
+    in_flight = registry.gauge("in_flight", "Running")
+    requests.inc("/a", "200")
+    requests.inc("/a", "200", amount=2)
+    requests.inc('/b "x"\\', "500", amount=0.5)
+    in_flight.inc()
+    in_flight.dec()
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a",status="200"} 3',
+        'requests_total{route="/b \\"x\\"\\\\",status="500"} 0.5',
+        "# HELP in_flight Running",
+        "# TYPE in_flight gauge",
+        "in_flight 0",
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe("/a", value=value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+def test_collectors_are_read_at_render_time():
+    registry = metrics.Registry()
+    depth = {"value": 1}
+    registry.collectors.append(lambda: [("queue_depth", "gauge", "Waiting", (), [((), depth["value"])])])
+
+    assert registry.render().endswith("queue_depth 1\n")
+    depth["value"] = 7
+    assert registry.render().endswith("queue_depth 7\n")
+
+@pytest.mark.anyio
+async def test_metrics_need_the_token(app, monkeypatch):
+    async with api_client() as client:
+        assert (await client.get("/metrics")).status_code == 403
+        monkeypatch.setattr(server, "METRICS_TOKEN", "scrape")
+        assert (await client.get("/metrics")).status_code == 401
+        assert (await client.get("/metrics", headers={"Authorization": "Bearer other"})).status_code == 401
+
+@pytest.mark.anyio
+async def test_requests_are_labelled_by_route_template(user_client, monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "scrape")
+    await user_client.get("/api/credit-cards/abc/statement", params={"month": 1, "year": 2024})
+    await user_client.get("/api/no/such/path")
+
+    response = await user_client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert any(line.startswith('http_requests_total{method="GET",route="/api/credit-cards/{card_id}/statement"')
+               for line in lines)
+    assert any(line.startswith('http_requests_total{method="GET",route="unmatched",status="404"}') for line in lines)
+    assert not any("abc" in line for line in lines)
+    for name in ("http_request_duration_seconds_bucket", "cache_hits_total", "llm_queue_depth", "executor_threads"):
+        assert any(line.startswith(name) for line in lines), name
@@ -0,0 +1,51 @@
+"""Money stored and summed as integer cents (user-040)"""
+from datetime import date
+
+import pytest
+
+import server
+from tests.helpers import add_expense, category_id
+
+@pytest.mark.parametrize("value, cents", [
+    (0, 0),
+    (None, 0),
+    (19.99, 1999),
+    (0.125, 13),
+    (-0.125, -13),
+    (2.675, 268),  # 2.675 is 2.67499... as a double; cents follow the decimal text
+    (10.005, 1001),
+    (-10.005, -1001),
+    ("12.345", 1235),
+])
+def test_to_cents_rounds_half_away_from_zero(value, cents):
+    assert server.to_cents(value) == cents
+
+def test_models_store_cents_next_to_reais():
+    expense = server.ExpenseBase(category_id="c", value=0.1, date="2024-01-01", month=1, year=2024)
+
+    assert expense.model_dump()["value_cents"] == 10
+    assert server.doc_cents({"value": 0.125}, "value") == 13
+    assert server.doc_cents({"value": 0.125, "value_cents": 12}, "value") == 12
+
+@pytest.mark.anyio
+async def test_sums_are_exact(user_client):
+    today = date.today()
+    category = await category_id(user_client)
+    for _ in range(10):
+        await add_expense(user_client, 0.1, today, category_id=category, status="paid")
+    await add_expense(user_client, 0.2, today, category_id=category, status="paid")
+
+    summary = (await user_client.get("/api/dashboard/summary", params={"month": today.month, "year": today.year})).json()
+    assert summary["total_expense"] == 1.2
+
+@pytest.mark.anyio
+async def test_fallback_for_documents_without_cents(app):
+    await app.db.money_check.insert_many([{"value": v} for v in (0.125, -0.125, 10.005, 19.99)])
+    try:
+        rows = await app.db.money_check.aggregate([
+            {"$project": {"_id": 0, "value": 1, "cents": server.money_cents("value")}}
+        ]).to_list(None)
+    except (AssertionError, NotImplementedError) as e:
+        pytest.skip(f"$toDecimal arithmetic needs a MongoDB server: {e}")
+
+    assert [r["cents"] for r in rows] == [server.to_cents(r["value"]) for r in rows]
@@ -0,0 +1,68 @@
+"""Versioned response cache (user-026)"""
+from datetime import date
+
+import pytest
+
+import server
+from tests.helpers import add_expense
+
+def test_entry_served_only_for_its_version():
+    cache = server.ResponseCache(1024, ttl_seconds=60)
+    cache.put(("u", "e", ()), 3, b"body")
+
+    assert cache.get(("u", "e", ()), 3) == b"body"
+    assert cache.get(("u", "e", ()), 4) is None
+    # The stale entry is dropped on the miss
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["size_bytes"] == 0
+
+def test_expired_entry_is_a_miss():
+    cache = server.ResponseCache(1024, ttl_seconds=0)
+    cache.put(("u", "e", ()), 1, b"body")
+
+    assert cache.get(("u", "e", ()), 1) is None
+    assert cache.stats()["misses"] == 1
+
+def test_least_recently_used_evicted_over_size_bound():
+    cache = server.ResponseCache(10, ttl_seconds=60)
+    cache.put("a", 1, b"aaaa")
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 1)  # b is now the least recently used
+    cache.put("c", 1, b"cccc")
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.get("c", 1) == b"cccc"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] == 8
+
+def test_body_larger_than_bound_is_not_stored():
+    cache = server.ResponseCache(4, ttl_seconds=60)
+    cache.put("a", 1, b"too large")
+
+    assert cache.stats()["entries"] == 0
+
+def test_bump_invalidates_only_touched_user_and_collections():
+    versions = server.DataVersionStore()
+    versions.bump("u1", "expenses")
+
+    assert versions.get("u1") == 1
+    assert versions.get("u1", "expenses") == 1
+    assert versions.get("u1", "incomes") == 0
+    assert versions.get("u2") == 0
+
+@pytest.mark.anyio
+async def test_write_invalidates_cached_endpoint(user_client):
+    today = date.today()
+    params = {"month": today.month, "year": today.year}
+    hits = server.response_cache.hits
+
+    first = (await user_client.get("/api/dashboard/summary", params=params)).json()
+    again = (await user_client.get("/api/dashboard/summary", params=params)).json()
+    assert again == first
+    assert server.response_cache.hits == hits + 1
+
+    await add_expense(user_client, 42.5, status="paid")
+    after = (await user_client.get("/api/dashboard/summary", params=params)).json()
+    assert server.response_cache.hits == hits + 1
+    assert after["total_expense"] == first["total_expense"] + 42.5
@@ -0,0 +1,99 @@
+"""Delta sync tokens and tombstones (user-029)"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from tests.helpers import add_expense, add_income
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def no_settle_delay(monkeypatch):
+    monkeypatch.setattr(server, "SYNC_SETTLE_SECONDS", 0)
+
+async def pull(client, since=None, limit=500) -> dict:
+    params = {"limit": limit, **({"since": since} if since else {})}
+    response = await client.get("/api/sync", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_token_round_trip():
+    token = server.encode_sync_token("2024-01-01T00:00:00.000000+00:00", "abc", "2024-02-01T00:00:00.000000+00:00")
+
+    assert server.decode_sync_token(token) == (
+        "2024-01-01T00:00:00.000000+00:00", "abc", "2024-02-01T00:00:00.000000+00:00"
+    )
+
+def test_legacy_token_falls_back_to_its_position():
+    legacy = server.base64.urlsafe_b64encode(b'{"t": "2024-01-01", "id": "abc"}').decode("ascii")
+
+    assert server.decode_sync_token(legacy) == ("2024-01-01", "abc", "2024-01-01")
+
+def test_invalid_token_is_400():
+    with pytest.raises(server.HTTPException) as error:
+        server.decode_sync_token("not a token")
+    assert error.value.status_code == 400
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-01-01T10:00:00", "2024-01-01T10:00:00.000000+00:00"),
+    ("2024-01-01T10:00:00.5+00:00", "2024-01-01T10:00:00.500000+00:00"),
+    ("2024-01-01T12:00:00-02:00", "2024-01-01T14:00:00.000000+00:00"),
+    ("garbage", "1970-01-01T00:00:00.000000+00:00"),
+])
+def test_normalize_sync_stamp(value, expected):
+    assert server.normalize_sync_stamp(value) == expected
+
+async def test_pages_then_catches_up(user_client):
+    first = await pull(user_client)
+    assert first["changes"]  # the default categories
+    for value in (10, 20, 30):
+        await add_expense(user_client, value)
+
+    page = await pull(user_client, first["next_token"], limit=2)
+    assert [c["data"]["value"] for c in page["changes"]] == [10, 20]
+    assert page["has_more"]
+    page = await pull(user_client, page["next_token"], limit=2)
+    assert [c["data"]["value"] for c in page["changes"]] == [30]
+    assert not page["has_more"]
+
+    caught_up = await pull(user_client, page["next_token"])
+    assert caught_up["changes"] == []
+    assert caught_up["next_token"]
+
+async def test_delete_leaves_tombstone(user_client):
+    expense = await add_expense(user_client, 10)
+    token = (await pull(user_client))["next_token"]
+
+    assert (await user_client.delete(f"/api/expenses/{expense['id']}")).status_code == 200
+    changes = (await pull(user_client, token))["changes"]
+    assert [(c["collection"], c["op"], c["id"]) for c in changes] == [("expenses", "delete", expense["id"])]
+
+async def test_updates_are_seen_once(user_client):
+    income = await add_income(user_client, 100)
+    token = (await pull(user_client))["next_token"]
+
+    response = await user_client.put(f"/api/incomes/{income['id']}", json={**income, "value": 150})
+    assert response.status_code == 200
+    changes = (await pull(user_client, token))["changes"]
+    assert [(c["op"], c["data"]["value"]) for c in changes] == [("upsert", 150)]
+
+async def test_token_older_than_retention_resets(user_client):
+    issued = (datetime.now(timezone.utc) - timedelta(days=server.SYNC_TOMBSTONE_RETENTION_DAYS + 1))
+    token = server.encode_sync_token("", "", issued.isoformat(timespec="microseconds"))
+
+    assert (await pull(user_client, token))["reset"] is True
+
+async def test_old_documents_do_not_reset_a_fresh_client(user_client, app):
+    user_id = (await user_client.get("/api/auth/me")).json()["id"]
+    await app.db.incomes.insert_many([
+        {"id": f"old{i}", "user_id": user_id, "updated_at": "1970-01-01T00:00:00.000000+00:00"} for i in range(5)
+    ])
+
+    page = await pull(user_client, limit=2)
+    for _ in range(10):
+        assert not page["reset"]
+        if not page["has_more"]:
+            break
+        page = await pull(user_client, page["next_token"], limit=2)
+    assert not page["has_more"]
@@ -0,0 +1,91 @@
+"""W3C trace context in and out (user-049)"""
+import httpx
+import pytest
+
+import server
+import tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+@pytest.mark.parametrize("value, expected", [
+    (f"00-{TRACE_ID}-{PARENT_ID}-01", (TRACE_ID, PARENT_ID, True)),
+    (f"00-{TRACE_ID}-{PARENT_ID}-00", (TRACE_ID, PARENT_ID, False)),
+    (f"  00-{TRACE_ID}-{PARENT_ID}-03  ", (TRACE_ID, PARENT_ID, True)),
+    (f"01-{TRACE_ID}-{PARENT_ID}-01-future", (TRACE_ID, PARENT_ID, True)),
+    (None, None),
+    ("", None),
+    ("garbage", None),
+    (f"00-{TRACE_ID}-{PARENT_ID}", None),
+    (f"00-{TRACE_ID[:-1]}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-{PARENT_ID}-zz", None),
+    (f"00-{'x' * 32}-{PARENT_ID}-01", None),
+    (f"00-{'0' * 32}-{PARENT_ID}-01", None),
+    (f"00-{TRACE_ID}-{'0' * 16}-01", None),
+])
+def test_parse_traceparent(value, expected):
+    assert tracing.parse_traceparent(value) == expected
+
+def traced_app(trusted_peers=()):
+    """A bare ASGI app behind the middleware, with a tracer that samples nothing
+    on its own"""
+    exporter = ListExporter()
+    tracer = tracing.Tracer(0, exporter)
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    return tracing.TracingMiddleware(endpoint, tracer, trusted_peers), exporter
+
+async def call(app, traceparent: str, client=("203.0.113.9", 50000)) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app, client=client)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await http.get("/", headers={"traceparent": traceparent})
+
+@pytest.mark.anyio
+async def test_sampled_flag_from_outside_is_ignored():
+    app, exporter = traced_app(tracing.parse_networks("10.0.0.0/8"))
+
+    response = await call(app, f"00-{TRACE_ID}-{PARENT_ID}-01")
+    assert response.headers["x-trace-id"] == TRACE_ID
+    assert exporter.spans == []
+
+@pytest.mark.anyio
+async def test_sampled_flag_from_trusted_peer_is_honoured():
+    app, exporter = traced_app(tracing.parse_networks("10.0.0.0/8, ::1"))
+
+    await call(app, f"00-{TRACE_ID}-{PARENT_ID}-01", client=("10.1.2.3", 50000))
+    await call(app, f"00-{TRACE_ID}-{PARENT_ID}-00", client=("10.1.2.3", 50000))
+    assert [(s.trace_id, s.parent_id) for s in exporter.spans] == [(TRACE_ID, PARENT_ID)]
+
+class Recorder:
+    def __init__(self):
+        self.headers = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.headers.append(request.headers)
+        return httpx.Response(200)
+
+@pytest.mark.anyio
+async def test_traceparent_only_sent_to_our_hosts(monkeypatch):
+    monkeypatch.setattr(server, "TRACE_PROPAGATE_HOSTS", {"internal.lpfinancas.com"})
+    recorder = Recorder()
+    outbound = server.OutboundHTTP()
+    outbound.client = httpx.AsyncClient(transport=httpx.MockTransport(recorder))
+    try:
+        await outbound.request("GET", "https://internal.lpfinancas.com/ping", retries=0)
+        await outbound.request("GET", server.EMERGENT_AUTH_URL, retries=0, headers={"X-Session-ID": "s"})
+    finally:
+        await outbound.close()
+
+    assert "traceparent" in recorder.headers[0]
+    assert "traceparent" not in recorder.headers[1]
+    assert recorder.headers[1]["x-session-id"] == "s"